@@ -0,0 +1,104 @@
+"""
+Magasin d'artefacts de modèles versionnés (.cache/models/<nom>/).
+
+Un artefact = <empreinte>.pkl (modèle entraîné, pickle) + <empreinte>.json :
+  - empreinte des entrées : données d'entraînement (frame_hash) + configuration,
+  - colonnes de features, fenêtre d'entraînement, valeur de remplissage (fill :
+    moyenne des effectifs imputée aux lag1 / populations manquants), métriques,
+  - versions de sklearn et numpy à l'entraînement et empreinte du code qui entraîne
+    (modules `code` du magasin) : autre version ou code modifié → réentraînement.
+
+Un script (ou un service) qui retrouve l'empreinte de ses entrées recharge le
+modèle sans réentraîner : projections identiques d'un run à l'autre. Les `keep`
+artefacts les plus récents d'un magasin sont conservés, les autres purgés.
+"""
+
+import hashlib
+import json
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from build_cache import CACHE_DIR, file_hash
+
+ARTIFACTS_DIR = CACHE_DIR / "models"
+ARTIFACT_VERSION = 2
+
+
+def frame_hash(df: pd.DataFrame, columns: list[str]) -> str:
+    """SHA-256 du contenu des colonnes `columns` (ordre des lignes compris, index ignoré)."""
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+def _runtime(code: tuple[Path, ...] = ()) -> dict:
+    import sklearn
+
+    return {
+        "artifact": ARTIFACT_VERSION, "sklearn": sklearn.__version__, "numpy": np.__version__,
+        "code": {p.name: file_hash(p) for p in code},
+    }
+
+
+class ArtifactStore:
+    """Modèles entraînés indexés par l'empreinte de leurs entrées."""
+
+    def __init__(
+        self, name: str, root: Path = ARTIFACTS_DIR, keep: int = 5, refresh: bool = False, code: list[Path] = (),
+    ):
+        self.dir = root / name
+        self.keep = keep
+        self.refresh = refresh  # True : ignore les artefacts existants (réentraînement forcé)
+        self.code = tuple(Path(p) for p in code)  # modules dont dépend l'entraînement (empreinte du code)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.dir / f"{key[:16]}.pkl", self.dir / f"{key[:16]}.json"
+
+    def load(self, key: str):
+        """
+        (modèle, métadonnées) de l'artefact d'empreinte `key`, ou None (absent, illisible, autre
+        version, code modifié, ou pickle qui référence un module ou une classe introuvable).
+        """
+        if self.refresh:
+            return None
+        model_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("key") != key or meta.get("runtime") != _runtime(self.code):
+                return None
+            with open(model_path, "rb") as f:
+                model = pickle.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        meta_path.touch()  # récemment utilisé : protégé de la purge
+        return model, meta
+
+    def save(self, key: str, model, meta: dict) -> Path:
+        """Écrit modèle + métadonnées (le JSON en dernier : un artefact sans JSON est ignoré)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        model_path, meta_path = self._paths(key)
+        with open(model_path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = {**meta, "key": key, "runtime": _runtime(self.code), "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        self._prune()
+        return model_path
+
+    def versions(self) -> list[dict]:
+        """Métadonnées des artefacts présents, du plus récent au plus ancien."""
+        metas = []
+        for path in sorted(self.dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
+            try:
+                metas.append(json.loads(path.read_text(encoding="utf-8")))
+            except json.JSONDecodeError:
+                continue
+        return metas
+
+    def _prune(self) -> None:
+        metas = sorted(self.dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for meta_path in metas[self.keep:]:
+            meta_path.unlink(missing_ok=True)
+            meta_path.with_suffix(".pkl").unlink(missing_ok=True)
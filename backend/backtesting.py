@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Backtest walk-forward (origines glissantes) du modèle Ridge global.
+
+Pour chaque combinaison origine × alpha × jeu de features × stratégie :
+  - entraînement sur toutes les années <= origine,
+  - projection origine+1 … origine+H (moteur de projection.py), récursive
+    (un modèle N+1 réinjecté) ou directe (un modèle par horizon),
+  - comparaison aux effectifs réels disponibles.
+
+Les ajustements sont répartis sur un pool de processus ; le résultat est une
+table longue (une ligne par lycée × origine × horizon) et son résumé MAE/MAPE.
+
+Usage : python backtesting.py --origins 2020 2021 2022 2023 2024 --alphas 0.1 1 10 --strategies recursive direct
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+
+from features import FeatureStore
+from projection import fit_direct, forecast_batch, forecast_direct, training_features
+
+FEATURE_SETS = {
+    "base": ["annee", "lag1_effectifs", "population_15_19"],
+    "sans_pop": ["annee", "lag1_effectifs"],
+    "lag_pop": ["lag1_effectifs", "population_15_19"],
+}
+STRATEGIES = ("recursive", "direct")
+
+_WORKER_DF = None
+
+
+def _init_worker(df: pd.DataFrame) -> None:
+    """Transmet le DataFrame une seule fois par processus."""
+    global _WORKER_DF
+    _WORKER_DF = df
+
+
+def evaluate_origin(
+    df: pd.DataFrame,
+    origin: int,
+    horizons: list[int],
+    alpha: float,
+    feature_set: str,
+    feature_cols: list[str],
+    lycee_col: str = "lycee_raw",
+    strategy: str = "recursive",
+) -> pd.DataFrame:
+    """
+    Entraîne sur annee <= origin et mesure l'erreur de la projection à chaque horizon.
+    En stratégie directe, les horizons sans année d'entraînement (origin - h antérieure
+    aux données) sont ignorés.
+    """
+    store = FeatureStore(df, key=lycee_col)
+    if strategy == "direct":
+        horizons = [h for h in horizons if origin - h >= store.year0]
+        if not horizons:
+            return pd.DataFrame()
+        model = fit_direct(
+            store, feature_cols, range(1, max(horizons) + 1), origin, lambda: Ridge(alpha=alpha, random_state=42),
+        )
+        forecaster = forecast_direct
+    else:
+        train = df[df["annee"] <= origin]
+        X = training_features(train, feature_cols, train["effectifs"].mean())
+        model = Ridge(alpha=alpha, random_state=42)
+        model.fit(X, train["effectifs"])
+        forecaster = forecast_batch
+
+    years = [origin + h for h in range(1, max(horizons) + 1)]
+    o = origin - store.year0
+    lag1 = store.matrix["effectifs"][:, o]
+    observed = ~np.isnan(lag1)
+    lycees = store.keys[observed]
+
+    def grid(col: str) -> np.ndarray:
+        """Valeurs (lycées × années projetées) lues dans le store."""
+        return store.at(col, np.repeat(lycees, len(years)), np.tile(years, len(lycees))).reshape(len(lycees), -1)
+
+    pop_vals = grid("population_15_19")
+    pop_last = store.matrix["population_15_19"][observed, o]
+    pop_vals = np.where(np.isnan(pop_vals), pop_last[:, None], pop_vals)
+    preds = forecaster(model, feature_cols, lag1[observed], pop_vals, years)
+    actual = grid("effectifs")
+    h_idx = np.asarray(horizons) - 1
+    y_pred, y_true = preds[:, h_idx], actual[:, h_idx]
+    out = pd.DataFrame({
+        "origin": origin,
+        "horizon": np.tile(horizons, len(lycees)),
+        "annee": np.tile(np.asarray(years)[h_idx], len(lycees)),
+        "alpha": alpha,
+        "feature_set": feature_set,
+        "strategy": strategy,
+        "lycee": np.repeat(lycees, len(horizons)),
+        "y_true": y_true.ravel(),
+        "y_pred": y_pred.ravel(),
+    })
+    out = out.dropna(subset=["y_true"])
+    out["abs_err"] = (out["y_true"] - out["y_pred"]).abs()
+    out["ape"] = out["abs_err"] / (out["y_true"] + 1e-8) * 100
+    return out
+
+
+def _evaluate_task(args) -> pd.DataFrame:
+    return evaluate_origin(_WORKER_DF, *args)
+
+
+def walk_forward(
+    df: pd.DataFrame,
+    origins: list[int],
+    horizons: list[int] = (1, 2, 3),
+    alphas: list[float] = (1.0,),
+    feature_sets: dict[str, list[str]] | None = None,
+    lycee_col: str = "lycee_raw",
+    max_workers: int | None = None,
+    strategies: tuple[str, ...] = STRATEGIES,
+) -> pd.DataFrame:
+    """
+    Évalue toutes les combinaisons origine × alpha × jeu de features × stratégie.
+
+    Returns:
+        Table longue : origin | horizon | annee | alpha | feature_set | strategy | lycee
+        | y_true | y_pred | abs_err | ape
+        (seules les années dont l'effectif réel est connu sont conservées).
+    """
+    feature_sets = feature_sets or FEATURE_SETS
+    horizons = list(horizons)
+    tasks = [
+        (origin, horizons, alpha, name, cols, lycee_col, strategy)
+        for origin, alpha, (name, cols), strategy in product(origins, alphas, feature_sets.items(), strategies)
+    ]
+    if max_workers == 1 or len(tasks) == 1:
+        results = [evaluate_origin(df, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(df,)) as pool:
+            results = list(pool.map(_evaluate_task, tasks))
+    return pd.concat(results, ignore_index=True)
+
+
+def summarize(errors: pd.DataFrame, by=("strategy", "feature_set", "alpha", "lycee", "horizon")) -> pd.DataFrame:
+    """MAE / MAPE agrégés (par défaut par lycée et horizon pour chaque configuration)."""
+    return (
+        errors.groupby(list(by), observed=True)
+        .agg(mae=("abs_err", "mean"), mape=("ape", "mean"), n=("abs_err", "size"))
+        .reset_index()
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    from generate_api_data import POP_CSV, find_evolution_csv, load_all_effectifs, load_and_extrapolate_pop, prepare_all_data
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--origins", type=int, nargs="+", default=[2020, 2021, 2022, 2023, 2024])
+    parser.add_argument("--horizons", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--alphas", type=float, nargs="+", default=[0.1, 1.0, 10.0])
+    parser.add_argument("--feature-sets", nargs="+", choices=sorted(FEATURE_SETS), default=sorted(FEATURE_SETS))
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--workers", type=int, default=None, help="processus (défaut : nombre de cœurs)")
+    parser.add_argument("--output", type=Path, help="CSV MAE/MAPE par lycée et horizon")
+    args = parser.parse_args(argv)
+
+    df = prepare_all_data(load_all_effectifs(find_evolution_csv()), load_and_extrapolate_pop(POP_CSV))
+    errors = walk_forward(
+        df, args.origins, args.horizons, args.alphas,
+        {name: FEATURE_SETS[name] for name in args.feature_sets},
+        max_workers=args.workers,
+        strategies=tuple(args.strategies),
+    )
+
+    print("=== Backtest walk-forward ===")
+    print(f"  Origines : {args.origins} — horizons : {args.horizons} — {len(errors)} prévisions évaluées\n")
+    # Stratégies côte à côte : une colonne MAE / MAPE par stratégie
+    overview = summarize(errors, by=("feature_set", "alpha", "horizon", "strategy")).pivot(
+        index=["feature_set", "alpha", "horizon"], columns="strategy", values=["mae", "mape"],
+    )
+    overview.columns = [f"{metric}_{strategy}" for metric, strategy in overview.columns]
+    print(overview.reset_index().to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    if args.output:
+        summarize(errors).to_csv(args.output, index=False)
+        print(f"\n✓ Détail par lycée et horizon : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
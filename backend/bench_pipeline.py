@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark étape par étape de generate_api_data et model_lycees sur un réseau synthétique.
+
+Génère des CSV effectifs / population 15-19 au même format que les fichiers de
+data/ (N lycées × F formations × Y années × D départements), exécute chaque étape du pipeline
+et mesure le temps (meilleur de --repeat) et le pic mémoire (tracemalloc, run
+séparé pour ne pas fausser les temps). Le rapport est écrit en JSON.
+
+Le chargement des effectifs est mesuré en lecture complète et par blocs
+(ingestion.py, --chunksize) : le pic mémoire de la seconde ne dépend pas du
+nombre de lignes de l'export.
+
+Usage : python bench_pipeline.py --lycees 22 500 5000 --years 8 --departements 5 [--formations 20] --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+import generate_api_data as gad
+import model_lycees as ml
+from population import extrapolate_population, read_population
+
+DERNIERE_ANNEE = 2025
+
+
+def generate_network(
+    workdir: Path, n_lycees: int, n_years: int, n_deps: int, seed: int = 0, n_formations: int = 1,
+) -> tuple[Path, Path, dict]:
+    """
+    Écrit un CSV effectifs (format « Octobre AAAA » + ligne TOTAL ; une ligne par lycée
+    et par formation, effectifs du lycée répartis entre ses n_formations lignes) et un CSV
+    population interpolée (annee | code_departement | departement | population_15_19).
+    Retourne les deux chemins et le mapping lycée → département.
+    """
+    rng = np.random.default_rng(seed)
+    years = np.arange(DERNIERE_ANNEE - n_years + 1, DERNIERE_ANNEE + 1)
+    names = [f"LYCEE {i:05d}" for i in range(n_lycees)]
+    deps = [str(10 + d) for d in range(n_deps)]
+    lycee_dep = {name: deps[i % n_deps] for i, name in enumerate(names)}
+
+    base = rng.lognormal(np.log(300), 0.5, n_lycees)
+    trend = rng.normal(0, 0.03, n_lycees)
+    noise = rng.normal(0, 0.04, (n_lycees, n_years))
+    eff = np.maximum(10, np.round(base[:, None] * (1 + trend[:, None]) ** np.arange(n_years) * (1 + noise))).astype(int)
+
+    eff_csv = workdir / "evolution effectif synthetique - Feuil1.csv"
+    # Répartition entre formations : parts égales, le reste sur la première ligne
+    share = np.repeat(eff // n_formations, n_formations, axis=0)
+    share[::n_formations] += eff % n_formations
+    wide = pd.DataFrame(share, columns=[f"Octobre {y}" for y in years])
+    wide.insert(0, "", np.repeat(names, n_formations))
+    total = ["TOTAL"] + [f"{v:,}".replace(",", " ") for v in eff.sum(axis=0)]
+    wide.loc[len(wide)] = total
+    wide.to_csv(eff_csv, index=False, lineterminator="\r\n", encoding="utf-8")
+
+    pop_years = np.arange(min(years[0], 2018), 2023)
+    pop0 = rng.uniform(2e4, 1e5, n_deps)
+    slope = rng.normal(0.01, 0.01, n_deps) * pop0
+    pop = pd.DataFrame({
+        "annee": np.tile(pop_years, n_deps),
+        "code_departement": np.repeat(deps, len(pop_years)),
+        "departement": np.repeat([f"Département {d}" for d in deps], len(pop_years)),
+        "population_15_19": np.round((pop0[:, None] + slope[:, None] * (pop_years - pop_years[0])).ravel(), 2),
+    })
+    pop_csv = workdir / "pop_15_19_interpolee.csv"
+    pop.to_csv(pop_csv, index=False, encoding="utf-8-sig")
+    return eff_csv, pop_csv, lycee_dep
+
+
+def measure(stage: str, fn, repeat: int, rows=None):
+    """Exécute `fn` : meilleur temps sur `repeat` runs, puis un run sous tracemalloc pour le pic mémoire."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_rows = rows(result) if rows is not None else (len(result) if hasattr(result, "__len__") else None)
+    return result, {"stage": stage, "seconds": round(min(times), 6), "peak_mb": round(peak / 2**20, 3), "rows": n_rows}
+
+
+def run_config(
+    n_lycees: int, n_years: int, n_deps: int, repeat: int, seed: int, n_formations: int = 1, chunksize: int = 100_000,
+) -> dict:
+    """Génère un réseau synthétique et mesure chaque étape du pipeline."""
+    stages = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        eff_csv, pop_csv, lycee_dep = generate_network(workdir, n_lycees, n_years, n_deps, seed, n_formations)
+        first_year = DERNIERE_ANNEE - n_years + 1
+
+        # --- generate_api_data ---
+        effectifs, m = measure("gad.load_all_effectifs", lambda: gad.load_all_effectifs(eff_csv, lycee_dep), repeat)
+        stages.append(m)
+        _, m = measure(
+            "gad.load_all_effectifs_chunked",
+            lambda: gad.load_all_effectifs(eff_csv, lycee_dep, chunksize=chunksize), repeat,
+        )
+        stages.append(m)
+        pop, m = measure(
+            "gad.load_and_extrapolate_pop",
+            lambda: extrapolate_population(read_population(pop_csv), years=range(min(first_year, 2018), 2029)),
+            repeat,
+        )
+        stages.append(m)
+        df, m = measure("gad.prepare_all_data", lambda: gad.prepare_all_data(effectifs, pop), repeat)
+        stages.append(m)
+        trained, m = measure("gad.train_global_model", lambda: gad.train_global_model(df), repeat, rows=lambda _: len(df))
+        stages.append(m)
+        model, feature_cols = trained[0], trained[1]
+        projections, m = measure(
+            "gad.forecast_all", lambda: gad.forecast_all(model, feature_cols, df, pop, gad.YEARS_PROJ), repeat,
+        )
+        stages.append(m)
+        groups = {lycee: hist.sort_values("annee") for lycee, hist in df.groupby("lycee_raw", sort=True, observed=True)}
+        _, m = measure("gad.compute_metrics", lambda: [gad.compute_metrics(h) for h in groups.values()], repeat)
+        stages.append(m)
+
+        def export():
+            entries = [gad.build_lycee_entries(lycee, hist, projections[lycee]) for lycee, hist in groups.items()]
+            lycees_data = {lst["id"]: data for lst, data in entries}
+            out = workdir / "lycees_data.json"
+            out.write_text(json.dumps(lycees_data, ensure_ascii=False, indent=2), encoding="utf-8")
+            return entries
+
+        _, m = measure("gad.export_json", export, repeat)
+        stages.append(m)
+
+        # --- model_lycees (mêmes données, colonne « lycee ») ---
+        df_ml = df.rename(columns={"lycee_raw": "lycee"})
+        bt, m = measure(
+            "ml.backtest", lambda: ml.backtest(df_ml, (first_year, 2023), (2024, 2025)), repeat, rows=lambda _: len(df_ml),
+        )
+        stages.append(m)
+        _, m = measure(
+            "ml.forecast_recursive",
+            lambda: ml.forecast_recursive(bt[0], bt[1], df_ml, pop, gad.YEARS_PROJ, evron_cap_decline=False),
+            repeat,
+        )
+        stages.append(m)
+
+    return {
+        "config": {
+            "lycees": n_lycees, "formations": n_formations, "years": n_years, "departements": n_deps,
+            "chunksize": chunksize, "seed": seed, "repeat": repeat,
+        },
+        "total_seconds": round(sum(s["seconds"] for s in stages), 6),
+        "stages": stages,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lycees", type=int, nargs="+", default=[22, 500, 5000])
+    parser.add_argument("--years", type=int, nargs="+", default=[8])
+    parser.add_argument("--departements", type=int, nargs="+", default=[5])
+    parser.add_argument("--formations", type=int, default=1, help="lignes (formations) par lycée dans l'export")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="lignes par bloc (chargement par blocs)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs chronométrés par étape (on garde le meilleur)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="rapport JSON (défaut : sortie standard)")
+    args = parser.parse_args()
+
+    runs = []
+    for n_lycees, n_years, n_deps in product(args.lycees, args.years, args.departements):
+        run = run_config(n_lycees, n_years, n_deps, args.repeat, args.seed, args.formations, args.chunksize)
+        runs.append(run)
+        print(f"\n=== {n_lycees} lycées × {args.formations} formations × {n_years} années × {n_deps} départements ===")
+        for s in run["stages"]:
+            print(f"  {s['stage']:30s} {s['seconds'] * 1000:10.1f} ms  {s['peak_mb']:9.2f} Mo  ({s['rows']} lignes)")
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "runs": runs,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n✓ Rapport : {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
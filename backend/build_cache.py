@@ -0,0 +1,93 @@
+"""
+Cache de construction incrémentale (empreintes SHA-256 du contenu).
+
+Conserve dans .cache/<nom>.json :
+  - l'empreinte des entrées (fichiers sources + paramètres du modèle),
+  - une entrée calculée par clé (ex. par lycée) avec l'empreinte qui l'a produite,
+  - l'empreinte des fichiers de sortie écrits.
+
+Un run dont les entrées n'ont pas changé s'arrête après le hachage des sources ;
+sinon seules les clés dont l'empreinte a changé sont recalculées, et les
+fichiers de sortie dont le contenu est identique ne sont pas réécrits.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+BASE = Path(__file__).parent.parent
+CACHE_DIR = BASE / ".cache"
+CACHE_VERSION = 1
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 du contenu d'un fichier (lu par blocs)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def digest(obj) -> str:
+    """SHA-256 d'un objet sérialisable en JSON (clés triées)."""
+    payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """Manifeste persistant des entrées, entrées calculées et sorties d'un script."""
+
+    def __init__(self, name: str, cache_dir: Path = CACHE_DIR):
+        self.path = cache_dir / f"{name}.json"
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        if state.get("version") != CACHE_VERSION:
+            state = {}
+        self.inputs = state.get("inputs")
+        self.entries = state.get("entries", {})
+        self.outputs = state.get("outputs", {})
+        self._seen = set()
+        self._written = {}
+
+    def is_fresh(self, inputs_key: str) -> bool:
+        """Vrai si les entrées sont inchangées et toutes les sorties du dernier run intactes."""
+        if self.inputs != inputs_key or not self.outputs:
+            return False
+        return all(Path(p).exists() and file_hash(Path(p)) == h for p, h in self.outputs.items())
+
+    def get(self, name: str, key: str):
+        """Valeur mise en cache pour `name` si elle a été produite avec l'empreinte `key`."""
+        self._seen.add(name)
+        entry = self.entries.get(name)
+        if entry is not None and entry["key"] == key:
+            return entry["value"]
+        return None
+
+    def put(self, name: str, key: str, value) -> None:
+        self._seen.add(name)
+        self.entries[name] = {"key": key, "value": value}
+
+    def write_bytes(self, path: Path, data: bytes) -> bool:
+        """Écrit `data` seulement si le contenu diffère. Retourne True si le fichier a été réécrit."""
+        new_hash = hashlib.sha256(data).hexdigest()
+        self._written[str(path)] = new_hash
+        if path.exists() and file_hash(path) == new_hash:
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return True
+
+    def write_text(self, path: Path, text: str) -> bool:
+        return self.write_bytes(path, text.encode("utf-8"))
+
+    def save(self, inputs_key: str) -> None:
+        """Enregistre le manifeste ; les entrées et sorties absentes de ce run sont purgées."""
+        self.inputs = inputs_key
+        self.outputs = self._written
+        self.entries = {k: v for k, v in self.entries.items() if k in self._seen}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        state = {"version": CACHE_VERSION, "inputs": self.inputs, "entries": self.entries, "outputs": self.outputs}
+        self.path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Bassins de recrutement : population 15-19 ans des communes rattachée aux lycées.
+
+Les centroïdes des communes sont rattachés aux lycées par un index spatial
+(sklearn BallTree, distance haversine), jamais par un balayage lycées × communes :
+  - mode "knn" : chaque commune est rattachée à ses k lycées les plus proches,
+    sa population étant répartie à parts égales (k=1 : lycée le plus proche) ;
+  - mode "radius" : chaque lycée reçoit la population de toutes les communes
+    à moins de radius_km (les bassins peuvent se chevaucher).
+
+Entrée : CSV long annee | code_commune | lat | lng | population_15_19.
+Sortie : table longue annee | lycee_raw | population_15_19, utilisable à la place
+de la population départementale (generate_api_data.py --catchment).
+
+Usage : python catchment.py communes.csv --mode knn --k 2 --output pop_bassins.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+CATCHMENT_MODES = ("knn", "radius")
+
+
+def read_communes(path: Path) -> pd.DataFrame:
+    """Charge la population des communes (annee | code_commune | lat | lng | population_15_19)."""
+    df = pd.read_csv(path, dtype={"code_commune": str})
+    missing = {"annee", "code_commune", "lat", "lng", "population_15_19"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans {path.name} : {sorted(missing)}")
+    df["code_commune"] = df["code_commune"].str.strip()
+    return df
+
+
+def _radians(coords) -> np.ndarray:
+    """(n, 2) [lat, lng] en degrés → radians (convention BallTree haversine)."""
+    return np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+
+
+def assign_communes(
+    commune_coords,
+    lycee_coords,
+    mode: str = "knn",
+    k: int = 1,
+    radius_km: float = 30.0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Rattachement communes → lycées, sous forme creuse.
+
+    Returns:
+        (commune_idx, lycee_idx, poids) : la commune commune_idx[j] compte pour
+        poids[j] de sa population dans le bassin du lycée lycee_idx[j].
+    """
+    from sklearn.neighbors import BallTree
+
+    communes = _radians(commune_coords)
+    lycees = _radians(lycee_coords)
+    if mode == "knn":
+        k = min(k, len(lycees))
+        _, ind = BallTree(lycees, metric="haversine").query(communes, k=k)
+        return np.repeat(np.arange(len(communes)), k), ind.ravel(), np.full(ind.size, 1.0 / k)
+    if mode == "radius":
+        ind = BallTree(communes, metric="haversine").query_radius(lycees, r=radius_km / EARTH_RADIUS_KM)
+        counts = np.fromiter((len(i) for i in ind), dtype=np.int64, count=len(ind))
+        commune_idx = np.concatenate(ind) if len(ind) else np.empty(0, dtype=np.int64)
+        return commune_idx.astype(np.int64), np.repeat(np.arange(len(lycees)), counts), np.ones(counts.sum())
+    raise ValueError(f"Mode de bassin inconnu : {mode} (attendu : {', '.join(CATCHMENT_MODES)})")
+
+
+def catchment_population(
+    communes: pd.DataFrame,
+    lycee_coords: dict[str, tuple[float, float]],
+    mode: str = "knn",
+    k: int = 1,
+    radius_km: float = 30.0,
+) -> pd.DataFrame:
+    """
+    Population 15-19 ans du bassin de chaque lycée, pour chaque année des communes.
+
+    Returns:
+        Table longue triée : annee | lycee_raw | population_15_19 (NaN pour un lycée
+        auquel aucune commune n'est rattachée : bassin vide, pas une population nulle).
+    """
+    wide = communes.pivot_table(index="code_commune", columns="annee", values="population_15_19", aggfunc="sum")
+    coords = communes.drop_duplicates("code_commune").set_index("code_commune").loc[wide.index, ["lat", "lng"]]
+    lycees = list(lycee_coords)
+    commune_idx, lycee_idx, poids = assign_communes(
+        coords.to_numpy(), [lycee_coords[l] for l in lycees], mode, k, radius_km,
+    )
+
+    values = np.nan_to_num(wide.to_numpy(dtype=float))[commune_idx] * poids[:, None]  # (rattachements, années)
+    bassins = np.stack(
+        [np.bincount(lycee_idx, weights=values[:, j], minlength=len(lycees)) for j in range(values.shape[1])],
+        axis=1,
+    )  # (lycées, années)
+    bassins[np.bincount(lycee_idx, minlength=len(lycees)) == 0] = np.nan
+
+    years = wide.columns.to_numpy()
+    return pd.DataFrame({
+        "annee": np.tile(years, len(lycees)),
+        "lycee_raw": np.repeat(lycees, len(years)),
+        "population_15_19": np.round(bassins.ravel(), 2),
+    })
+
+
+def main() -> None:
+    from generate_api_data import COORDS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("communes", type=Path, help="CSV annee | code_commune | lat | lng | population_15_19")
+    parser.add_argument("--mode", choices=CATCHMENT_MODES, default="knn")
+    parser.add_argument("--k", type=int, default=1, help="lycées les plus proches par commune (mode knn)")
+    parser.add_argument("--radius-km", type=float, default=30.0, help="rayon du bassin (mode radius)")
+    parser.add_argument("--output", type=Path, help="CSV annee | lycee_raw | population_15_19")
+    args = parser.parse_args()
+
+    communes = read_communes(args.communes)
+    bassins = catchment_population(communes, COORDS, args.mode, args.k, args.radius_km)
+    print(f"✓ {communes['code_commune'].nunique()} communes rattachées à {len(COORDS)} lycées ({args.mode})")
+    if args.output:
+        bassins.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"  Bassins : {args.output}")
+    else:
+        print(bassins.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
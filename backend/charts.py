@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Graphiques de projection par lycée pour tout le réseau (images/lycees/<id>.png).
+
+Les séries sont lues dans les exports de generate_api_data.py (lycees_data.json,
+ou lycees_index.json + lycees/<id>.json en mode fragmenté). Pour chaque lycée :
+  - empreinte de la série (historique, projection, style du graphique),
+  - PNG ignoré si l'empreinte est celle du dernier rendu et le fichier présent,
+  - sinon rendu dans un pool de processus ; chaque processus construit une seule
+    figure modèle (axes, lignes, repère 2025/2026) et n'en met à jour que les données.
+
+Usage : python charts.py [--force] [--workers N] [--ids ancenis evron ...]
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")  # Backend non-interactif pour exécution en script
+import matplotlib.pyplot as plt
+
+from build_cache import BASE, BuildCache, digest
+from instrumentation import add_trace_argument, setup_tracing, stage
+
+OUTPUT_DIR = BASE / "frontend" / "public" / "data"
+CHARTS_DIR = BASE / "images" / "lycees"
+
+# Toute modification du rendu doit changer CHART_STYLE (invalide les PNG existants)
+CHART_STYLE = {"version": 1, "figsize": (9, 5), "dpi": 100, "years": (2018, 2028)}
+
+_TEMPLATE = None
+
+
+def load_series(output_dir: Path = OUTPUT_DIR) -> dict[str, dict]:
+    """Entrées lycée (lycee, metrics, series) depuis l'export monolithique ou fragmenté."""
+    data_path = output_dir / "lycees_data.json"
+    if data_path.exists():
+        return json.loads(data_path.read_text(encoding="utf-8"))
+    index_path = output_dir / "lycees_index.json"
+    if not index_path.exists():
+        raise FileNotFoundError(f"Aucun export dans {output_dir} : lancer generate_api_data.py")
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    return {
+        lid: json.loads((output_dir / entry["file"]).read_text(encoding="utf-8"))
+        for lid, entry in index["lycees"].items()
+    }
+
+
+def chart_key(entry: dict) -> str:
+    """Empreinte de ce qui est dessiné pour un lycée."""
+    return digest({"style": CHART_STYLE, "name": entry["lycee"]["name"], "series": entry["series"]})
+
+
+class ChartTemplate:
+    """Figure construite une fois ; seules les données des lignes et le titre changent entre lycées."""
+
+    def __init__(self):
+        y0, y1 = CHART_STYLE["years"]
+        self.fig, self.ax = plt.subplots(figsize=CHART_STYLE["figsize"])
+        ax = self.ax
+        (self.hist,) = ax.plot([], [], "o-", label="Historique", linewidth=2, markersize=7)
+        (self.proj,) = ax.plot([], [], "o--", label="Projection", linewidth=2, markersize=6, alpha=0.8)
+        ax.axvline(2025.5, color="gray", linestyle=":", alpha=0.5)
+        ax.set_xlabel("Année")
+        ax.set_ylabel("Effectifs")
+        ax.set_xlim(y0 - 0.5, y1 + 0.5)
+        ax.set_xticks(range(y0, y1 + 1))
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc="best")
+        ax.set_title(" ")  # réserve la place du titre pour tight_layout
+        self.fig.tight_layout()
+
+    def render(self, entry: dict, path: Path) -> None:
+        series = entry["series"]
+        hist = [s for s in series if s["actual"] is not None]
+        # La projection part du dernier point observé pour une courbe continue
+        proj = hist[-1:] + [s for s in series if s["actual"] is None]
+        self.hist.set_data([s["year"] for s in hist], [s["actual"] for s in hist])
+        self.proj.set_data([s["year"] for s in proj], [s.get("baseline", s["actual"]) for s in proj])
+        values = [s["actual"] for s in hist] + [s["baseline"] for s in proj]
+        low, high = min(values), max(values)
+        margin = max(5, 0.1 * (high - low))
+        self.ax.set_ylim(max(0, low - margin), high + margin)
+        self.ax.set_title(f"{entry['lycee']['name']} — effectifs {CHART_STYLE['years'][0]}-{CHART_STYLE['years'][1]}")
+        self.fig.savefig(path, dpi=CHART_STYLE["dpi"])
+
+
+def _render_batch(batch: list[tuple[dict, str]]) -> int:
+    """Rendu d'un lot de (entrée, chemin) avec la figure modèle du processus."""
+    global _TEMPLATE
+    if _TEMPLATE is None:
+        _TEMPLATE = ChartTemplate()
+    for entry, path in batch:
+        _TEMPLATE.render(entry, Path(path))
+    return len(batch)
+
+
+def render_charts(
+    entries: dict[str, dict],
+    charts_dir: Path = CHARTS_DIR,
+    force: bool = False,
+    max_workers: int | None = None,
+    only: set[str] | None = None,
+) -> tuple[int, int]:
+    """
+    Produit un PNG par lycée, en ne redessinant que les séries modifiées.
+    `only` limite le rendu à certains lycées (les autres PNG sont conservés).
+    Retourne (nombre de PNG rendus, nombre de PNG ignorés).
+    """
+    charts_dir.mkdir(parents=True, exist_ok=True)
+    cache = BuildCache("charts")
+    todo = []
+    for lid, entry in entries.items():
+        key = chart_key(entry)
+        path = charts_dir / f"{lid}.png"
+        fresh = cache.get(lid, key) is not None and path.exists()
+        if (only is not None and lid not in only) or (fresh and not force):
+            continue
+        cache.put(lid, key, path.name)
+        todo.append((entry, str(path)))
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(todo)))
+    batches = [todo[i::workers] for i in range(workers)]
+    if workers == 1:
+        rendered = sum(_render_batch(b) for b in batches)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = sum(pool.map(_render_batch, batches))
+
+    # PNG de lycées qui ne sont plus exportés
+    for png in charts_dir.glob("*.png"):
+        if png.stem not in entries:
+            png.unlink()
+    cache.save(digest(CHART_STYLE))
+    n_targets = len(entries) if only is None else len(only & entries.keys())
+    return rendered, n_targets - rendered
+
+
+def main(force: bool = False, max_workers: int | None = None, ids: list[str] | None = None) -> None:
+    with stage("load_series") as st:
+        entries = load_series()
+        st["rows"] = len(entries)
+    with stage("render_charts", rows=len(entries)):
+        rendered, skipped = render_charts(entries, force=force, max_workers=max_workers, only=set(ids) if ids else None)
+    print(f"✓ Graphiques dans {CHARTS_DIR}/ : {rendered} rendu(s), {skipped} inchangé(s)")
+
+
+def cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="redessine tous les PNG")
+    parser.add_argument("--workers", type=int, default=None, help="processus (défaut : nombre de cœurs)")
+    parser.add_argument("--ids", nargs="+", help="limite le rendu à ces lycées")
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    setup_tracing("charts", args.trace)
+    main(force=args.force, max_workers=args.workers, ids=args.ids)
+
+
+if __name__ == "__main__":
+    cli()
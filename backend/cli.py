@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Point d'entrée unique du backend, en sous-commandes :
+
+  indicators  indicateurs Evron / La Roche-sur-Yon (pandas seulement)
+  forecast    modèle Evron / La Roche : backtest 2024-2025, projection 2026-2028, scénario Evron
+  plot        graphiques de model_lycees dans images/ (--lycees : un PNG par lycée, charts.py)
+  backtest    backtest walk-forward du réseau (options de backtesting.py)
+  export      JSON du frontend (options de generate_api_data.py)
+  pipeline    étapes extraction → interpolation → export / graphiques, seules les périmées (pipeline.py)
+
+Chaque sous-commande n'importe que ce dont elle a besoin : sklearn n'est chargé
+que pour entraîner ou recharger un modèle, matplotlib que pour dessiner.
+`indicators` et un `export` dont les entrées sont inchangées démarrent sans eux.
+
+Usage : python cli.py <sous-commande> [options]   (python cli.py export --help, ...)
+"""
+
+import argparse
+import sys
+
+from instrumentation import add_trace_argument, setup_tracing
+
+
+def cmd_indicators(args) -> None:
+    from model_lycees import load_data, print_indicators
+
+    data = load_data(args.chunksize)
+    if data is not None:
+        print_indicators(*data)
+
+
+def cmd_forecast(args) -> None:
+    from model_lycees import load_data, run_model
+
+    data = load_data(args.chunksize)
+    if data is not None:
+        run_model(*data, retrain=args.retrain)
+
+
+def cmd_plot(args) -> None:
+    if args.lycees:
+        from charts import cli
+
+        cli(args.options)
+        return
+    from model_lycees import load_data, plot_effectifs_avec_projection, plot_overview, run_model
+
+    data = load_data(args.chunksize)
+    if data is None:
+        return
+    df, pop = data
+    plot_overview(df, pop)
+    proj, proj_evron_action = run_model(df, pop, retrain=args.retrain)
+    plot_effectifs_avec_projection(df, proj, proj_evron_action)
+
+
+def cmd_backtest(args) -> None:
+    from backtesting import main
+
+    main(args.options)
+
+
+def cmd_export(args) -> None:
+    from generate_api_data import cli
+
+    cli(args.options)
+
+
+def cmd_pipeline(args) -> None:
+    from pipeline import main
+
+    main(args.options)
+
+
+def add_chunksize_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--chunksize", type=int, metavar="N", help="lit les effectifs par blocs de N lignes (mémoire bornée)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True, metavar="<sous-commande>")
+
+    p = sub.add_parser("indicators", help="indicateurs Evron / La Roche")
+    add_chunksize_argument(p)
+    add_trace_argument(p)
+    p.set_defaults(func=cmd_indicators)
+
+    p = sub.add_parser("forecast", help="backtest + projection 2026-2028 Evron / La Roche")
+    p.add_argument("--retrain", action="store_true", help="réentraîne même si un modèle enregistré correspond")
+    add_chunksize_argument(p)
+    add_trace_argument(p)
+    p.set_defaults(func=cmd_forecast)
+
+    p = sub.add_parser("plot", help="graphiques (images/)")
+    p.add_argument("--retrain", action="store_true", help="réentraîne même si un modèle enregistré correspond")
+    p.add_argument("--lycees", action="store_true", help="un PNG par lycée (charts.py, options transmises)")
+    add_chunksize_argument(p)
+    add_trace_argument(p)
+    p.set_defaults(func=cmd_plot)
+
+    # Options transmises telles quelles au script (leur --help s'applique)
+    for name, func, help_text in (
+        ("backtest", cmd_backtest, "backtest walk-forward du réseau (backtesting.py)"),
+        ("export", cmd_export, "export JSON du frontend (generate_api_data.py)"),
+        ("pipeline", cmd_pipeline, "pipeline complet incrémental (pipeline.py)"),
+    ):
+        p = sub.add_parser(name, help=help_text, add_help=False)
+        p.set_defaults(func=func)
+    return parser
+
+
+FORWARDED = ("backtest", "export", "pipeline")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = build_parser()
+    args, args.options = parser.parse_known_args(argv)
+    if args.options and not (args.command in FORWARDED or getattr(args, "lycees", False)):
+        parser.error(f"arguments non reconnus : {' '.join(args.options)}")
+    if hasattr(args, "trace"):  # backtest / export : options (et --trace) gérées par le script
+        setup_tracing(f"cli_{args.command}", args.trace)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
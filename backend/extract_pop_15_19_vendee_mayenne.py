@@ -12,12 +12,19 @@ Lycées et départements :
   - Vendée (85): LA ROCHE SUR YON
 """
 
+import json
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from build_cache import CACHE_DIR, file_hash
+
 # Configuration
 DATA_DIR = Path(__file__).parent.parent / "data"
 FICHIER_EXCEL = DATA_DIR / "pop-sexe-age-quinquennal6822.xlsx"
+FEUILLES = ["DEP_2016", "DEP_2022"]
+LIGNE_ENTETE = 10
 OUTPUT_CSV = DATA_DIR / "pop_15_19_tous_lycees_2016_2022.csv"
 OUTPUT_EXCEL = DATA_DIR / "pop_15_19_tous_lycees_2016_2022.xlsx"
 
@@ -41,14 +48,76 @@ COLS_ID = [0, 1, 2]
 COLS_15_19 = [9, 10]
 
 
+# -----------------------------------------------------------------------------
+# Cache colonnaire du classeur INSEE (.npz par feuille)
+# -----------------------------------------------------------------------------
+
+
+def _cache_dir() -> Path:
+    return CACHE_DIR / "insee" / FICHIER_EXCEL.stem
+
+
+def _manifest_valide(manifest: dict, feuilles: list[str]) -> bool:
+    """Le cache couvre `feuilles` et correspond au classeur actuel (mtime/taille, sinon SHA-256)."""
+    if manifest.get("entete") != LIGNE_ENTETE or not set(feuilles) <= set(manifest.get("feuilles", [])):
+        return False
+    stat = FICHIER_EXCEL.stat()
+    if manifest.get("mtime_ns") == stat.st_mtime_ns and manifest.get("taille") == stat.st_size:
+        return True
+    if manifest.get("sha256") != file_hash(FICHIER_EXCEL):
+        return False
+    # Classeur touché mais contenu identique : on met simplement le mtime à jour
+    manifest.update(mtime_ns=stat.st_mtime_ns, taille=stat.st_size)
+    (_cache_dir() / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return True
+
+
+def convertir_classeur(feuilles: list[str]) -> None:
+    """Parse le classeur une seule fois (toutes les feuilles) et écrit une archive .npz par feuille."""
+    cache = _cache_dir()
+    cache.mkdir(parents=True, exist_ok=True)
+    stat = FICHIER_EXCEL.stat()
+    sheets = pd.read_excel(FICHIER_EXCEL, sheet_name=feuilles, header=LIGNE_ENTETE)
+    colonnes = {}
+    for feuille, df in sheets.items():
+        arrays = {}
+        for i, col in enumerate(df.columns):
+            serie = df.iloc[:, i]
+            if pd.api.types.is_numeric_dtype(serie):
+                arrays[f"c{i}"] = serie.to_numpy()
+            else:
+                arrays[f"c{i}"] = serie.fillna("").astype(str).to_numpy(dtype=str)
+        np.savez(cache / f"{feuille}.npz", **arrays)
+        colonnes[feuille] = [str(c) for c in df.columns]
+    manifest = {
+        "entete": LIGNE_ENTETE,
+        "feuilles": list(feuilles),
+        "colonnes": colonnes,
+        "mtime_ns": stat.st_mtime_ns,
+        "taille": stat.st_size,
+        "sha256": file_hash(FICHIER_EXCEL),
+    }
+    (cache / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+
+
+def charger_feuille(feuille: str) -> pd.DataFrame:
+    """Feuille du classeur INSEE, lue depuis le cache colonnaire (reconstruit si le classeur a changé)."""
+    manifest_path = _cache_dir() / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    if not _manifest_valide(manifest, [feuille]):
+        # Reconvertit les feuilles déjà demandées + la nouvelle, en une seule lecture du classeur
+        feuilles = FEUILLES + [f for f in manifest.get("feuilles", []) + [feuille] if f not in FEUILLES]
+        print(f"  Conversion du classeur {FICHIER_EXCEL.name} en cache colonnaire ({', '.join(feuilles)})...")
+        convertir_classeur(feuilles)
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    noms = manifest["colonnes"][feuille]
+    with np.load(_cache_dir() / f"{feuille}.npz") as npz:
+        return pd.DataFrame({i: npz[f"c{i}"] for i in range(len(noms))}).set_axis(noms, axis=1)
+
+
 def extraire_donnees(feuille: str, annee: str) -> pd.DataFrame:
     """Extrait la population totale 15-19 ans (H+F) pour les départements ciblés."""
-    df = pd.read_excel(
-        FICHIER_EXCEL,
-        sheet_name=feuille,
-        header=10,
-        usecols=COLS_ID + COLS_15_19,
-    )
+    df = charger_feuille(feuille).iloc[:, COLS_ID + COLS_15_19].copy()
     df.columns = ["Code_region", "Code_departement", "Departement", "Hommes_15_19", "Femmes_15_19"]
 
     # Filtrer les départements ciblés
@@ -67,8 +136,8 @@ def main():
 
     print(f"Extraction population 15-19 ans (2016 et 2022) pour {len(DEPTS)} départements : {', '.join(DEPTS)}...\n")
 
-    df_2016 = extraire_donnees("DEP_2016", "2016")
-    df_2022 = extraire_donnees("DEP_2022", "2022")
+    df_2016 = extraire_donnees(FEUILLES[0], "2016")
+    df_2022 = extraire_donnees(FEUILLES[1], "2022")
 
     if df_2016.empty or df_2022.empty:
         print("Aucune donnée extraite.")
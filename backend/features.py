@@ -0,0 +1,119 @@
+"""
+Feature store : séries par lycée matérialisées en matrices denses (lycées × années).
+
+Construit en une passe à partir du DataFrame long, puis toutes les features
+décalées sont des tranches de tableaux contigus :
+  - lag{k}_<col>     : valeur de l'année N-k
+  - delta{k}_<col>   : lag1 - lag{k+1} (dernière variation connue sur k ans)
+  - rollmean{w}_<col>: moyenne des w années précédentes (lag1 … lag{w})
+
+Les lags sont calendaires : une année manquante donne NaN au lieu de
+prendre silencieusement la ligne précédente. Le coût reste linéaire
+en nombre de lignes, quel que soit le nombre de lycées.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+_FEATURE_RE = re.compile(r"^(lag|delta|rollmean)(\d+)_(.+)$")
+
+
+class FeatureStore:
+    """Matrices (n_lycées × n_années) des colonnes numériques d'un DataFrame long."""
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        key: str = "lycee_raw",
+        columns: tuple[str, ...] = ("effectifs", "population_15_19"),
+        attrs: tuple[str, ...] = ("departement_code",),
+        max_lag: int = 3,
+    ):
+        self.key = key
+        key_codes, keys = pd.factorize(df[key], sort=True)
+        self.keys = np.asarray(keys)
+        annees = df["annee"].to_numpy(dtype=np.int64)
+        self.year0 = int(annees.min())
+        self.years = np.arange(self.year0, int(annees.max()) + 1)
+        shape = (len(self.keys), len(self.years))
+        y_idx = annees - self.year0
+
+        self.matrix = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            m = np.full(shape, np.nan)
+            m[key_codes, y_idx] = df[col].to_numpy(dtype=float)
+            self.matrix[col] = m
+
+        first = np.unique(key_codes, return_index=True)[1]  # première ligne de chaque clé
+        self.attrs = {col: df[col].to_numpy()[first] for col in attrs if col in df.columns}
+
+        # Pile des lags 0…K de chaque colonne : (K+1, n, T), contiguë
+        self._lags = {}
+        for col, m in self.matrix.items():
+            stack = np.full((max_lag + 1,) + shape, np.nan)
+            stack[0] = m
+            for k in range(1, max_lag + 1):
+                stack[k, :, k:] = m[:, :-k]
+            self._lags[col] = stack
+
+        anchor = self.matrix[columns[0]]
+        observed = ~np.isnan(anchor)
+        self._last_idx = np.where(observed.any(axis=1), shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+
+    def lag(self, k: int, col: str = "effectifs") -> np.ndarray:
+        """Matrice des valeurs de l'année N-k."""
+        stack = self._lags[col]
+        if k < len(stack):
+            return stack[k]
+        shifted = np.full(self.matrix[col].shape, np.nan)
+        if k < shifted.shape[1]:
+            shifted[:, k:] = self.matrix[col][:, :-k]
+        return shifted
+
+    def feature(self, name: str) -> np.ndarray:
+        """Matrice d'une feature nommée (lag{k}_<col>, delta{k}_<col>, rollmean{w}_<col>, ou <col>)."""
+        if name in self.matrix:
+            return self.matrix[name]
+        match = _FEATURE_RE.match(name)
+        if match is None:
+            raise KeyError(f"Feature inconnue : {name}")
+        kind, k, col = match.group(1), int(match.group(2)), match.group(3)
+        if kind == "lag":
+            return self.lag(k, col)
+        if kind == "delta":
+            return self.lag(1, col) - self.lag(k + 1, col)
+        lags = np.stack([self.lag(j, col) for j in range(1, k + 1)])
+        count = (~np.isnan(lags)).sum(axis=0)
+        total = np.nansum(lags, axis=0)
+        return np.divide(total, count, out=np.full(total.shape, np.nan), where=count > 0)
+
+    def at(self, name: str, keys, annees) -> np.ndarray:
+        """Valeurs d'une feature pour des couples (clé, année) arbitraires (NaN hors plage)."""
+        k_idx = pd.Index(self.keys).get_indexer(np.asarray(keys))
+        y_idx = np.asarray(annees, dtype=np.int64) - self.year0
+        valid = (k_idx >= 0) & (y_idx >= 0) & (y_idx < len(self.years))
+        out = np.full(len(k_idx), np.nan)
+        out[valid] = self.feature(name)[k_idx[valid], y_idx[valid]]
+        return out
+
+    def assign(self, df: pd.DataFrame, names: list[str]) -> pd.DataFrame:
+        """Ajoute les features `names` au DataFrame (aligné sur ses colonnes key/annee)."""
+        for name in names:
+            df[name] = self.at(name, df[self.key], df["annee"])
+        return df
+
+    def last(self, col: str = "effectifs") -> np.ndarray:
+        """Valeur de `col` à la dernière année observée de chaque clé."""
+        return self.matrix[col][np.arange(len(self.keys)), self._last_idx]
+
+    def attr(self, col: str) -> np.ndarray:
+        """Attribut constant par clé (ex. departement_code)."""
+        return self.attrs[col]
+
+    def positions(self, keys) -> np.ndarray:
+        """Indices des `keys` dans le store (pour réordonner)."""
+        return pd.Index(self.keys).get_indexer(np.asarray(keys))
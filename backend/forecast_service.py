@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Service de prévision résident (HTTP asyncio, TCP ou socket Unix).
+
+Charge une seule fois les effectifs, la population et le Ridge de
+generate_api_data.py, puis répond aux requêtes avec le moteur de projection
+récursive (projection.forecast_batch) sans réimporter pandas/sklearn :
+
+  GET  /health                               état du service et du cache
+  GET  /api/lycees/<id>/forecast?horizon=3    projection baseline
+  POST /api/lycees/<id>/simulate              {"delta_attractivite": 0.1, "horizon": 3}   (delta borné à [-0.20, 0.40])
+  GET  /api/backtest?origin=2023&horizons=1,2,3&alpha=1&lycee=<id>
+
+Les réponses sont conservées dans un cache LRU indexé par
+(route, lycée, horizon, paramètres de scénario).
+
+Usage : python forecast_service.py [--port 8765] [--socket /tmp/cneap.sock] [--model lycee]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from artifacts import ArtifactStore
+from backtesting import FEATURE_SETS, evaluate_origin, summarize
+from features import FeatureStore
+from generate_api_data import (
+    ARTIFACT_CODE,
+    ARTIFACT_STORE,
+    MODEL_GROUPS,
+    MODEL_PARAMS,
+    POP_CSV,
+    find_evolution_csv,
+    load_all_effectifs,
+    make_id,
+    prepare_all_data,
+    train_global_model,
+)
+from population import extrapolate_population, read_population
+from projection import forecast_batch, model_groups, pop_matrix
+
+MAX_HORIZON = 10
+CACHE_SIZE = 4096
+MAX_BODY = 1 << 16
+# Bornes de delta_attractivite, identiques à clampDelta (index.js)
+DELTA_MIN, DELTA_MAX = -0.20, 0.40
+
+
+class ServiceError(Exception):
+    """Erreur renvoyée au client avec un statut HTTP."""
+
+    def __init__(self, status: HTTPStatus, message: str, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class LRUCache:
+    """Cache LRU borné (OrderedDict) avec compteurs de hits / misses."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self.data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class ForecastService:
+    """Données, modèle et matrices de projection gardés en mémoire."""
+
+    def __init__(self, model_mode: str = "global", cache_size: int = CACHE_SIZE):
+        effectifs = load_all_effectifs(find_evolution_csv())
+        last_year = int(effectifs["annee"].max())
+        self.years = list(range(last_year + 1, last_year + MAX_HORIZON + 1))
+        pop = extrapolate_population(read_population(POP_CSV), years=range(2018, self.years[-1] + 1))
+        self.df = prepare_all_data(effectifs, pop)
+        self.model_mode = model_mode
+        self.model, self.feature_cols, self.mae, self.mape = train_global_model(
+            self.df, model_mode, artifacts=ArtifactStore(ARTIFACT_STORE, code=ARTIFACT_CODE),
+        )
+
+        store = FeatureStore(self.df, key="lycee_raw")
+        self.lycee_raw = store.keys
+        self.index = {make_id(raw): i for i, raw in enumerate(store.keys)}
+        self.lag1 = store.last("effectifs")
+        self.pop_vals = pop_matrix(pop, store.attr("departement_code"), self.years, fallback=store.last("population_15_19"))
+        self.groups = model_groups(self.model, store)
+        self.cache = LRUCache(cache_size)
+
+    def _position(self, lycee_id: str) -> int:
+        i = self.index.get(lycee_id)
+        if i is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, "Lycée non trouvé")
+        return i
+
+    def project(self, lycee_id: str, horizon: int, delta: float = 0.0) -> np.ndarray:
+        """Effectifs projetés (horizon,) d'un lycée, attractivité 1 + delta réinjectée chaque année."""
+        i = self._position(lycee_id)
+        return forecast_batch(
+            self.model,
+            self.feature_cols,
+            self.lag1[i:i + 1],
+            self.pop_vals[i:i + 1, :horizon],
+            self.years[:horizon],
+            scale=None if delta == 0 else np.array([1 + delta]),
+            groups=None if self.groups is None else self.groups[i:i + 1],
+        )[0]
+
+    def forecast(self, lycee_id: str, horizon: int) -> dict:
+        i = self._position(lycee_id)
+        preds = self.project(lycee_id, horizon)
+        return {
+            "lycee_id": lycee_id,
+            "horizon": horizon,
+            "model": self.model_mode,
+            "forecast": [
+                {"year": year, "baseline": int(pred), "population_15_19": float(pop_val)}
+                for year, pred, pop_val in zip(self.years, preds, self.pop_vals[i])
+            ],
+        }
+
+    def simulate(self, lycee_id: str, horizon: int, delta: float) -> dict:
+        baseline = self.project(lycee_id, horizon)
+        scenario = self.project(lycee_id, horizon, delta)
+        return {
+            "lycee_id": lycee_id,
+            "delta_attractivite": delta,
+            "horizon": horizon,
+            "scenario": [
+                {"year": year, "baseline": int(b), "scenario": int(s)}
+                for year, b, s in zip(self.years, baseline, scenario)
+            ],
+        }
+
+    def backtest(self, origin: int, horizons: tuple[int, ...], alpha: float, lycee_id: str | None) -> dict:
+        first, last = int(self.df["annee"].min()), self.years[0] - 1
+        if not first < origin < last:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"origin doit être compris entre {first + 1} et {last - 1}")
+        if lycee_id is not None:
+            self._position(lycee_id)
+        errors = evaluate_origin(self.df, origin, list(horizons), alpha, "base", FEATURE_SETS["base"])
+        if lycee_id is not None:
+            errors = errors[errors["lycee"] == self.lycee_raw[self._position(lycee_id)]]
+        summary = summarize(errors, by=("horizon",)) if not errors.empty else errors
+        return {
+            "origin": origin,
+            "alpha": alpha,
+            "lycee_id": lycee_id,
+            "horizons": [
+                {"horizon": int(r.horizon), "mae": round(float(r.mae), 2), "mape": round(float(r.mape), 2), "n": int(r.n)}
+                for r in summary.itertuples()
+            ],
+        }
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "lycees": len(self.index),
+            "model": self.model_mode,
+            "mae": round(self.mae, 2),
+            "mape": round(self.mape, 2),
+            "years": self.years,
+            "cache": self.cache.stats(),
+        }
+
+
+def _param(params: dict, name: str, cast, default):
+    """Paramètre de requête (query string ou corps JSON) converti, ServiceError 400 sinon."""
+    value = params.get(name, default)
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"Paramètre invalide : {name}") from None
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"Paramètre invalide : {name}")
+    return value
+
+
+def _horizon(params: dict) -> int:
+    horizon = _param(params, "horizon", int, 3)
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"horizon doit être compris entre 1 et {MAX_HORIZON}")
+    return horizon
+
+
+def _delta(params: dict) -> float:
+    """delta_attractivite (ou delta) borné à [DELTA_MIN, DELTA_MAX] comme côté Node."""
+    delta = _param(params, "delta_attractivite", float, params.get("delta", 0.0))
+    return round(min(DELTA_MAX, max(DELTA_MIN, delta)), 4)
+
+
+def _require(method: str, allowed: str) -> None:
+    if method != allowed:
+        raise ServiceError(HTTPStatus.METHOD_NOT_ALLOWED, f"Méthode {method} non autorisée", {"Allow": allowed})
+
+
+def _horizons(value) -> tuple[int, ...]:
+    """Liste d'horizons "1,2,3" (ou liste JSON) bornée à 1…MAX_HORIZON, vérifiée avant tout calcul."""
+    items = value if isinstance(value, list) else str(value).split(",")
+    if len(items) > MAX_HORIZON:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"horizons : au plus {MAX_HORIZON} valeurs")
+    horizons = tuple(sorted({int(h) for h in items}))
+    if not horizons or horizons[0] < 1 or horizons[-1] > MAX_HORIZON:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"horizons doivent être compris entre 1 et {MAX_HORIZON}")
+    return horizons
+
+
+class ForecastServer:
+    """Serveur HTTP/1.1 minimal (keep-alive) au-dessus d'asyncio.start_server."""
+
+    def __init__(self, service: ForecastService):
+        self.service = service
+
+    async def route(self, method: str, target: str, body: bytes) -> bytes:
+        """Corps JSON de la réponse (mis en cache LRU pour les routes de calcul)."""
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if body:
+            try:
+                params.update(json.loads(body))
+            except (json.JSONDecodeError, TypeError, ValueError):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Corps JSON invalide") from None
+        parts = [p for p in url.path.split("/") if p]
+        service = self.service
+
+        if parts == ["health"]:
+            _require(method, "GET")
+            return json.dumps(service.health()).encode()
+
+        if len(parts) == 4 and parts[:2] == ["api", "lycees"] and parts[3] in ("forecast", "simulate"):
+            lycee_id, action = parts[2], parts[3]
+            _require(method, "GET" if action == "forecast" else "POST")
+            horizon = _horizon(params)
+            if action == "forecast":
+                key = ("forecast", lycee_id, horizon)
+                compute = lambda: service.forecast(lycee_id, horizon)
+            else:
+                delta = _delta(params)
+                key = ("simulate", lycee_id, horizon, delta)
+                compute = lambda: service.simulate(lycee_id, horizon, delta)
+        elif parts == ["api", "backtest"]:
+            _require(method, "GET")
+            origin = _param(params, "origin", int, MODEL_PARAMS["train_max_year"])
+            horizons = _param(params, "horizons", _horizons, "1,2,3")
+            alpha = _param(params, "alpha", float, 1.0)
+            lycee_id = params.get("lycee")
+            key = ("backtest", lycee_id, horizons, origin, alpha)
+            compute = lambda: service.backtest(origin, horizons, alpha, lycee_id)
+            if alpha <= 0:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "alpha doit être positif")
+        else:
+            raise ServiceError(HTTPStatus.NOT_FOUND, "Route inconnue")
+
+        payload = service.cache.get(key)
+        if payload is None:
+            if key[0] == "backtest":
+                # Réentraînement : hors de la boucle pour ne pas bloquer les autres clients
+                result = await asyncio.get_running_loop().run_in_executor(None, compute)
+            else:
+                result = compute()
+            payload = json.dumps(result, ensure_ascii=False).encode()
+            service.cache.put(key, payload)
+        return payload
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive, extra = False, {}
+                try:
+                    try:
+                        request_line = await reader.readline()
+                        if not request_line.strip():
+                            break
+                        method, target, version = request_line.decode("latin-1").split()
+                        headers = {}
+                        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                            name, _, value = line.decode("latin-1").partition(":")
+                            headers[name.strip().lower()] = value.strip()
+                        length = int(headers.get("content-length") or 0)
+                        if length < 0:
+                            raise ValueError(length)
+                    except ValueError:
+                        # Ligne trop longue, requête ou Content-Length illisible : réponse puis fermeture
+                        raise ServiceError(HTTPStatus.BAD_REQUEST, "Requête HTTP mal formée") from None
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    if length > MAX_BODY:
+                        # Corps non lu : la réponse est envoyée puis la connexion fermée
+                        keep_alive = False
+                        raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corps trop volumineux")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = HTTPStatus.OK, await self.route(method.upper(), target, body)
+                except ServiceError as e:
+                    status, payload, extra = e.status, json.dumps({"error": str(e)}, ensure_ascii=False).encode(), e.headers
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    print(f"ERREUR: {method} {target} : {e!r}", file=sys.stderr)
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({"error": "Erreur interne"}).encode()
+
+                head = (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    + "".join(f"{name}: {value}\r\n" for name, value in extra.items())
+                    + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service: ForecastService, host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None) -> None:
+    server = ForecastServer(service)
+    if socket_path:
+        listener = await asyncio.start_unix_server(server.handle, path=socket_path)
+        where = f"unix:{socket_path}"
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        where = f"http://{host}:{port}"
+    print(f"✓ Service de prévision prêt sur {where} ({len(service.index)} lycées, modèle {service.model_mode})")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="socket Unix (remplace --host/--port)")
+    parser.add_argument("--model", choices=sorted(MODEL_GROUPS), default="global")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="entrées du cache LRU")
+    args = parser.parse_args()
+
+    print("Chargement des données et entraînement du modèle...")
+    service = ForecastService(args.model, args.cache_size)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        print("\nArrêt du service.")
+
+
+if __name__ == "__main__":
+    main()
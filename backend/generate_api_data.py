@@ -5,16 +5,53 @@ Entraîne un modèle Ridge sur TOUS les 22 lycées et projette 2026-2028.
 Produit : frontend/public/data/lycees_list.json + lycees_data.json
 """
 
+import argparse
+import hashlib
 import json
+import zlib
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from sklearn.linear_model import Ridge
+
+from artifacts import ArtifactStore, frame_hash
+from build_cache import BuildCache, digest, file_hash
+from catchment import CATCHMENT_MODES, catchment_population, read_communes
+from features import FeatureStore
+from ingestion import expand_paths, read_effectifs
+from instrumentation import add_trace_argument, setup_tracing, stage
+from model_search import SEARCH_METHODS, search_model
+from pipeline import local_modules
+from reconciliation import MINT_WEIGHTS, RECONCILE_METHODS, Hierarchy, aggregate_forecasts, reconcile
+from ridge_batch import StackedRidge
+from schema import compact
+from population import extrapolate_population, read_population
+from projection import (
+    DirectModel,
+    bootstrap_quantiles,
+    direct_fitted,
+    direct_quantiles,
+    direct_residuals,
+    direct_training_rows,
+    fit_direct,
+    forecast_batch,
+    forecast_direct,
+    forecast_scenarios,
+    model_groups,
+    pop_matrix,
+    predict,
+    training_features,
+)
 
 BASE = Path(__file__).parent.parent
 DATA_DIR = BASE / "data"
 POP_CSV = DATA_DIR / "pop_15_19_interpolee.csv"
 OUTPUT_DIR = BASE / "frontend" / "public" / "data"
+SHARD_DIR = OUTPUT_DIR / "lycees"
+INDEX_JSON = OUTPUT_DIR / "lycees_index.json"
+SCENARIOS_BIN = OUTPUT_DIR / "scenarios.bin"
+SCENARIOS_JSON = OUTPUT_DIR / "scenarios.json"
+HIERARCHY_JSON = OUTPUT_DIR / "hierarchy.json"
+LAYOUTS = ("monolithic", "sharded", "both")
 
 # Mapping lycée (clé CSV uppercase) → département
 LYCEE_DEP = {
@@ -57,7 +94,39 @@ COORDS = {
     "SABLE SUR SARTHE": (47.8400, -0.3300), "LA ROCHE SUR YON": (46.6700, -1.4300),
 }
 
+YEARS_PROJ = [2026, 2027, 2028]
+
+# Grille de simulation d'attractivité : -20 % à +40 % par pas de 1 point
+SCENARIO_DELTAS = [round(d / 100, 2) for d in range(-20, 41)]
+
+# Paramètres du modèle global (entrent dans l'empreinte du cache de construction)
+MODEL_PARAMS = {"alpha": 1.0, "train_max_year": 2023, "test_years": [2024, 2025]}
+
+# Magasin des modèles entraînés (artifacts.py), partagé avec forecast_service
+ARTIFACT_STORE = "ridge_global"
+# Modules dont dépend l'entraînement de train_global_model (empreinte du code des artefacts)
+ARTIFACT_CODE = [Path(__file__).parent / name for name in ("generate_api_data.py", "projection.py", "ridge_batch.py")]
+
+# Features du modèle par défaut (--search : choisies avec alpha par model_search.py)
+MODEL_FEATURES = ["annee", "lag1_effectifs", "population_15_19"]
+
+# Modes de modèle : un Ridge commun, ou un Ridge par lycée / par département (ridge_batch)
+MODEL_GROUPS = {"global": None, "lycee": "lycee_raw", "departement": "departement_code"}
+
+# Intervalles de prévision : bootstrap des résidus relatifs du modèle N+1, ou résidus de chaque
+# horizon en stratégie directe (percentiles exportés en p10/p50/p90)
+BOOTSTRAP = {"n_sims": 1000, "quantiles": [10, 50, 90], "seed": 42}
+INTERVAL_KEYS = [f"p{q}" for q in BOOTSTRAP["quantiles"]]
+
+# Stratégies de projection : récursive (un modèle N+1 réinjecté) ou directe (un modèle par horizon)
+STRATEGIES = ("recursive", "direct")
+
 DEP_NAMES = {"44": "Loire-Atlantique", "49": "Maine-et-Loire", "53": "Mayenne", "72": "Sarthe", "85": "Vendée"}
+REGION = "Pays de la Loire"
+
+# Hiérarchie de réconciliation (reconciliation.py), de la feuille au total régional
+HIERARCHY_LEVELS = ["lycee_raw", "departement_code", "region"]
+HIERARCHY_LEVEL_NAMES = {"lycee_raw": "lycee", "departement_code": "departement", "region": "region"}
 
 
 def find_evolution_csv() -> Path:
@@ -66,93 +135,355 @@ def find_evolution_csv() -> Path:
     return DATA_DIR / "evolution effectif de 2018 à 2025(1).xlsx - Feuil1.csv"
 
 
-def load_all_effectifs(path: Path) -> pd.DataFrame:
-    """Charge les effectifs de TOUS les lycées en format long."""
-    df = pd.read_csv(path, encoding="utf-8")
-    col_lycee = df.columns[0]
-    df = df.rename(columns={col_lycee: "lycee_raw"})
-    df["lycee_raw"] = df["lycee_raw"].str.strip().str.upper()
-    df = df[df["lycee_raw"] != "TOTAL"].copy()
-
-    year_cols = [c for c in df.columns if "Octobre" in str(c)]
-    df_long = df.melt(
-        id_vars=["lycee_raw"], value_vars=year_cols,
-        var_name="annee_str", value_name="effectifs_raw",
-    )
-    df_long["annee"] = df_long["annee_str"].str.extract(r"(\d{4})").astype(int)
-    df_long["effectifs"] = (
-        df_long["effectifs_raw"].astype(str)
-        .str.replace(" ", "").str.replace("\u202f", "").astype(float)
-    )
-    df_long["departement_code"] = df_long["lycee_raw"].map(LYCEE_DEP)
-    df_long = df_long.dropna(subset=["departement_code"])
-    return df_long[["annee", "lycee_raw", "departement_code", "effectifs"]].drop_duplicates()
+def load_all_effectifs(
+    paths: Path | list[Path], lycee_dep: dict[str, str] | None = None, chunksize: int | None = None,
+) -> pd.DataFrame:
+    """
+    Charge les effectifs de TOUS les lycées en format long (lycee_dep : défaut LYCEE_DEP).
+    `paths` : un ou plusieurs exports CSV/XLSX (ou dossiers), fusionnés par année (voir ingestion.py).
+    `chunksize` : lecture par blocs de ce nombre de lignes, agrégés au fil de l'eau (mémoire bornée).
+    """
+    df = read_effectifs(paths, chunksize=chunksize)
+    df["departement_code"] = df["lycee_raw"].map(LYCEE_DEP if lycee_dep is None else lycee_dep)
+    df = df.dropna(subset=["departement_code"])
+    return compact(df[["annee", "lycee_raw", "departement_code", "effectifs"]])
 
 
 def load_and_extrapolate_pop(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df["code_departement"] = df["code_departement"].astype(str).str.strip()
-    extrap = []
-    for code, grp in df.groupby("code_departement"):
-        grp = grp.sort_values("annee")
-        pop_2018 = grp[grp["annee"] == 2018]["population_15_19"].values[0]
-        pop_2022 = grp[grp["annee"] == 2022]["population_15_19"].values[0]
-        pente = (pop_2022 - pop_2018) / 4
-        for annee in range(2018, 2029):
-            pop = grp[grp["annee"] == annee]["population_15_19"].values[0] if annee <= 2022 else pop_2022 + pente * (annee - 2022)
-            extrap.append({"annee": annee, "code_departement": code, "population_15_19": round(pop, 2)})
-    return pd.DataFrame(extrap)
+    return extrapolate_population(read_population(path))
 
 
-def prepare_all_data(effectifs: pd.DataFrame, pop: pd.DataFrame) -> pd.DataFrame:
-    """Construit le DataFrame long avec population et lag."""
-    df = effectifs.merge(pop, left_on=["annee", "departement_code"], right_on=["annee", "code_departement"], how="left")
-    df = df[["annee", "lycee_raw", "departement_code", "effectifs", "population_15_19"]].copy()
-    df["taux_captation"] = df["effectifs"] / df["population_15_19"]
-    df = df.sort_values(["lycee_raw", "annee"])
-    df["lag1_effectifs"] = df.groupby("lycee_raw")["effectifs"].shift(1)
-    return df
+def load_catchment_pop(
+    path: Path, mode: str = "knn", k: int = 1, radius_km: float = 30.0, years=range(2018, 2029),
+) -> pd.DataFrame:
+    """
+    Population 15-19 ans du bassin de chaque lycée (communes rattachées par catchment.py),
+    prolongée par tendance linéaire entre la première et la dernière année des communes.
+    """
+    communes = read_communes(path)
+    annees = sorted(communes["annee"].unique())
+    if len(annees) < 2:
+        raise ValueError(
+            f"{path.name} : au moins deux années de population par commune sont nécessaires "
+            f"pour prolonger la tendance (trouvé : {', '.join(map(str, annees)) or 'aucune'})"
+        )
+    bassins = catchment_population(communes, COORDS, mode, k, radius_km)
+    return extrapolate_population(bassins, key="lycee_raw", years=years, base_years=(annees[0], annees[-1]))
+
+
+def fill_catchment_gaps(
+    bassins: pd.DataFrame, dep_pop: pd.DataFrame, lycees, lycee_dep: dict[str, str] | None = None,
+) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Population de bassin complétée par celle du département pour les lycées de `lycees`
+    sans bassin (pas de coordonnées, aucune commune rattachée). Retourne aussi ces lycées.
+    """
+    lycee_dep = LYCEE_DEP if lycee_dep is None else lycee_dep
+    covered = set(bassins.loc[bassins["population_15_19"].notna(), "lycee_raw"])
+    gaps = sorted(set(lycees) - covered)
+    if not gaps:
+        return bassins, gaps
+    fallback = pd.DataFrame({"lycee_raw": gaps, "code_departement": [lycee_dep.get(l) for l in gaps]}).merge(
+        dep_pop[["annee", "code_departement", "population_15_19"]], on="code_departement",
+    )
+    kept = bassins[~bassins["lycee_raw"].isin(gaps)]
+    filled = pd.concat([kept, fallback[["annee", "lycee_raw", "population_15_19"]]], ignore_index=True)
+    return filled.sort_values(["lycee_raw", "annee"], ignore_index=True), gaps
 
 
-def train_global_model(df: pd.DataFrame):
+def lycee_pop_matrix(pop: pd.DataFrame, store: FeatureStore, years: list[int]) -> np.ndarray:
+    """Population (lycées × années) : bassin du lycée si `pop` est par lycée, sinon son département."""
+    fallback = store.last("population_15_19")
+    if "lycee_raw" in pop.columns:
+        return pop_matrix(pop, store.keys, years, fallback=fallback, key_col="lycee_raw")
+    return pop_matrix(pop, store.attr("departement_code"), years, fallback=fallback)
+
+
+def prepare_all_data(effectifs: pd.DataFrame, pop: pd.DataFrame) -> pd.DataFrame:
+    """
+    Construit le DataFrame long avec population et lag (schéma compact, voir schema.py).
+    `pop` est par département (code_departement) ou par bassin de lycée (lycee_raw).
+    """
+    if "lycee_raw" in pop.columns:
+        df = effectifs.merge(pop.astype({"lycee_raw": str}), on=["annee", "lycee_raw"], how="left")
+    else:
+        df = effectifs.merge(pop, left_on=["annee", "departement_code"], right_on=["annee", "code_departement"], how="left")
+    # Population manquante ou nulle : taux indéfini (NaN), jamais infini
+    df["taux_captation"] = df["effectifs"] / df["population_15_19"].where(df["population_15_19"] > 0)
+    cols = ["annee", "lycee_raw", "departement_code", "effectifs", "population_15_19", "taux_captation"]
+    df = compact(df[cols]).sort_values(["lycee_raw", "annee"])
+    return FeatureStore(df, key="lycee_raw").assign(df, ["lag1_effectifs"])
+
+
+def train_global_model(
+    df: pd.DataFrame,
+    mode: str = "global",
+    feature_cols: list[str] | None = None,
+    alpha: float | None = None,
+    artifacts: ArtifactStore | None = None,
+):
     """
     Entraîne un Ridge sur TOUS les lycées.
-    Features : annee, lag1_effectifs, population_15_19 (pas de one-hot lycée pour généraliser).
+    Features : MODEL_FEATURES (pas de one-hot lycée pour généraliser) et alpha
+    MODEL_PARAMS["alpha"], sauf configuration choisie par model_search.
+
+    mode="lycee" / "departement" : un Ridge par lycée / par département, résolus
+    en bloc (ridge_batch.StackedRidge) au lieu d'un modèle commun.
+
+    artifacts : modèle rechargé sans entraînement si un artefact a la même empreinte
+    (données d'entraînement et de test, configuration), sinon entraîné puis enregistré.
     """
-    train = df[df["annee"] <= 2023].copy()
-    feature_cols = ["annee", "lag1_effectifs", "population_15_19"]
-    X = train[feature_cols].fillna(train["effectifs"].mean())
+    feature_cols = feature_cols or MODEL_FEATURES
+    alpha = MODEL_PARAMS["alpha"] if alpha is None else alpha
+    key = None
+    if artifacts is not None:
+        key = digest({
+            "mode": mode, "features": feature_cols, "alpha": alpha, "params": MODEL_PARAMS,
+            "data": frame_hash(df, ["annee", "lycee_raw", "departement_code", "effectifs", "lag1_effectifs", "population_15_19"]),
+        })
+        hit = artifacts.load(key)
+        if hit is not None:
+            model, meta = hit
+            return model, meta["feature_cols"], meta["metrics"]["mae"], meta["metrics"]["mape"]
+
+    train = df[df["annee"] <= MODEL_PARAMS["train_max_year"]]
+    fill = train["effectifs"].mean()
+    X = training_features(train, feature_cols, fill)
     y = train["effectifs"]
-    model = Ridge(alpha=1.0, random_state=42)
-    model.fit(X, y)
+    group_col = MODEL_GROUPS[mode]
+    if group_col is None:
+        from sklearn.linear_model import Ridge  # importé à l'entraînement seulement (export à jour sans sklearn)
+
+        model = Ridge(alpha=alpha, random_state=42)
+        model.fit(X, y)
+    else:
+        model = StackedRidge(alpha=alpha, group_col=group_col).fit(X, y, train[group_col])
 
-    test = df[df["annee"].isin([2024, 2025])].copy()
+    test = df[df["annee"].isin(MODEL_PARAMS["test_years"])]
     if not test.empty:
-        X_test = test[feature_cols].fillna(train["effectifs"].mean())
-        y_pred = model.predict(X_test)
+        X_test = training_features(test, feature_cols, fill)
+        y_pred = predict(model, X_test, None if group_col is None else test[group_col])
         y_true = test["effectifs"].values
         mae = float(np.mean(np.abs(y_true - y_pred)))
         mape = float(np.mean(np.abs((y_true - y_pred) / (y_true + 1e-8))) * 100)
     else:
         mae, mape = 0.0, 0.0
 
+    if artifacts is not None:
+        artifacts.save(key, model, {
+            "mode": mode, "alpha": alpha, "feature_cols": feature_cols, "fill": float(fill),
+            "train_window": [int(train["annee"].min()), int(train["annee"].max())],
+            "test_years": MODEL_PARAMS["test_years"], "metrics": {"mae": mae, "mape": mape},
+        })
     return model, feature_cols, mae, mape
 
 
+def train_direct_model(
+    df: pd.DataFrame, feature_cols: list[str], mode: str = "global", alpha: float | None = None,
+) -> DirectModel:
+    """
+    Stratégie directe : un Ridge par horizon de YEARS_PROJ (mêmes features, alpha et
+    années d'entraînement que le modèle global ; un Ridge par groupe selon `mode`).
+    """
+    alpha = MODEL_PARAMS["alpha"] if alpha is None else alpha
+    group_col = MODEL_GROUPS[mode]
+    if group_col is None:
+        from sklearn.linear_model import Ridge
+
+        make_model = lambda: Ridge(alpha=alpha, random_state=42)
+    else:
+        make_model = lambda: StackedRidge(alpha=alpha, group_col=group_col)
+    return fit_direct(
+        FeatureStore(df, key="lycee_raw"), feature_cols, range(1, len(YEARS_PROJ) + 1),
+        MODEL_PARAMS["train_max_year"], make_model, group_col=group_col,
+    )
+
+
+def direct_test_errors(model: DirectModel, feature_cols, df: pd.DataFrame) -> tuple[float, float]:
+    """
+    MAE / MAPE du modèle direct sur les années de test (MODEL_PARAMS["test_years"]) : chaque
+    horizon h prédit la cible depuis les effectifs observés en N = cible - h ; moyenne des horizons.
+    """
+    test_years = MODEL_PARAMS["test_years"]
+    store = FeatureStore(df, key="lycee_raw")
+    if not np.isin(store.years, test_years).any():
+        return 0.0, 0.0
+    errors = []
+    for h, X, y_true, groups, _ in direct_training_rows(
+        store, feature_cols, model.horizons, max(test_years), group_col=model.group_col, min_year=min(test_years),
+    ):
+        y_pred = predict(model.models[h], X, groups)
+        errors.append((np.mean(np.abs(y_true - y_pred)), np.mean(np.abs((y_true - y_pred) / (y_true + 1e-8))) * 100))
+    mae, mape = np.mean(errors, axis=0)
+    return float(mae), float(mape)
+
+
+def model_fingerprint(model, group=None) -> dict:
+    """
+    Coefficients du modèle (ou de chaque modèle par horizon) pour l'empreinte du cache. Modèle
+    par groupe et `group` donné : ceux de ce seul groupe, ou du Ridge commun qui le remplace
+    s'il n'a pas de ligne d'entraînement (StackedRidge.predict).
+    """
+    if isinstance(model, DirectModel):
+        return {str(h): model_fingerprint(m, group) for h, m in model.models.items()}
+    if isinstance(model, StackedRidge) and group is not None:
+        if group in model.groups_:
+            i = model.groups_.get_loc(group)
+            return {"coef": model.coef_[i].tolist(), "intercept": float(model.intercept_[i])}
+        return {"pooled_coef": model.pooled_coef_.tolist(), "pooled_intercept": float(model.pooled_intercept_)}
+    return {"coef": np.asarray(model.coef_).tolist(), "intercept": np.asarray(model.intercept_).tolist()}
+
+
+def forecast_all(model, feature_cols, df: pd.DataFrame, pop: pd.DataFrame, years: list[int]) -> dict[str, list[dict]]:
+    """
+    Projection de TOUS les lycées : un seul predict par année projetée (récursive),
+    ou un seul calcul pour tous les horizons si `model` est un DirectModel.
+    """
+    store = FeatureStore(df, key="lycee_raw")
+    pop_vals = lycee_pop_matrix(pop, store, years)
+    forecaster = forecast_direct if isinstance(model, DirectModel) else forecast_batch
+    preds = forecaster(model, feature_cols, store.last("effectifs"), pop_vals, years, groups=model_groups(model, store))
+    return {
+        lycee: [
+            {"year": annee, "baseline": int(pred), "population_15_19": float(pop_val)}
+            for annee, pred, pop_val in zip(years, preds[i], pop_vals[i])
+        ]
+        for i, lycee in enumerate(store.keys)
+    }
+
+
+def fitted_train(model, feature_cols, df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Lignes d'entraînement à lag1 observé, effectifs observés et ajustés du modèle N+1."""
+    train = df[(df["annee"] <= MODEL_PARAMS["train_max_year"]) & df["lag1_effectifs"].notna()]
+    X = training_features(train, feature_cols, train["effectifs"].mean())
+    group_col = getattr(model, "group_col", None)
+    fitted = predict(model, X, None if group_col is None else train[group_col])
+    return train, train["effectifs"].to_numpy(dtype=float), fitted
+
+
+def relative_residuals(model, feature_cols, df: pd.DataFrame) -> np.ndarray:
+    """Résidus relatifs y / ŷ - 1 du modèle N+1 sur les années d'entraînement (lag1 observé)."""
+    _, y, fitted = fitted_train(model, feature_cols, df)
+    ok = fitted > 0
+    return y[ok] / fitted[ok] - 1
+
+
+def residual_variance(model, feature_cols, df: pd.DataFrame, keys) -> np.ndarray:
+    """
+    Moyenne des carrés des résidus de chaque lycée de `keys` (NaN sans année d'entraînement) :
+    modèle N+1, ou modèles par horizon d'un DirectModel (lignes de tous les horizons).
+    """
+    if isinstance(model, DirectModel):
+        rows = list(direct_fitted(model, FeatureStore(df, key="lycee_raw"), feature_cols, MODEL_PARAMS["train_max_year"]))
+        lycees, y, fitted = (np.concatenate([r[i] for r in rows]) for i in (1, 2, 3))
+    else:
+        train, y, fitted = fitted_train(model, feature_cols, df)
+        lycees = np.asarray(train["lycee_raw"])
+    codes = pd.Index(keys).get_indexer(lycees)
+    counts = np.bincount(codes, minlength=len(keys))
+    return np.bincount(codes, weights=(y - fitted) ** 2, minlength=len(keys)) / np.where(counts > 0, counts, np.nan)
+
+
+def reconciliation_inputs(
+    df: pd.DataFrame, model, feature_cols, baselines: dict[str, list[int]],
+) -> tuple[Hierarchy, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hiérarchie lycée → département → région et prévisions de base de tous ses nœuds :
+    projections des lycées (`baselines`, produites par `model`), Ridge par nœud agrégé sur
+    sa série historique. Variances des lycées : résidus de `model` (N+1 ou par horizon).
+
+    Returns:
+        (hiérarchie, base n_nœuds × années projetées, variance des résidus par nœud,
+         historique des lycées n_lycées × années de df).
+    """
+    store = FeatureStore(df, key="lycee_raw")
+    leaves = pd.DataFrame({"lycee_raw": store.keys, "departement_code": store.attr("departement_code"), "region": REGION})
+    h = Hierarchy(leaves, HIERARCHY_LEVELS)
+    history = store.matrix["effectifs"]
+    agg_base, agg_variance = aggregate_forecasts(
+        h.aggregate(history)[:h.n_agg], store.years, YEARS_PROJ, MODEL_PARAMS["train_max_year"], MODEL_PARAMS["alpha"],
+    )
+    base = np.vstack([agg_base, np.array([baselines[lycee] for lycee in store.keys], dtype=float)])
+    variances = np.concatenate([agg_variance, residual_variance(model, feature_cols, df, store.keys)])
+    return h, base, variances, history
+
+
+def hierarchy_export(
+    h: Hierarchy, base: np.ndarray, reconciled: np.ndarray, history: np.ndarray, hist_years, settings: dict,
+) -> dict:
+    """Contenu de hierarchy.json : un nœud par lycée, département et région, parents compris."""
+    ids, names = [], []
+    for level, label in zip(h.level, h.labels):
+        if level == "lycee_raw":
+            ids.append(make_id(label)); names.append(LYCEE_DISPLAY.get(label, label.title()))
+        elif level == "departement_code":
+            ids.append(f"dep_{label}"); names.append(DEP_NAMES.get(label, label))
+        else:
+            ids.append(make_id(label)); names.append(label)
+    actual = h.aggregate(history)
+    nodes = [
+        {
+            "id": ids[i],
+            "name": names[i],
+            "level": HIERARCHY_LEVEL_NAMES[h.level[i]],
+            "parent": ids[h.parent[i]] if h.parent[i] >= 0 else None,
+            "actual": [None if np.isnan(v) else int(v) for v in actual[i]],
+            "base": [int(v) for v in base[i]],
+            "reconciled": [round(float(v), 1) for v in reconciled[i]],
+        }
+        for i in range(h.n_nodes)
+    ]
+    return {
+        "version": 1,
+        **settings,
+        "levels": [HIERARCHY_LEVEL_NAMES[level] for level in reversed(HIERARCHY_LEVELS)],
+        "history_years": [int(a) for a in hist_years],
+        "years": YEARS_PROJ,
+        "nodes": nodes,
+    }
+
+
+def interval_residuals(model, feature_cols, df: pd.DataFrame) -> np.ndarray | dict[int, np.ndarray]:
+    """Résidus relatifs du modèle qui produit la baseline : N+1 (récursif) ou par horizon (DirectModel)."""
+    if isinstance(model, DirectModel):
+        return direct_residuals(model, FeatureStore(df, key="lycee_raw"), feature_cols, MODEL_PARAMS["train_max_year"])
+    return relative_residuals(model, feature_cols, df)
+
+
+def residuals_fingerprint(residuals: np.ndarray | dict[int, np.ndarray]) -> str:
+    if isinstance(residuals, dict):
+        return digest({str(h): hashlib.sha256(r.tobytes()).hexdigest() for h, r in residuals.items()})
+    return hashlib.sha256(residuals.tobytes()).hexdigest()
+
+
+def forecast_intervals(
+    model, feature_cols, df: pd.DataFrame, pop: pd.DataFrame, years: list[int],
+    residuals: np.ndarray | dict[int, np.ndarray],
+) -> dict[str, list[dict]]:
+    """
+    Percentiles BOOTSTRAP["quantiles"] par lycée et année, autour de la baseline de `model` :
+    trajectoires récursives simulées (graine propre à chaque lycée, résultats identiques en
+    calcul complet ou incrémental), ou prévision directe × (1 + résidus de l'horizon).
+    """
+    store = FeatureStore(df, key="lycee_raw")
+    pop_vals = lycee_pop_matrix(pop, store, years)
+    if isinstance(model, DirectModel):
+        preds = forecast_direct(model, feature_cols, store.last("effectifs"), pop_vals, years, groups=model_groups(model, store))
+        q = direct_quantiles(preds, residuals, BOOTSTRAP["quantiles"])
+        q = np.round(q).astype(int).tolist()
+        return {lycee: [dict(zip(INTERVAL_KEYS, q_h)) for q_h in q[i]] for i, lycee in enumerate(store.keys)}
+    seeds = [[BOOTSTRAP["seed"], zlib.crc32(str(lycee).encode("utf-8"))] for lycee in store.keys]
+    q = bootstrap_quantiles(
+        model, feature_cols, store.last("effectifs"), pop_vals, years, residuals, seeds,
+        BOOTSTRAP["n_sims"], BOOTSTRAP["quantiles"], groups=model_groups(model, store),
+    )
+    q = np.round(q).astype(int).tolist()
+    return {lycee: [dict(zip(INTERVAL_KEYS, q_h)) for q_h in q[i]] for i, lycee in enumerate(store.keys)}
+
+
 def forecast_lycee(model, feature_cols, lycee_hist: pd.DataFrame, pop: pd.DataFrame, years: list[int]) -> list[dict]:
-    """Projection récursive pour un lycée."""
-    dep = lycee_hist["departement_code"].iloc[0]
-    last = lycee_hist.sort_values("annee").iloc[-1]
-    lag1 = last["effectifs"]
-    preds = []
-    for annee in years:
-        pop_rows = pop[(pop["code_departement"] == dep) & (pop["annee"] == annee)]
-        pop_val = pop_rows["population_15_19"].values[0] if not pop_rows.empty else last["population_15_19"]
-        X = pd.DataFrame([{"annee": annee, "lag1_effectifs": lag1, "population_15_19": pop_val}])
-        pred = max(0, round(model.predict(X[feature_cols])[0]))
-        preds.append({"year": annee, "baseline": pred, "population_15_19": pop_val})
-        lag1 = pred
-    return preds
+    """Projection (récursive ou directe selon `model`) pour un lycée."""
+    return next(iter(forecast_all(model, feature_cols, lycee_hist, pop, years).values()))
 
 
 def compute_metrics(lycee_hist: pd.DataFrame) -> dict:
@@ -163,8 +494,8 @@ def compute_metrics(lycee_hist: pd.DataFrame) -> dict:
     slope = float(np.polyfit(years, effs, 1)[0])
 
     tc = d["taux_captation"].dropna()
-    tc_first = tc.iloc[0] * 100 if len(tc) > 0 else 0
-    tc_last = tc.iloc[-1] * 100 if len(tc) > 0 else 0
+    tc_first = float(tc.iloc[0]) * 100 if len(tc) > 0 else 0
+    tc_last = float(tc.iloc[-1]) * 100 if len(tc) > 0 else 0
 
     return {
         "pente_annuelle": round(slope, 2),
@@ -180,92 +511,386 @@ def make_id(name: str) -> str:
     return name.lower().replace(" ", "_").replace("-", "_")
 
 
-def main():
+def build_lycee_entries(lycee_raw: str, lycee_hist: pd.DataFrame, projections: list[dict]) -> tuple[dict, dict]:
+    """Construit l'entrée de lycees_list.json et celle de lycees_data.json pour un lycée."""
+    lid = make_id(lycee_raw)
+    dep = LYCEE_DEP.get(lycee_raw, "44")
+    name = LYCEE_DISPLAY.get(lycee_raw, lycee_raw.title())
+    lat, lng = COORDS.get(lycee_raw, (47.2, -1.5))
+
+    # Métriques (MAPE renseigné globalement)
+    metrics = compute_metrics(lycee_hist)
+
+    # Séries historiques (2018-2025)
+    series = [
+        {"year": int(annee), "actual": int(eff), "baseline": int(eff), "scenario": int(eff)}
+        for annee, eff in zip(lycee_hist["annee"], lycee_hist["effectifs"])
+    ]
+
+    # Projections 2026-2028 (+ intervalles p10/p50/p90 si calculés)
+    for p in projections:
+        point = {
+            "year": p["year"],
+            "actual": None,
+            "baseline": int(p["baseline"]),
+            "scenario": int(p["baseline"]),
+        }
+        point.update({key: p[key] for key in INTERVAL_KEYS if key in p})
+        series.append(point)
+
+    list_entry = {
+        "id": lid,
+        "name": name,
+        "departement_code": dep,
+        "departement_nom": DEP_NAMES.get(dep, dep),
+        "region": REGION,
+        "lat": lat,
+        "lng": lng,
+        "hasRealData": True,
+        "effectif_actuel": int(lycee_hist["effectifs"].iloc[-1]),
+    }
+    data_entry = {
+        "lycee": {"id": lid, "name": name, "departement_code": dep, "lat": lat, "lng": lng},
+        "metrics": metrics,
+        "series": series,
+    }
+    return list_entry, data_entry
+
+
+def lycee_cache_key(model_key: str, coefs: dict, lycee_raw: str, lycee_hist: pd.DataFrame, pop_vals) -> str:
+    """
+    Empreinte de tout ce dont dépendent les sorties d'un lycée (hors MAPE global) : `coefs`
+    ne couvre que les coefficients qui le projettent (model_fingerprint de son groupe).
+    """
+    return digest({
+        "model": model_key,
+        "coefs": coefs,
+        "lycee": [lycee_raw, LYCEE_DEP.get(lycee_raw), LYCEE_DISPLAY.get(lycee_raw), COORDS.get(lycee_raw)],
+        "hist": lycee_hist[["annee", "effectifs", "population_15_19"]].to_numpy().tolist(),
+        "pop": [float(v) for v in pop_vals],
+    })
+
+
+def shard_index_entry(data_entry: dict, nbytes: int) -> dict:
+    """Entrée de lycees_index.json : fichier, taille et résumé (comparaison entre voisins)."""
+    lycee = data_entry["lycee"]
+    actual = [s for s in data_entry["series"] if s["actual"] is not None]
+    projected = [s for s in data_entry["series"] if s["actual"] is None]
+    return {
+        "file": f"{SHARD_DIR.name}/{lycee['id']}.json",
+        "bytes": nbytes,
+        "name": lycee["name"],
+        "departement_code": lycee["departement_code"],
+        "pente_annuelle": data_entry["metrics"]["pente_annuelle"],
+        "captation_2025": data_entry["metrics"]["captation_2025"],
+        "effectif_2025": actual[-1]["actual"] if actual else 0,
+        "baseline_2028": projected[-1]["baseline"] if projected else 0,
+    }
+
+
+def build_scenario_cube(
+    model, feature_cols, lycee_ids: list[str], lag1, pop_vals, groups=None, baseline: np.ndarray | None = None,
+) -> tuple[bytes, dict]:
+    """
+    Cube (lycée × année × delta) des effectifs simulés, re-projetés récursivement
+    pour chaque delta de SCENARIO_DELTAS. Retourne le binaire et son en-tête JSON.
+
+    baseline (lycée × année) : baseline publiée par un autre modèle (stratégie directe).
+    L'effet relatif de chaque delta sur la trajectoire récursive (cube[d] / cube[0]) lui est
+    appliqué, pour que la tranche delta = 0 reproduise la baseline et qu'un delta positif
+    ne passe jamais en dessous ; repli sur 1 + delta si la trajectoire récursive est nulle.
+    """
+    cube = forecast_scenarios(model, feature_cols, lag1, pop_vals, YEARS_PROJ, SCENARIO_DELTAS, groups)
+    if baseline is not None:
+        ref = cube[:, :, [SCENARIO_DELTAS.index(0.0)]]
+        ratio = np.broadcast_to(1 + np.asarray(SCENARIO_DELTAS), cube.shape).copy()
+        np.divide(cube, ref, out=ratio, where=ref > 0)
+        cube = np.maximum(0, np.round(np.asarray(baseline, dtype=float)[:, :, None] * ratio))
+    dtype = "uint16" if cube.max(initial=0) <= np.iinfo(np.uint16).max else "int32"
+    header = {
+        "version": 1,
+        "file": SCENARIOS_BIN.name,
+        "dtype": dtype,
+        "byteorder": "little",
+        "shape": list(cube.shape),
+        "order": ["lycee", "year", "delta"],
+        "strategy": "recursive" if baseline is None else "direct",
+        "lycees": lycee_ids,
+        "years": YEARS_PROJ,
+        "delta_min": SCENARIO_DELTAS[0],
+        "delta_step": 0.01,
+        "deltas": SCENARIO_DELTAS,
+    }
+    return cube.astype(f"<{'u2' if dtype == 'uint16' else 'i4'}").tobytes(order="C"), header
+
+
+def main(
+    force: bool = False,
+    layout: str = "monolithic",
+    model_mode: str = "global",
+    strategy: str = "recursive",
+    catchment: dict | None = None,
+    effectifs_paths: list[Path] | None = None,
+    search: str | None = None,
+    reconciliation: dict | None = None,
+    chunksize: int | None = None,
+):
     print("=== Génération des données API pour le frontend ===\n")
 
-    evo_csv = find_evolution_csv()
-    if not evo_csv.exists():
-        print(f"ERREUR: {evo_csv} introuvable"); return
+    evo_files = expand_paths(effectifs_paths or [find_evolution_csv()])
+    for path in evo_files:
+        if not path.exists():
+            print(f"ERREUR: {path} introuvable"); return
     if not POP_CSV.exists():
         print(f"ERREUR: {POP_CSV} introuvable"); return
 
-    effectifs = load_all_effectifs(evo_csv)
-    pop = load_and_extrapolate_pop(POP_CSV)
-    df = prepare_all_data(effectifs, pop)
+    list_path = OUTPUT_DIR / "lycees_list.json"
+    data_path = OUTPUT_DIR / "lycees_data.json"
+    sharded = layout in ("sharded", "both")
+    monolithic = layout in ("monolithic", "both")
+    cache = BuildCache("generate_api_data")
+    # Code du script et des modules de backend/ qu'il importe : une modification invalide tout
+    code_key = digest({path.name: file_hash(path) for path in local_modules(Path(__file__).resolve())})
+    inputs_key = digest({
+        "code": code_key,
+        "effectifs": [file_hash(path) for path in evo_files],
+        "population": file_hash(POP_CSV),
+        "catchment": catchment and {**catchment, "communes": file_hash(catchment["communes"])},
+        "model": MODEL_PARAMS,
+        "model_mode": model_mode,
+        "strategy": strategy,
+        "search": search,
+        "years": YEARS_PROJ,
+        "deltas": SCENARIO_DELTAS,
+        "bootstrap": BOOTSTRAP,
+        "layout": layout,
+        "reconciliation": reconciliation,
+    })
+    if not force and cache.is_fresh(inputs_key):
+        print("  Entrées, code et paramètres inchangés — sorties à jour (--force pour tout régénérer).")
+        return
+
+    with stage("load_all_effectifs") as st:
+        effectifs = load_all_effectifs(evo_files, chunksize=chunksize)
+        st["rows"] = len(effectifs)
+    with stage("load_and_extrapolate_pop") as st:
+        if catchment:
+            bassins = load_catchment_pop(catchment["communes"], catchment["mode"], catchment["k"], catchment["radius_km"])
+            pop, gaps = fill_catchment_gaps(bassins, load_and_extrapolate_pop(POP_CSV), effectifs["lycee_raw"].unique())
+            if gaps:
+                print(f"  ATTENTION : bassin vide ou sans coordonnées, population du département utilisée : {', '.join(gaps)}")
+        else:
+            pop = load_and_extrapolate_pop(POP_CSV)
+        st["rows"] = len(pop)
+    with stage("prepare_all_data") as st:
+        df = prepare_all_data(effectifs, pop)
+        st["rows"] = len(df)
 
     print(f"  Lycées chargés : {df['lycee_raw'].nunique()}")
     print(f"  Années : {df['annee'].min()} → {df['annee'].max()}")
 
-    model, feature_cols, global_mae, global_mape = train_global_model(df)
-    print(f"  Modèle Ridge global — MAE: {global_mae:.1f}, MAPE: {global_mape:.1f}%")
-
-    lycees_list = []
-    lycees_data = {}
-
-    for lycee_raw in sorted(df["lycee_raw"].unique()):
-        lid = make_id(lycee_raw)
-        dep = LYCEE_DEP.get(lycee_raw, "44")
-        name = LYCEE_DISPLAY.get(lycee_raw, lycee_raw.title())
-        lat, lng = COORDS.get(lycee_raw, (47.2, -1.5))
-
-        lycee_hist = df[df["lycee_raw"] == lycee_raw].copy()
-
-        # Métriques
-        metrics = compute_metrics(lycee_hist)
-        metrics["mape"] = round(global_mape, 1)
-
-        # Séries historiques (2018-2025)
-        series = []
-        for _, row in lycee_hist.sort_values("annee").iterrows():
-            series.append({
-                "year": int(row["annee"]),
-                "actual": int(row["effectifs"]),
-                "baseline": int(row["effectifs"]),
-                "scenario": int(row["effectifs"]),
-            })
-
-        # Projections 2026-2028
-        projections = forecast_lycee(model, feature_cols, lycee_hist, pop, [2026, 2027, 2028])
-        for p in projections:
-            series.append({
-                "year": p["year"],
-                "actual": None,
-                "baseline": int(p["baseline"]),
-                "scenario": int(p["baseline"]),
-            })
-
-        lycees_list.append({
-            "id": lid,
-            "name": name,
-            "departement_code": dep,
-            "departement_nom": DEP_NAMES.get(dep, dep),
-            "region": "Pays de la Loire",
-            "lat": lat,
-            "lng": lng,
-            "hasRealData": True,
-            "effectif_actuel": int(lycee_hist[lycee_hist["annee"] == lycee_hist["annee"].max()]["effectifs"].values[0]),
-        })
-
-        lycees_data[lid] = {
-            "lycee": {"id": lid, "name": name, "departement_code": dep, "lat": lat, "lng": lng},
-            "metrics": metrics,
-            "series": series,
-        }
-
-        eff_last = int(lycee_hist.sort_values("annee").iloc[-1]["effectifs"])
-        proj_last = projections[-1]["baseline"] if projections else eff_last
-        print(f"  {name:35s}  {eff_last} (2025) → {proj_last} (2028)  pente={metrics['pente_annuelle']:+.1f}")
+    feature_cols, alpha = MODEL_FEATURES, MODEL_PARAMS["alpha"]
+    if search:
+        with stage("model_search", rows=len(df)):
+            best, _ = search_model(df, search, MODEL_PARAMS["train_max_year"], MODEL_GROUPS[model_mode], strategy)
+        feature_cols, alpha = best["feature_cols"], best["alpha"]
+        print(f"  Recherche {search} : {best['feature_set']}, alpha={alpha:g} (MAE {best['mae']:.1f})")
+    with stage("train_global_model", rows=len(df)):
+        model, feature_cols, global_mae, global_mape = train_global_model(
+            df, model_mode, feature_cols, alpha, artifacts=ArtifactStore(ARTIFACT_STORE, refresh=force, code=ARTIFACT_CODE),
+        )
+    label = "global" if model_mode == "global" else f"par {model_mode}"
+    print(f"  Modèle Ridge {label}{' N+1 (scénarios)' if strategy == 'direct' else ''} — "
+          f"MAE: {global_mae:.1f}, MAPE: {global_mape:.1f}%")
+    # Le cube de scénarios reste récursif (1 + delta réinjecté chaque année) ; en stratégie
+    # directe, son effet relatif est appliqué à la baseline directe (build_scenario_cube)
+    forecaster = model
+    if strategy == "direct":
+        with stage("train_direct_model", rows=len(df)):
+            forecaster = train_direct_model(df, feature_cols, model_mode, alpha)
+            global_mae, global_mape = direct_test_errors(forecaster, feature_cols, df)
+        print(f"  Stratégie directe : un modèle par horizon {forecaster.horizons} — "
+              f"MAE: {global_mae:.1f}, MAPE: {global_mape:.1f}% (années de test, moyenne des horizons)")
+    # Le pool de résidus est commun à tous les lycées (intervalles) : il entre dans l'empreinte
+    # partagée ; les coefficients, eux, n'entrent que dans celle des lycées qu'ils projettent
+    residuals = interval_residuals(forecaster, feature_cols, df)
+    model_key = digest({
+        "code": code_key,
+        "mode": model_mode,
+        "strategy": strategy,
+        "features": feature_cols,
+        "bootstrap": BOOTSTRAP,
+        "residuals": residuals_fingerprint(residuals),
+    })
+
+    # Empreinte par lycée : seuls les lycées modifiés sont re-projetés
+    store = FeatureStore(df, key="lycee_raw")
+    groups = {lycee_raw: hist.sort_values("annee") for lycee_raw, hist in df.groupby("lycee_raw", sort=True, observed=True)}
+    pop_vals = lycee_pop_matrix(pop, store, YEARS_PROJ)
+    model_group = model_groups(forecaster, store)
+    shared_coefs = model_fingerprint(forecaster) if model_group is None else None
+    keys = {
+        lycee_raw: lycee_cache_key(
+            model_key, shared_coefs or model_fingerprint(forecaster, model_group[i]), lycee_raw, hist, pop_vals[i],
+        )
+        for i, (lycee_raw, hist) in enumerate(groups.items())
+    }
+    cached = {lycee_raw: None if force else cache.get(lycee_raw, key) for lycee_raw, key in keys.items()}
+    stale = [lycee_raw for lycee_raw, entry in cached.items() if entry is None]
+    with stage("forecast_all", rows=len(stale)):
+        all_projections = (
+            forecast_all(forecaster, feature_cols, df[df["lycee_raw"].isin(stale)], pop, YEARS_PROJ) if stale else {}
+        )
+    with stage("bootstrap_intervals", rows=len(stale) * BOOTSTRAP["n_sims"]):
+        try:
+            intervals = (
+                forecast_intervals(forecaster, feature_cols, df[df["lycee_raw"].isin(stale)], pop, YEARS_PROJ, residuals)
+                if stale else {}
+            )
+        except ValueError as e:
+            print(f"  ATTENTION : {e} — projections exportées sans p10/p50/p90")
+            intervals = {}
+    for lycee_raw, projections in all_projections.items():
+        for p, interval in zip(projections, intervals.get(lycee_raw, ())):
+            p.update(interval)
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_DIR / "lycees_list.json", "w", encoding="utf-8") as f:
-        json.dump(lycees_list, f, ensure_ascii=False, indent=2)
-    with open(OUTPUT_DIR / "lycees_data.json", "w", encoding="utf-8") as f:
-        json.dump(lycees_data, f, ensure_ascii=False, indent=2)
+    lycees_list = []
+    lycees_data = {}  # mode monolithique uniquement ; en mode sharded chaque lycée est écrit au fil de l'eau
+    shard_index = {}
+    shards_written = 0
+    baselines = {}  # projections de chaque lycée (cache compris), base de la réconciliation
+
+    with stage("build_lycees", rows=len(groups)):
+        for lycee_raw, lycee_hist in groups.items():
+            entry = cached[lycee_raw]
+            if entry is None:
+                list_entry, data_entry = build_lycee_entries(lycee_raw, lycee_hist, all_projections[lycee_raw])
+                cache.put(lycee_raw, keys[lycee_raw], {"list": list_entry, "data": data_entry})
+            else:
+                list_entry, data_entry = entry["list"], entry["data"]
+            data_entry["metrics"]["mape"] = round(global_mape, 1)
+
+            lycees_list.append(list_entry)
+            baselines[lycee_raw] = [point["baseline"] for point in data_entry["series"] if point["actual"] is None]
+            lid = list_entry["id"]
+            if monolithic:
+                lycees_data[lid] = data_entry
+            if sharded:
+                text = json.dumps(data_entry, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+                shards_written += cache.write_text(SHARD_DIR / f"{lid}.json", text)
+                shard_index[lid] = shard_index_entry(data_entry, len(text.encode("utf-8")))
+
+            name = list_entry["name"]
+            eff_last = list_entry["effectif_actuel"]
+            proj_last = data_entry["series"][-1]["baseline"]
+            print(f"  {name:35s}  {eff_last} (2025) → {proj_last} (2028)  pente={data_entry['metrics']['pente_annuelle']:+.1f}")
+
+    print(f"\n  Cache : {len(stale)} lycée(s) recalculé(s), {len(groups) - len(stale)} réutilisé(s)")
+
+    # Cube de scénarios : toutes les trajectoires recalculées d'un bloc (vectorisé)
+    with stage("build_scenario_cube", rows=len(lycees_list) * len(SCENARIO_DELTAS)):
+        cube_bytes, cube_header = build_scenario_cube(
+            model, feature_cols, [e["id"] for e in lycees_list], store.last("effectifs"), pop_vals,
+            model_groups(model, store), np.array(list(baselines.values())) if strategy == "direct" else None,
+        )
+    written_cube = cache.write_bytes(SCENARIOS_BIN, cube_bytes)
+    cache.write_text(SCENARIOS_JSON, json.dumps(cube_header, ensure_ascii=False, allow_nan=False))
+
+    # Réconciliation lycée → département → région : tous les nœuds et années en un calcul matriciel
+    if reconciliation:
+        with stage("reconcile", rows=len(groups)):
+            h, base, variances, history = reconciliation_inputs(df, forecaster, feature_cols, baselines)
+            reconciled = reconcile(h, base, reconciliation["method"], reconciliation["weights"], variances, history)
+            hierarchy = hierarchy_export(h, base, reconciled, history, store.years, reconciliation)
+        written_hierarchy = cache.write_text(HIERARCHY_JSON, json.dumps(hierarchy, ensure_ascii=False, indent=2, allow_nan=False))
+    elif HIERARCHY_JSON.exists():
+        # Des séries réconciliées d'un run précédent ne correspondraient plus aux projections
+        HIERARCHY_JSON.unlink()
+
+    with stage("export_json", rows=len(lycees_list)):
+        written_list = cache.write_text(list_path, json.dumps(lycees_list, ensure_ascii=False, indent=2, allow_nan=False))
+        if monolithic:
+            written_data = cache.write_text(data_path, json.dumps(lycees_data, ensure_ascii=False, indent=2, allow_nan=False))
+        if sharded:
+            index = {"version": 1, "lycees": shard_index}
+            written_index = cache.write_text(INDEX_JSON, json.dumps(index, ensure_ascii=False, separators=(",", ":"), allow_nan=False))
+            for stale_shard in SHARD_DIR.glob("*.json"):
+                if stale_shard.stem not in shard_index:
+                    stale_shard.unlink()
+        else:
+            # Index et shards d'un run sharded précédent seraient préférés par l'API : on les retire
+            INDEX_JSON.unlink(missing_ok=True)
+            for stale_shard in SHARD_DIR.glob("*.json"):
+                stale_shard.unlink()
+            if SHARD_DIR.is_dir() and not any(SHARD_DIR.iterdir()):
+                SHARD_DIR.rmdir()
+    cache.save(inputs_key)
 
     print(f"\n✓ {len(lycees_list)} lycées exportés dans {OUTPUT_DIR}/")
-    print(f"  - lycees_list.json ({len(lycees_list)} entrées)")
-    print(f"  - lycees_data.json ({len(lycees_data)} entrées)")
+    print(f"  - lycees_list.json ({len(lycees_list)} entrées){'' if written_list else ' — inchangé'}")
+    if monolithic:
+        print(f"  - lycees_data.json ({len(lycees_data)} entrées){'' if written_data else ' — inchangé'}")
+    if sharded:
+        print(f"  - {SHARD_DIR.name}/<id>.json ({len(shard_index)} fichiers, {shards_written} réécrits)")
+        print(f"  - {INDEX_JSON.name}{'' if written_index else ' — inchangé'}")
+    shape = " × ".join(str(d) for d in cube_header["shape"])
+    print(f"  - {SCENARIOS_BIN.name} + {SCENARIOS_JSON.name} (cube {shape}, {len(cube_bytes)} octets){'' if written_cube else ' — inchangé'}")
+    if reconciliation:
+        label = reconciliation["method"] + (f", {reconciliation['weights']}" if reconciliation["method"] == "mint" else "")
+        print(f"  - {HIERARCHY_JSON.name} ({h.n_nodes} nœuds, {label}){'' if written_hierarchy else ' — inchangé'}")
+
+
+def cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="ignore le cache (et les modèles enregistrés) et régénère tout")
+    parser.add_argument(
+        "--layout", choices=LAYOUTS, default="monolithic",
+        help="monolithic : lycees_data.json ; sharded : un fichier par lycée + lycees_index.json ; both : les deux",
+    )
+    parser.add_argument(
+        "--model", choices=sorted(MODEL_GROUPS), default="global",
+        help="global : un Ridge commun ; lycee / departement : un Ridge par lycée / département",
+    )
+    parser.add_argument(
+        "--strategy", choices=STRATEGIES, default="recursive",
+        help="recursive : prévision N+1 réinjectée ; direct : un modèle par horizon (baseline et intervalles ; effet des scénarios repris du récursif)",
+    )
+    parser.add_argument(
+        "--search", choices=SEARCH_METHODS,
+        help="choisit alpha et features du Ridge (loo : leave-one-out en forme close ; backtest : walk-forward)",
+    )
+    parser.add_argument(
+        "--reconcile", choices=RECONCILE_METHODS,
+        help="séries lycée / département / région cohérentes dans hierarchy.json (bottom_up, top_down, mint)",
+    )
+    parser.add_argument("--reconcile-weights", choices=MINT_WEIGHTS, default="wls_struct", help="pondération MinT")
+    parser.add_argument(
+        "--effectifs", type=Path, nargs="+", metavar="EXPORT",
+        help="exports d'effectifs CSV/XLSX ou dossiers, fusionnés par année (défaut : data/*evolution*Feuil1*.csv)",
+    )
+    parser.add_argument("--chunksize", type=int, metavar="N", help="lit les effectifs par blocs de N lignes (gros exports, mémoire bornée)")
+    parser.add_argument(
+        "--catchment", type=Path, metavar="COMMUNES_CSV",
+        help="population par bassin de lycée (annee | code_commune | lat | lng | population_15_19) au lieu du département",
+    )
+    parser.add_argument("--catchment-mode", choices=CATCHMENT_MODES, default="knn")
+    parser.add_argument("--catchment-k", type=int, default=1, help="lycées les plus proches par commune (mode knn)")
+    parser.add_argument("--catchment-radius-km", type=float, default=30.0, help="rayon du bassin (mode radius)")
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    setup_tracing("generate_api_data", args.trace)
+    catchment = args.catchment and {
+        "communes": args.catchment, "mode": args.catchment_mode,
+        "k": args.catchment_k, "radius_km": args.catchment_radius_km,
+    }
+    reconciliation = args.reconcile and {
+        "method": args.reconcile, "weights": args.reconcile_weights if args.reconcile == "mint" else None,
+    }
+    main(force=args.force, layout=args.layout, model_mode=args.model, strategy=args.strategy,
+         catchment=catchment, effectifs_paths=args.effectifs, search=args.search, reconciliation=reconciliation,
+         chunksize=args.chunksize)
 
 
 if __name__ == "__main__":
-    main()
+    cli()
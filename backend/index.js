@@ -1,13 +1,101 @@
 import express from 'express';
-import { readFileSync } from 'fs';
+import { existsSync, readFileSync } from 'fs';
 import { fileURLToPath } from 'url';
 import { dirname, join } from 'path';
 
 const __dirname = dirname(fileURLToPath(import.meta.url));
 const DATA_DIR = join(__dirname, '..', 'frontend', 'public', 'data');
 
+const INDEX_PATH = join(DATA_DIR, 'lycees_index.json');
+const SCENARIOS_PATH = join(DATA_DIR, 'scenarios.json');
+const HIERARCHY_PATH = join(DATA_DIR, 'hierarchy.json');
+
 const lyceesList = JSON.parse(readFileSync(join(DATA_DIR, 'lycees_list.json'), 'utf-8'));
-const lyceesData = JSON.parse(readFileSync(join(DATA_DIR, 'lycees_data.json'), 'utf-8'));
+
+// Sortie sharded (generate_api_data.py --layout sharded) : seul le petit index est lu
+// au démarrage, chaque lycée est chargé à la demande. Sinon, fichier monolithique.
+const shardIndex = existsSync(INDEX_PATH) ? JSON.parse(readFileSync(INDEX_PATH, 'utf-8')).lycees : null;
+const lyceesData = shardIndex ? null : JSON.parse(readFileSync(join(DATA_DIR, 'lycees_data.json'), 'utf-8'));
+
+const shardCache = new Map();
+const SHARD_CACHE_MAX = 128;
+
+function getLyceeData(id) {
+  if (!shardIndex) return lyceesData[id];
+  const entry = shardIndex[id];
+  if (!entry) return undefined;
+  let data = shardCache.get(id);
+  if (data) {
+    shardCache.delete(id);
+  } else {
+    data = JSON.parse(readFileSync(join(DATA_DIR, entry.file), 'utf-8'));
+    if (shardCache.size >= SHARD_CACHE_MAX) shardCache.delete(shardCache.keys().next().value);
+  }
+  shardCache.set(id, data);
+  return data;
+}
+
+// Cube de scénarios précalculé par generate_api_data.py (lycée × année × delta) :
+// chaque simulation est une simple lecture ; la tranche delta = 0 est la baseline publiée
+// (stratégie récursive ou directe, cf. scenarios.json "strategy").
+function loadScenarioCube() {
+  if (!existsSync(SCENARIOS_PATH)) return null;
+  const header = JSON.parse(readFileSync(SCENARIOS_PATH, 'utf-8'));
+  const buf = readFileSync(join(DATA_DIR, header.file));
+  const bytes = buf.buffer.slice(buf.byteOffset, buf.byteOffset + buf.byteLength);
+  const values = header.dtype === 'uint16' ? new Uint16Array(bytes) : new Int32Array(bytes);
+  return { ...header, values, lyceeIndex: new Map(header.lycees.map((id, i) => [id, i])) };
+}
+
+const scenarioCube = loadScenarioCube();
+
+// Séries réconciliées lycée → département → région (generate_api_data.py --reconcile)
+const hierarchy = existsSync(HIERARCHY_PATH) ? JSON.parse(readFileSync(HIERARCHY_PATH, 'utf-8')) : null;
+
+function clampDelta(raw) {
+  const delta = Number(raw) || 0;
+  return Math.max(-0.20, Math.min(0.40, delta));
+}
+
+// Effectifs simulés par année projetée ; repli sur baseline × (1 + delta) sans cube
+function simulateSeries(id, data, delta) {
+  const projected = data.series.filter(s => s.actual === null);
+  const li = scenarioCube?.lyceeIndex.get(id);
+  if (li === undefined) {
+    return projected.map(s => ({ year: s.year, baseline: s.baseline, scenario: Math.round(s.baseline * (1 + delta)) }));
+  }
+  const [, nYears, nDeltas] = scenarioCube.shape;
+  const di = Math.round((delta - scenarioCube.delta_min) / scenarioCube.delta_step);
+  return projected.map(s => {
+    const yi = scenarioCube.years.indexOf(s.year);
+    const scenario = yi < 0 ? s.baseline : scenarioCube.values[(li * nYears + yi) * nDeltas + di];
+    return { year: s.year, baseline: s.baseline, scenario };
+  });
+}
+
+// Résumé des lycées d'un département (comparaison), sans charger tous les shards
+function listVoisins(dep, id) {
+  if (shardIndex) {
+    return Object.entries(shardIndex)
+      .filter(([k, v]) => v.departement_code === dep && k !== id)
+      .map(([, v]) => ({
+        nom: v.name,
+        pente_annuelle: v.pente_annuelle,
+        effectif_2025: v.effectif_2025,
+        baseline_2028: v.baseline_2028,
+        captation_2025: v.captation_2025,
+      }));
+  }
+  return Object.entries(lyceesData)
+    .filter(([k, v]) => v.lycee.departement_code === dep && k !== id)
+    .map(([, v]) => ({
+      nom: v.lycee.name,
+      pente_annuelle: v.metrics.pente_annuelle,
+      effectif_2025: v.series.filter(s => s.actual !== null).slice(-1)[0]?.actual ?? 0,
+      baseline_2028: v.series.filter(s => s.actual === null).slice(-1)[0]?.baseline ?? 0,
+      captation_2025: v.metrics.captation_2025,
+    }));
+}
 
 const app = express();
 app.use(express.json());
@@ -19,25 +107,25 @@ app.get('/api/lycees', (_req, res) => {
 
 // GET /api/lycees/:id — données complètes d'un lycée
 app.get('/api/lycees/:id', (req, res) => {
-  const data = lyceesData[req.params.id];
+  const data = getLyceeData(req.params.id);
   if (!data) return res.status(404).json({ error: 'Lycée non trouvé' });
   res.json(data);
 });
 
+// GET /api/hierarchy — prévisions cohérentes par lycée, département et région
+app.get('/api/hierarchy', (_req, res) => {
+  if (!hierarchy) return res.status(404).json({ error: 'Réconciliation non générée (generate_api_data.py --reconcile)' });
+  res.json(hierarchy);
+});
+
 // POST /api/lycees/:id/simulate — simulation attractivité
 app.post('/api/lycees/:id/simulate', (req, res) => {
-  const data = lyceesData[req.params.id];
+  const data = getLyceeData(req.params.id);
   if (!data) return res.status(404).json({ error: 'Lycée non trouvé' });
 
-  let delta = Number(req.body.delta_attractivite) || 0;
-  delta = Math.max(-0.20, Math.min(0.40, delta));
-
-  const scenario = data.series
-    .filter(s => s.actual === null)
-    .map(s => ({
-      year: s.year,
-      scenario: Math.round(s.baseline * (1 + delta)),
-    }));
+  const delta = clampDelta(req.body.delta_attractivite);
+  const scenario = simulateSeries(req.params.id, data, delta)
+    .map(s => ({ year: s.year, scenario: s.scenario }));
 
   res.json({ lycee_id: req.params.id, delta_attractivite: delta, scenario });
 });
@@ -50,7 +138,7 @@ const analysisCache = new Map();
 const CACHE_TTL_MS = 5 * 60 * 1000;
 
 function buildAnalysisInput(id, delta) {
-  const data = lyceesData[id];
+  const data = getLyceeData(id);
   if (!data) return null;
 
   const { lycee, metrics, series } = data;
@@ -75,22 +163,14 @@ function buildAnalysisInput(id, delta) {
   };
 
   // Lycées du même département pour comparaison
-  const voisins = Object.entries(lyceesData)
-    .filter(([k, v]) => v.lycee.departement_code === dep && k !== id)
-    .map(([, v]) => ({
-      nom: v.lycee.name,
-      pente_annuelle: v.metrics.pente_annuelle,
-      effectif_2025: v.series.filter(s => s.actual !== null).slice(-1)[0]?.actual ?? 0,
-      baseline_2028: v.series.filter(s => s.actual === null).slice(-1)[0]?.baseline ?? 0,
-      captation_2025: v.metrics.captation_2025,
-    }));
+  const voisins = listVoisins(dep, id);
   if (voisins.length > 0) input.lycees_meme_departement = voisins;
 
   if (delta !== 0) {
-    const scenario = baseline.map(b => ({
-      annee: b.annee,
-      effectifs_scenario: Math.round(b.effectifs * (1 + delta)),
-      gain: Math.round(b.effectifs * (1 + delta)) - b.effectifs,
+    const scenario = simulateSeries(id, data, delta).map(s => ({
+      annee: s.year,
+      effectifs_scenario: s.scenario,
+      gain: s.scenario - s.baseline,
     }));
     const gains = scenario.map(s => s.gain);
     input.scenario = {
@@ -237,7 +317,7 @@ function splitSections(text) {
 
 app.post('/api/lycees/:id/analyze', async (req, res) => {
   const { id } = req.params;
-  const data = lyceesData[id];
+  const data = getLyceeData(id);
   if (!data) return res.status(404).json({ error: 'Lycée non trouvé' });
 
   const { api_key, api_endpoint, model } = req.body;
@@ -248,8 +328,7 @@ app.post('/api/lycees/:id/analyze', async (req, res) => {
     });
   }
 
-  let delta = Number(req.body.delta_attractivite) || 0;
-  delta = Math.max(-0.20, Math.min(0.40, delta));
+  const delta = clampDelta(req.body.delta_attractivite);
   const deltaKey = Math.round(delta * 100);
 
   const cacheKey = `${id}:${deltaKey}`;
@@ -0,0 +1,302 @@
+"""
+Ingestion des exports d'effectifs (CSV ou XLSX, un ou plusieurs fichiers, toutes les feuilles).
+
+Chaque export est un tableau large : une ligne par lycée (ou par lycée × formation),
+une colonne par rentrée (« Octobre 2018 », ...). Les nombres sont typés au parsing :
+  - colonnes de rentrée déclarées float64, séparateur de milliers (espace, espace
+    insécable, espace fine U+202F) géré par le lecteur CSV, sans nettoyage de chaînes ;
+  - l'année est lue une fois dans l'en-tête de chaque colonne, pas ligne par ligne.
+
+Les exports sont lus l'un après l'autre et fusionnés par (lycée, année) :
+  - dans un même tableau, les lignes d'un même lycée (une par formation) sont sommées ;
+  - un (lycée, année) présent dans plusieurs exports prend la valeur du dernier lu
+    (ordre des chemins ; fichiers d'un dossier triés par nom).
+
+Mode par blocs (read_effectifs(..., chunksize=N)) pour les exports nationaux par
+formation (millions de lignes) : CSV lus par blocs de N lignes (espaces normalisées
+au fil de la lecture), classeurs XLSX parcourus ligne à ligne (openpyxl, lecture
+seule). Chaque bloc est sommé aussitôt dans des tableaux (lycées × années)
+(EffectifsAccumulator) : la mémoire dépend du nombre de lycées et d'années, pas du
+nombre de lignes. Résultat identique à la lecture complète.
+"""
+
+import io
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+# En-tête d'une colonne de rentrée : « Octobre 2018 » (toute autre colonne datée est ignorée)
+YEAR_RE = re.compile(r"^\s*Octobre\s+((?:19|20)\d{2})\s*$", re.IGNORECASE)
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+EXPORT_GLOBS = ("*.csv", "*.xlsx", "*.xlsm", "*.xls")
+EXCLUDED_ROWS = ("TOTAL",)
+# Espaces insécables → espace simple, seul séparateur de milliers du lecteur CSV
+SPACES = ("\u202f", "\xa0")
+# Lignes par bloc en mode par blocs (read_effectifs(..., chunksize=CHUNK_ROWS))
+CHUNK_ROWS = 100_000
+
+
+def year_columns(columns, pattern: re.Pattern = YEAR_RE) -> dict[str, int]:
+    """
+    Colonnes de rentrée → année (« Octobre 2018 » → 2018) ; la première colonne (lycée) est exclue.
+    Deux colonnes de la même rentrée sont refusées (ValueError) plutôt que de s'écraser.
+    """
+    years, seen = {}, {}
+    for col in list(columns)[1:]:
+        match = pattern.match(str(col))
+        if match:
+            annee = int(match[1])
+            if annee in seen:
+                raise ValueError(f"Colonnes « {seen[annee]} » et « {col} » : même rentrée {annee}")
+            seen[annee] = col
+            years[col] = annee
+    return years
+
+
+def expand_paths(paths: Path | Iterable[Path]) -> list[Path]:
+    """Chemins d'exports : fichiers tels quels, dossiers remplacés par leurs CSV/XLSX triés."""
+    paths = [paths] if isinstance(paths, (str, Path)) else paths
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(f for pattern in EXPORT_GLOBS for f in path.glob(pattern)))
+        else:
+            files.append(path)
+    return files
+
+
+def _normalize_spaces(text: str) -> str:
+    for space in SPACES:
+        if space in text:
+            text = text.replace(space, " ")
+    return text
+
+
+class _SpaceNormalizer(io.TextIOBase):
+    """Flux texte dont les espaces insécables sont remplacées à la lecture (un caractère pour un : blocs sûrs)."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> str:
+        return _normalize_spaces(self._f.read(size))
+
+    def readline(self, size: int | None = -1) -> str:
+        return _normalize_spaces(self._f.readline(size))
+
+
+def _csv_dtype(header) -> dict:
+    return {header[0]: "category", **{col: "float64" for col in year_columns(header)}}
+
+
+def _read_csv(path: Path, sep: str = ",") -> pd.DataFrame:
+    buffer = io.StringIO(_normalize_spaces(path.read_text(encoding="utf-8-sig")))
+    header = pd.read_csv(buffer, sep=sep, nrows=0).columns
+    buffer.seek(0)
+    return pd.read_csv(buffer, sep=sep, thousands=" ", dtype=_csv_dtype(header))
+
+
+def _iter_csv(path: Path, sep: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    with open(path, encoding="utf-8-sig") as f:
+        header = pd.read_csv(_SpaceNormalizer(f), sep=sep, nrows=0).columns
+    with open(path, encoding="utf-8-sig") as f:
+        yield from pd.read_csv(_SpaceNormalizer(f), sep=sep, thousands=" ", dtype=_csv_dtype(header), chunksize=chunksize)
+
+
+def _numeric(col: pd.Series) -> pd.Series:
+    """Cellules Excel déjà numériques telles quelles ; cellules texte (« 1 234 ») converties."""
+    if col.dtype != object:
+        return col.astype("float64")
+    text = col.astype("string")  # cellules vides : <NA>, pas de texte « nan » / « None »
+    for space in (*SPACES, " "):
+        text = text.str.replace(space, "", regex=False)
+    return pd.to_numeric(text, errors="coerce").astype("float64")
+
+
+def read_tables(path: Path, sep: str = ",") -> Iterator[pd.DataFrame]:
+    """Tableaux larges d'un export : le CSV, ou chaque feuille du classeur."""
+    if path.suffix.lower() in EXCEL_SUFFIXES:
+        for sheet in pd.read_excel(path, sheet_name=None).values():
+            yield sheet.assign(**{col: _numeric(sheet[col]) for col in year_columns(sheet.columns)})
+    else:
+        yield _read_csv(path, sep)
+
+
+def _sheet_chunks(header: tuple, rows: Iterator[tuple], chunksize: int) -> Iterator[pd.DataFrame]:
+    columns = [f"Unnamed: {i}" if col is None else col for i, col in enumerate(header)]
+    years = year_columns(columns)
+    for batch in iter(lambda: list(islice(rows, chunksize)), []):
+        chunk = pd.DataFrame.from_records(batch, columns=columns)
+        yield chunk.assign(**{col: _numeric(chunk[col]) for col in years})
+
+
+def iter_table_chunks(path: Path, sep: str = ",", chunksize: int = CHUNK_ROWS) -> Iterator[Iterator[pd.DataFrame]]:
+    """
+    Tableaux d'un export (le CSV, ou chaque feuille du classeur), chacun en blocs de `chunksize` lignes.
+    Chaque tableau doit être consommé avant de passer au suivant.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".xls":  # format binaire : pas de lecture ligne à ligne, feuilles lues entières
+        for table in read_tables(path, sep):
+            yield iter([table])
+    elif suffix in EXCEL_SUFFIXES:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is not None:
+                    yield _sheet_chunks(header, rows, chunksize)
+        finally:
+            workbook.close()
+    else:
+        yield _iter_csv(path, sep, chunksize)
+
+
+class EffectifsAccumulator:
+    """
+    Effectifs (lycées × années) alimentés bloc par bloc : les lignes d'un même tableau sont
+    sommées, un tableau terminé (end_table) remplace les (lycée, année) qu'il contient.
+    """
+
+    def __init__(self):
+        self.lycees: dict[str, int] = {}
+        self.years: dict[int, int] = {}
+        self.values = np.zeros((0, 0))  # tableaux terminés
+        self.observed = np.zeros((0, 0), dtype=bool)
+        self._sums = np.zeros((0, 0))  # tableau en cours
+        self._counts = np.zeros((0, 0))
+
+    def _reserve(self, n_lycees: int, n_years: int) -> None:
+        """Agrandit les tableaux (capacité doublée : coût amorti constant par lycée ajouté)."""
+        rows, cols = self.values.shape
+        if n_lycees <= rows and n_years <= cols:
+            return
+        shape = (max(n_lycees, 2 * rows if n_lycees > rows else rows), max(n_years, cols))
+        for name in ("values", "observed", "_sums", "_counts"):
+            old = getattr(self, name)
+            new = np.zeros(shape, dtype=old.dtype)
+            new[:rows, :cols] = old
+            setattr(self, name, new)
+
+    def add(self, wide: pd.DataFrame) -> None:
+        """Somme un bloc de tableau large (lycée en première colonne, une colonne par rentrée)."""
+        years = year_columns(wide.columns)
+        year_idx = [self.years.setdefault(annee, len(self.years)) for annee in years.values()]
+        # Noms normalisés une fois par libellé distinct du bloc, pas une fois par ligne
+        names = wide.iloc[:, 0].astype("category")
+        labels = names.cat.categories.astype(str).str.strip().str.upper()
+        lycee_of_label = np.array(
+            [-1 if label in EXCLUDED_ROWS else self.lycees.setdefault(label, len(self.lycees)) for label in labels],
+            dtype=np.int64,
+        )
+        codes = names.cat.codes.to_numpy()
+        if not len(lycee_of_label):  # bloc de lignes sans libellé (lignes vides en fin d'export)
+            return
+        row_lycee = np.where(codes >= 0, lycee_of_label[codes.clip(0)], -1)
+        keep = row_lycee >= 0
+        if not keep.any():
+            return
+        row_lycee = row_lycee[keep]
+        self._reserve(len(self.lycees), len(self.years))
+
+        values = wide.loc[keep, list(years)].to_numpy(dtype=float)
+        observed = ~np.isnan(values)
+        values = np.where(observed, values, 0.0)
+        n = self._sums.shape[0]
+        for j, col in enumerate(year_idx):
+            self._sums[:, col] += np.bincount(row_lycee, weights=values[:, j], minlength=n)
+            self._counts[:, col] += np.bincount(row_lycee, weights=observed[:, j], minlength=n)
+
+    def end_table(self) -> None:
+        """Fin d'un tableau : ses (lycée, année) remplacent ceux des tableaux précédents."""
+        present = self._counts > 0
+        self.values[present] = self._sums[present]
+        self.observed |= present
+        self._sums[:] = 0.0
+        self._counts[:] = 0.0
+
+    def matrix(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(lycées triés, années triées, effectifs lycées × années avec NaN si non observé)."""
+        names = np.array(list(self.lycees), dtype=object)
+        years = np.fromiter(self.years, dtype=np.int64, count=len(self.years))
+        l_order, y_order = np.argsort(names, kind="stable"), np.argsort(years, kind="stable")
+        values = np.where(self.observed, self.values, np.nan)[: len(names), : len(years)]
+        return names[l_order], years[y_order], values[np.ix_(l_order, y_order)]
+
+    def to_long(self) -> pd.DataFrame:
+        """Table longue triée par (annee, lycee_raw) : annee | lycee_raw | effectifs."""
+        names, years, values = self.matrix()
+        i, j = np.nonzero(~np.isnan(values.T))  # (année, lycée) observés
+        return pd.DataFrame({"annee": years[i], "lycee_raw": names[j], "effectifs": values[j, i]})
+
+
+def to_long(wide: pd.DataFrame) -> pd.DataFrame:
+    """Tableau large → annee | lycee_raw | effectifs (lignes d'un même lycée sommées)."""
+    years = year_columns(wide.columns)
+    # Noms normalisés une fois par libellé distinct, pas une fois par ligne
+    names = wide.iloc[:, 0].astype("category")
+    labels = names.cat.categories.astype(str).str.strip().str.upper()
+    lycees, code_of_label = np.unique(labels.to_numpy(dtype=object), return_inverse=True)
+    if not len(lycees):  # tableau sans aucun libellé de lycée
+        return pd.DataFrame({"annee": np.empty(0, dtype=np.int64), "lycee_raw": lycees, "effectifs": np.empty(0)})
+    codes = names.cat.codes.to_numpy()
+    keep = (codes >= 0) & ~np.isin(lycees[code_of_label][codes.clip(0)], EXCLUDED_ROWS)
+    row_lycee = code_of_label[codes[keep]]
+
+    values = wide.loc[keep, list(years)].to_numpy(dtype=float)  # (lignes, années)
+    observed = ~np.isnan(values)
+    values = np.where(observed, values, 0.0)
+    n_lycees = len(lycees)
+    sums = np.stack([np.bincount(row_lycee, weights=values[:, j], minlength=n_lycees) for j in range(len(years))], axis=1)
+    counts = np.stack([np.bincount(row_lycee, weights=observed[:, j], minlength=n_lycees) for j in range(len(years))], axis=1)
+
+    i, j = np.nonzero(counts.T > 0)  # (année, lycée) avec au moins une valeur
+    return pd.DataFrame({
+        "annee": np.fromiter(years.values(), dtype=np.int64, count=len(years))[i],
+        "lycee_raw": lycees[j],
+        "effectifs": sums[j, i],
+    })
+
+
+def read_effectifs_chunked(files: list[Path], sep: str = ",", chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Comme read_effectifs, en mémoire bornée : blocs de `chunksize` lignes sommés dans un EffectifsAccumulator."""
+    acc = EffectifsAccumulator()
+    for path in files:
+        for chunks in iter_table_chunks(path, sep, chunksize):
+            for chunk in chunks:
+                if year_columns(chunk.columns):
+                    acc.add(chunk)
+            acc.end_table()
+    if not acc.years:
+        raise ValueError(f"Aucune colonne de rentrée (ex. « Octobre 2018 ») dans : {', '.join(f.name for f in files)}")
+    return acc.to_long()
+
+
+def read_effectifs(paths: Path | Iterable[Path], sep: str = ",", chunksize: int | None = None) -> pd.DataFrame:
+    """
+    Effectifs de tous les exports, fusionnés par (lycée, année).
+    `chunksize` : lecture par blocs de ce nombre de lignes (mémoire bornée, voir read_effectifs_chunked).
+
+    Returns:
+        Table longue triée par (annee, lycee_raw) : annee | lycee_raw | effectifs.
+    """
+    files = expand_paths(paths)
+    if not files:
+        raise FileNotFoundError("Aucun export d'effectifs à lire")
+    if chunksize:
+        return read_effectifs_chunked(files, sep, chunksize)
+    tables = [to_long(wide) for path in files for wide in read_tables(path, sep) if year_columns(wide.columns)]
+    if not tables:
+        raise ValueError(f"Aucune colonne de rentrée (ex. « Octobre 2018 ») dans : {', '.join(f.name for f in files)}")
+    df = pd.concat(tables, ignore_index=True).drop_duplicates(["annee", "lycee_raw"], keep="last")
+    return df.sort_values(["annee", "lycee_raw"], kind="stable", ignore_index=True)
@@ -0,0 +1,144 @@
+"""
+Instrumentation optionnelle des scripts de données : durée, lignes et mémoire par étape.
+
+Désactivée par défaut (coût nul). Activation :
+  - variable d'environnement CNEAP_TRACE=<fichier.json> (ou CNEAP_TRACE=1),
+  - option --trace [fichier.json] des scripts.
+
+Sans chemin explicite, la trace est écrite dans .cache/traces/<script>-<horodatage>.json.
+Chaque étape enregistre : durée, lignes produites, pic tracemalloc pendant
+l'étape, mémoire allouée nette et RSS maximal du processus. Les étapes peuvent
+être imbriquées (champ « parent »).
+
+    with stage("prepare_all_data") as st:
+        df = prepare_all_data(effectifs, pop)
+        st["rows"] = len(df)
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from build_cache import CACHE_DIR
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENV_VAR = "CNEAP_TRACE"
+TRACE_DIR = CACHE_DIR / "traces"
+
+
+def _max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 2**20 if sys.platform == "darwin" else rss / 2**10, 3)  # octets (macOS) / Ko (Linux)
+
+
+class Tracer:
+    """Collecte les mesures des étapes et écrit la trace JSON en fin de processus."""
+
+    def __init__(self):
+        self.path = None
+        self.script = None
+        self.records = []
+        self._stack = []
+        self._t0 = None
+        self._started_at = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def enable(self, script: str, path: Path | None = None) -> Path:
+        """Active la trace (idempotent) et programme son écriture à la sortie."""
+        if self.enabled:
+            return self.path
+        self.script = script
+        self._started_at = datetime.now()
+        if path is None:
+            path = TRACE_DIR / f"{script}-{self._started_at:%Y%m%d-%H%M%S}.json"
+        self.path = Path(path)
+        self._t0 = time.perf_counter()
+        tracemalloc.start()
+        atexit.register(self.write)
+        return self.path
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        """Mesure le bloc ; le dict produit peut être complété (ex. st["rows"] = len(df))."""
+        record = {"stage": name, **info}
+        if not self.enabled:
+            yield record
+            return
+        # Le pic courant appartient aux étapes englobantes : on le leur attribue avant remise à zéro
+        current, peak = tracemalloc.get_traced_memory()
+        for parent in self._stack:
+            parent["_peak"] = max(parent["_peak"], peak)
+        tracemalloc.reset_peak()
+        record.update(parent=self._stack[-1]["stage"] if self._stack else None, _peak=current, _start=current)
+        self._stack.append(record)
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            duration = time.perf_counter() - t0
+            current, peak = tracemalloc.get_traced_memory()
+            self._stack.pop()
+            peak = max(record.pop("_peak"), peak)
+            for parent in self._stack:
+                parent["_peak"] = max(parent["_peak"], peak)
+            record.update(
+                seconds=round(duration, 6),
+                peak_traced_mb=round(peak / 2**20, 3),
+                net_alloc_mb=round((current - record.pop("_start")) / 2**20, 3),
+                max_rss_mb=_max_rss_mb(),
+            )
+            self.records.append(record)
+
+    def write(self) -> None:
+        if not self.enabled or not self.records:
+            return
+        trace = {
+            "script": self.script,
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "argv": sys.argv,
+            "total_seconds": round(time.perf_counter() - self._t0, 6),
+            "max_rss_mb": _max_rss_mb(),
+            "stages": self.records,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(trace, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"  Trace d'exécution : {self.path}")
+        self.records = []
+
+
+TRACER = Tracer()
+stage = TRACER.stage
+
+
+def setup_tracing(script: str, cli_value: str | None = None) -> None:
+    """
+    Active la trace selon --trace (prioritaire) ou CNEAP_TRACE.
+    Valeur vide ou « 1 » : chemin par défaut ; sinon chemin du fichier JSON.
+    """
+    value = cli_value if cli_value is not None else (os.environ.get(ENV_VAR) or None)
+    if value is None or value.lower() in ("0", "false", "no"):
+        return
+    TRACER.enable(script, None if value in ("", "1") else Path(value))
+
+
+def add_trace_argument(parser) -> None:
+    """Ajoute l'option --trace [FICHIER] à un ArgumentParser."""
+    parser.add_argument(
+        "--trace", nargs="?", const="", default=None, metavar="FICHIER",
+        help=f"écrit une trace JSON des étapes (durées, lignes, mémoire) ; équivaut à {ENV_VAR}=FICHIER",
+    )
@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 """
-Interpolation linéaire de la population 15-19 ans entre 2016 et 2022.
+Interpolation linéaire de la population par tranche d'âge entre années de recensement.
 
-Méthode :
-  - pente = (pop_2022 - pop_2016) / 6
-  - pop_annee = pop_2016 + pente * (annee - 2016)
+Méthode (par géographie et par tranche, entre deux années d'ancrage encadrantes t0 < t1) :
+  - pente = (pop_t1 - pop_t0) / (t1 - t0)
+  - pop_annee = pop_t0 + pente * (annee - t0)
+Hors de la plage des ancrages, le segment le plus proche est prolongé.
 
-Années interpolées : 2018, 2019, 2020, 2021, 2022
+Les ancrages et tranches sont lus dans les colonnes Population_<a>_<b>_ans_<annee>
+(ex. Population_15_19_ans_2016, Population_15_19_ans_2022) : autant d'années et de
+tranches que le fichier en contient. Toutes les années cibles de toutes les
+géographies sont calculées en une seule opération sur un tableau
+(géographies × tranches × ancrages).
 
-Utilise les départements de tous les lycées CNEAP (44, 49, 53, 72, 85).
+Par défaut : tranche 15-19 ans, ancrages 2016/2022, années 2018 à 2022,
+départements de tous les lycées CNEAP (44, 49, 53, 72, 85).
 """
 
+import argparse
+import re
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -21,67 +31,101 @@ OUTPUT_CSV = DATA_DIR / "pop_15_19_interpolee.csv"
 OUTPUT_EXCEL = DATA_DIR / "pop_15_19_interpolee.xlsx"
 
 ANNEES_INTERPOLEES = [2018, 2019, 2020, 2021, 2022]
-ANNEE_DEBUT = 2016
-ANNEE_FIN = 2022
-ECART_ANNEES = ANNEE_FIN - ANNEE_DEBUT  # 6
-
-
-def interpoler(dep_data: pd.Series, annees: list[int]) -> pd.DataFrame:
-    """
-    Interpolation linéaire pour un département.
-
-    pop_annee = pop_2016 + pente * (annee - 2016)
-    avec pente = (pop_2022 - pop_2016) / 6
-    """
-    pop_2016 = dep_data["Population_15_19_ans_2016"]
-    pop_2022 = dep_data["Population_15_19_ans_2022"]
-
-    pente = (pop_2022 - pop_2016) / ECART_ANNEES
+COLONNES_ID = {"Code_departement": "code_departement", "Departement": "departement"}
+COLONNE_POP_RE = re.compile(r"^Population_(?P<tranche>\d+_\d+)_ans_(?P<annee>\d{4})$")
 
-    rows = []
-    for annee in annees:
-        pop = pop_2016 + pente * (annee - ANNEE_DEBUT)
-        rows.append({"annee": annee, "population_15_19": round(pop, 2)})
 
-    return pd.DataFrame(rows)
+def colonnes_ancrages(df: pd.DataFrame) -> dict[str, dict[int, str]]:
+    """Colonnes de population par tranche puis par année d'ancrage : {"15_19": {2016: col, ...}}."""
+    tranches = {}
+    for col in df.columns:
+        match = COLONNE_POP_RE.match(str(col))
+        if match:
+            tranches.setdefault(match["tranche"], {})[int(match["annee"])] = col
+    return tranches
 
 
-def main() -> pd.DataFrame:
+def interpoler(valeurs: np.ndarray, ancrages, annees) -> np.ndarray:
+    """
+    Interpolation linéaire par morceaux, vectorisée.
+
+    Args:
+        valeurs: (..., A) populations aux A années d'ancrage (croissantes).
+        ancrages: (A,) années d'ancrage, A >= 2.
+        annees: (T,) années cibles.
+    Returns:
+        (..., T) populations interpolées (non arrondies).
+    """
+    ancrages = np.asarray(ancrages)
+    annees = np.asarray(annees)
+    if len(ancrages) < 2:
+        raise ValueError("Au moins deux années d'ancrage sont nécessaires")
+    seg = np.clip(np.searchsorted(ancrages, annees, side="right") - 1, 0, len(ancrages) - 2)
+    t0, t1 = ancrages[seg], ancrages[seg + 1]
+    v0, v1 = valeurs[..., seg], valeurs[..., seg + 1]
+    pente = (v1 - v0) / (t1 - t0)
+    return v0 + pente * (annees - t0)
+
+
+def interpoler_table(
+    df: pd.DataFrame,
+    annees: list[int] = ANNEES_INTERPOLEES,
+    tranches: list[str] | None = None,
+    colonnes_id: dict[str, str] = COLONNES_ID,
+) -> pd.DataFrame:
+    """
+    Table large (une ligne par géographie, une colonne par tranche × ancrage)
+    → table longue annee | <ids> | population_<tranche>..., arrondie à 2 décimales.
+    """
+    ancrages_par_tranche = colonnes_ancrages(df)
+    tranches = tranches or sorted(ancrages_par_tranche)
+    manquantes = [t for t in tranches if t not in ancrages_par_tranche]
+    if not tranches or manquantes:
+        raise ValueError(f"Colonnes Population_<tranche>_ans_<annee> absentes : {manquantes or 'aucune tranche'}")
+
+    # Ancrages communs à toutes les tranches demandées
+    ancrages = sorted(set.intersection(*(set(ancrages_par_tranche[t]) for t in tranches)))
+    valeurs = np.stack(
+        [df[[ancrages_par_tranche[t][a] for a in ancrages]].to_numpy(dtype=float) for t in tranches],
+        axis=1,
+    )  # (géographies, tranches, ancrages)
+    interp = np.round(interpoler(valeurs, ancrages, annees), 2)  # (géographies, tranches, années)
+
+    n_geo, n_annees = len(df), len(annees)
+    out = {"annee": np.tile(annees, n_geo)}
+    for src, dst in colonnes_id.items():
+        out[dst] = np.repeat(df[src].to_numpy(), n_annees)
+    for i, tranche in enumerate(tranches):
+        out[f"population_{tranche}"] = interp[:, i, :].ravel()
+    df_long = pd.DataFrame(out)
+    df_long.attrs["ancrages"] = ancrages
+    return df_long
+
+
+def main(
+    annees: list[int] = ANNEES_INTERPOLEES, tranches: list[str] | None = None, input_file: Path = INPUT_CSV,
+) -> pd.DataFrame:
     """Charge les données, interpole et retourne le DataFrame final."""
-    input_file = INPUT_CSV
     if not input_file.exists():
-        # Fallback : ancien fichier Vendée/Mayenne uniquement
-        fallback = DATA_DIR / "pop_15_19_vendee_mayenne_2016_2022.csv"
-        if fallback.exists():
-            input_file = fallback
-            print(f"  (Utilisation de {fallback.name} - exécutez extract_pop pour tous les lycées)\n")
-        else:
-            raise FileNotFoundError(f"Aucun fichier trouvé. Exécutez d'abord extract_pop_15_19_vendee_mayenne.py")
+        # Pas de repli implicite sur un autre fichier : l'ancien extrait (Vendée/Mayenne
+        # uniquement) ne couvre pas tous les lycées et doit être demandé avec --input
+        raise FileNotFoundError(
+            f"{input_file} introuvable. Exécutez d'abord extract_pop_15_19_vendee_mayenne.py "
+            f"(ou indiquez un autre fichier avec --input)"
+        )
 
     df = pd.read_csv(input_file)
 
-    resultats = []
-    for _, row in df.iterrows():
-        dep_df = interpoler(row, ANNEES_INTERPOLEES)
-        dep_df["code_departement"] = row["Code_departement"]
-        dep_df["departement"] = row["Departement"]
-        resultats.append(dep_df)
-
-    # DataFrame final : année | population_15_19 | code_departement | departement
-    df_final = pd.concat(resultats, ignore_index=True)
-
-    # Réordonner : année | code_departement | departement | population_15_19
-    df_final = df_final[
-        ["annee", "code_departement", "departement", "population_15_19"]
-    ]
+    # DataFrame final : annee | code_departement | departement | population_<tranche>...
+    df_final = interpoler_table(df, annees, tranches)
 
     # Sauvegarder
     df_final.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
     df_final.to_excel(OUTPUT_EXCEL, index=False)
 
-    print("Interpolation linéaire (2016 → 2022)")
-    print(f"  Pente = (pop_2022 - pop_2016) / {ECART_ANNEES}")
-    print(f"  Années : {ANNEES_INTERPOLEES}\n")
+    print(f"Interpolation linéaire (ancrages : {df_final.attrs['ancrages']})")
+    print("  Pente = (pop_t1 - pop_t0) / (t1 - t0) entre ancrages encadrants")
+    print(f"  Années : {list(annees)}\n")
     print(df_final.to_string(index=False))
     print(f"\n✓ Fichiers sauvegardés : {OUTPUT_CSV.name}, {OUTPUT_EXCEL.name}")
 
@@ -89,4 +133,12 @@ def main() -> pd.DataFrame:
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--annees", type=int, nargs="+", default=ANNEES_INTERPOLEES, help="années cibles")
+    parser.add_argument("--tranches", nargs="+", help="tranches d'âge (ex. 15_19 20_24) ; défaut : toutes")
+    parser.add_argument("--input", type=Path, default=INPUT_CSV, help=f"fichier source (défaut : {INPUT_CSV.name})")
+    args = parser.parse_args()
+    try:
+        main(args.annees, args.tranches, args.input)
+    except FileNotFoundError as e:
+        parser.exit(1, f"ERREUR: {e}\n")
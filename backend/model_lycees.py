@@ -6,14 +6,29 @@ croisant avec la démographie 15-19 ans par département.
 Données : effectifs 2018-2025 + population 15-19 interpolée (INSEE).
 """
 
-import matplotlib
-matplotlib.use("Agg")  # Backend non-interactif pour exécution en script
+from __future__ import annotations
+
+import argparse
+from typing import TYPE_CHECKING
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from sklearn.linear_model import Ridge
-from sklearn.metrics import mean_absolute_error
-import matplotlib.pyplot as plt
+
+from artifacts import ArtifactStore, frame_hash
+from build_cache import digest
+from features import FeatureStore
+from ingestion import read_effectifs
+from instrumentation import add_trace_argument, setup_tracing, stage
+from population import extrapolate_population, read_population
+from projection import forecast_batch, pop_matrix
+from schema import compact
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# sklearn et matplotlib sont importés dans les fonctions qui s'en servent :
+# les indicateurs (cli.py indicators) démarrent sans les charger.
 
 # Chemins
 BASE = Path(__file__).parent.parent
@@ -21,6 +36,11 @@ DATA_DIR = BASE / "data"
 IMAGES_DIR = BASE / "images"
 POP_CSV = DATA_DIR / "pop_15_19_interpolee.csv"
 
+# Configuration du Ridge de train_model (entre dans l'empreinte de l'artefact du backtest)
+MODEL_COLS = ["annee", "lycee_Evron", "lycee_LaRoche", "lag1_effectifs", "population_15_19"]
+RIDGE_PARAMS = {"alpha": 1.0, "random_state": 42}
+FILL_RULE = "moyenne des effectifs d'entraînement"  # valeur imputée aux features manquantes
+
 
 def _find_evolution_csv() -> Path:
     """Recherche le fichier CSV des effectifs (nom peut varier selon encodage)."""
@@ -40,67 +60,23 @@ LYCEE_NOM = {"EVRON": "Evron", "LA ROCHE SUR YON": "LaRoche"}
 # -----------------------------------------------------------------------------
 
 
-def load_effectifs(path: Path) -> pd.DataFrame:
-    """Charge les effectifs et restructure en format long."""
-    df = pd.read_csv(path, encoding="utf-8")
-    # Première colonne = nom lycée
-    col_lycee = df.columns[0]
-    df = df.rename(columns={col_lycee: "lycee_raw"})
-    df["lycee_raw"] = df["lycee_raw"].str.strip().str.upper()
-
+def load_effectifs(path: Path, chunksize: int | None = None) -> pd.DataFrame:
+    """
+    Charge les effectifs en format long (nombres typés au parsing, voir ingestion.py).
+    `chunksize` : lecture par blocs de ce nombre de lignes (mémoire bornée).
+    """
+    df = read_effectifs(path, chunksize=chunksize)
     # Garder Evron et La Roche
-    df = df[df["lycee_raw"].isin(["EVRON", "LA ROCHE SUR YON"])].copy()
-    df["lycee"] = df["lycee_raw"].map(LYCEE_NOM)
-    df["departement_code"] = df["lycee_raw"].map(LYCEE_DEP)
-
-    # Pivoter : colonnes année → lignes
-    year_cols = [c for c in df.columns if "Octobre" in str(c)]
-    df_long = df.melt(
-        id_vars=["lycee_raw", "lycee", "departement_code"],
-        value_vars=year_cols,
-        var_name="annee_str",
-        value_name="effectifs_raw",
-    )
-    df_long["annee"] = df_long["annee_str"].str.extract(r"(\d{4})").astype(int)
-    # Nettoyer effectifs (espaces milliers)
-    df_long["effectifs"] = (
-        df_long["effectifs_raw"]
-        .astype(str)
-        .str.replace(" ", "")
-        .str.replace("\u202f", "")
-        .astype(float)
-    )
-    df_long = df_long[["annee", "lycee", "departement_code", "effectifs"]].drop_duplicates()
-    return df_long
+    df = df[df["lycee_raw"].isin(LYCEE_NOM)]
+    df = df.assign(lycee=df["lycee_raw"].map(LYCEE_NOM), departement_code=df["lycee_raw"].map(LYCEE_DEP))
+    return compact(df[["annee", "lycee", "departement_code", "effectifs"]])
 
 
 def load_and_extrapolate_pop(path: Path) -> pd.DataFrame:
     """
     Charge pop_15_19, extrapole 2023-2028 à partir de la tendance 2018-2022.
     """
-    df = pd.read_csv(path)
-    df["code_departement"] = df["code_departement"].astype(str).str.strip()
-
-    extrap = []
-    for code, grp in df.groupby("code_departement"):
-        grp = grp.sort_values("annee")
-        pop_2018 = grp[grp["annee"] == 2018]["population_15_19"].values[0]
-        pop_2022 = grp[grp["annee"] == 2022]["population_15_19"].values[0]
-        pente = (pop_2022 - pop_2018) / 4
-
-        for annee in range(2018, 2029):
-            if annee <= 2022:
-                pop = grp[grp["annee"] == annee]["population_15_19"].values[0]
-            else:
-                pop = pop_2022 + pente * (annee - 2022)
-            extrap.append({
-                "annee": annee,
-                "code_departement": code,
-                "departement": grp["departement"].iloc[0],
-                "population_15_19": round(pop, 2),
-            })
-
-    return pd.DataFrame(extrap)
+    return extrapolate_population(read_population(path), label_cols=["departement"])
 
 
 def prepare_data(effectifs: pd.DataFrame, population: pd.DataFrame) -> pd.DataFrame:
@@ -112,14 +88,12 @@ def prepare_data(effectifs: pd.DataFrame, population: pd.DataFrame) -> pd.DataFr
         how="left",
         suffixes=("", "_pop"),
     )
-    df = df[["annee", "lycee", "departement_code", "effectifs", "population_15_19"]].copy()
     df["taux_captation"] = df["effectifs"] / df["population_15_19"]
+    cols = ["annee", "lycee", "departement_code", "effectifs", "population_15_19", "taux_captation"]
 
     # lag1_effectifs par lycée
-    df = df.sort_values(["lycee", "annee"])
-    df["lag1_effectifs"] = df.groupby("lycee")["effectifs"].shift(1)
-
-    return df
+    df = compact(df[cols]).sort_values(["lycee", "annee"])
+    return FeatureStore(df, key="lycee").assign(df, ["lag1_effectifs"])
 
 
 # -----------------------------------------------------------------------------
@@ -127,10 +101,18 @@ def prepare_data(effectifs: pd.DataFrame, population: pd.DataFrame) -> pd.DataFr
 # -----------------------------------------------------------------------------
 
 
+def _pyplot():
+    """matplotlib.pyplot, importé au premier graphique."""
+    import matplotlib
+    matplotlib.use("Agg")  # Backend non-interactif pour exécution en script
+    import matplotlib.pyplot as plt
+    return plt
+
+
 def plot_effectifs(df: pd.DataFrame, ax: plt.Axes | None = None) -> plt.Axes:
     """Courbes des effectifs 2018-2025 pour les deux lycées."""
     if ax is None:
-        fig, ax = plt.subplots(figsize=(9, 5))
+        fig, ax = _pyplot().subplots(figsize=(9, 5))
     for lycee in df["lycee"].unique():
         d = df[df["lycee"] == lycee].sort_values("annee")
         ax.plot(d["annee"], d["effectifs"], "o-", label=lycee, linewidth=2, markersize=8)
@@ -146,7 +128,7 @@ def plot_effectifs(df: pd.DataFrame, ax: plt.Axes | None = None) -> plt.Axes:
 def plot_taux_captation(df: pd.DataFrame, ax: plt.Axes | None = None) -> plt.Axes:
     """Courbes du taux de captation 2018-2025."""
     if ax is None:
-        fig, ax = plt.subplots(figsize=(9, 5))
+        fig, ax = _pyplot().subplots(figsize=(9, 5))
     for lycee in df["lycee"].unique():
         d = df[df["lycee"] == lycee].sort_values("annee")
         ax.plot(d["annee"], d["taux_captation"] * 100, "o-", label=lycee, linewidth=2, markersize=8)
@@ -162,7 +144,7 @@ def plot_taux_captation(df: pd.DataFrame, ax: plt.Axes | None = None) -> plt.Axe
 def plot_pop_par_departement(pop: pd.DataFrame, ax: plt.Axes | None = None) -> plt.Axes:
     """Courbe pop_15_19 2018-2028 par département."""
     if ax is None:
-        fig, ax = plt.subplots(figsize=(9, 5))
+        fig, ax = _pyplot().subplots(figsize=(9, 5))
     for dep in pop["departement"].unique():
         d = pop[pop["departement"] == dep].sort_values("annee")
         ax.plot(d["annee"], d["population_15_19"], "o-", label=dep, linewidth=2, markersize=6)
@@ -224,17 +206,19 @@ def print_indicators(df: pd.DataFrame, pop: pd.DataFrame) -> None:
 
 def encode_features(df: pd.DataFrame) -> pd.DataFrame:
     """Crée les features pour le modèle."""
-    X = df.copy()
-    X["lycee_Evron"] = (X["lycee"] == "Evron").astype(int)
-    X["lycee_LaRoche"] = (X["lycee"] == "LaRoche").astype(int)
-    return X
+    return df.assign(
+        lycee_Evron=(df["lycee"] == "Evron").astype(int),
+        lycee_LaRoche=(df["lycee"] == "LaRoche").astype(int),
+    )
 
 
 def train_model(X_train: pd.DataFrame, y_train: pd.Series):
     """Entraîne un modèle Ridge."""
-    cols = ["annee", "lycee_Evron", "lycee_LaRoche", "lag1_effectifs", "population_15_19"]
-    X = X_train[cols].fillna(X_train["effectifs"].mean())  # lag1 manquant première année
-    model = Ridge(alpha=1.0, random_state=42)
+    from sklearn.linear_model import Ridge
+
+    cols = MODEL_COLS
+    X = X_train[cols].fillna(X_train["effectifs"].mean())  # lag1 manquant première année (FILL_RULE)
+    model = Ridge(**RIDGE_PARAMS)
     model.fit(X, y_train)
     return model, cols
 
@@ -243,13 +227,29 @@ def backtest(
     df: pd.DataFrame,
     train_years: tuple[int, int],
     test_years: tuple[int, int],
+    artifacts: ArtifactStore | None = None,
 ) -> tuple[object, list[str], float, float]:
-    """Backtest temporel : train 2018-2023, test 2024-2025."""
+    """
+    Backtest temporel : train 2018-2023, test 2024-2025.
+    artifacts : modèle et métriques rechargés si les données, fenêtres et configuration
+    (MODEL_COLS, RIDGE_PARAMS, FILL_RULE) sont inchangées.
+    """
     annee_min, annee_max = train_years
     test_min, test_max = test_years
-
-    train = df[(df["annee"] >= annee_min) & (df["annee"] <= annee_max)].copy()
-    test = df[(df["annee"] >= test_min) & (df["annee"] <= test_max)].copy()
+    key = None
+    if artifacts is not None:
+        key = digest({
+            "train_years": train_years, "test_years": test_years,
+            "cols": MODEL_COLS, "ridge": RIDGE_PARAMS, "fill": FILL_RULE,
+            "data": frame_hash(df, ["annee", "lycee", "effectifs", "lag1_effectifs", "population_15_19"]),
+        })
+        hit = artifacts.load(key)
+        if hit is not None:
+            model, meta = hit
+            return model, meta["feature_cols"], meta["metrics"]["mae"], meta["metrics"]["mape"]
+
+    train = df[(df["annee"] >= annee_min) & (df["annee"] <= annee_max)]
+    test = df[(df["annee"] >= test_min) & (df["annee"] <= test_max)]
 
     train_enc = encode_features(train)
     test_enc = encode_features(test)
@@ -259,22 +259,21 @@ def backtest(
         train["effectifs"],
     )
 
-    X_test = test_enc[cols].copy()
     # Remplir lag1 pour le test (utiliser les vrais effectifs)
-    for idx in X_test.index:
-        lycee = test.loc[idx, "lycee"]
-        annee = test.loc[idx, "annee"]
-        lag_row = df[(df["lycee"] == lycee) & (df["annee"] == annee - 1)]
-        if not lag_row.empty:
-            X_test.loc[idx, "lag1_effectifs"] = lag_row["effectifs"].values[0]
-
+    lag1 = FeatureStore(df, key="lycee").at("lag1_effectifs", test["lycee"], test["annee"])
+    X_test = test_enc[cols].assign(lag1_effectifs=np.where(np.isnan(lag1), test_enc["lag1_effectifs"], lag1))
     X_test = X_test.fillna(train["effectifs"].mean())
     y_pred = model.predict(X_test)
     y_true = test["effectifs"].values
 
-    mae = mean_absolute_error(y_true, y_pred)
-    mape = np.mean(np.abs((y_true - y_pred) / (y_true + 1e-8))) * 100
+    mae = float(np.mean(np.abs(y_true - y_pred)))
+    mape = float(np.mean(np.abs((y_true - y_pred) / (y_true + 1e-8))) * 100)
 
+    if artifacts is not None:
+        artifacts.save(key, model, {
+            "feature_cols": cols, "fill": float(train["effectifs"].mean()),
+            "train_window": list(train_years), "test_years": list(test_years), "metrics": {"mae": mae, "mape": mape},
+        })
     return model, cols, mae, mape
 
 
@@ -283,37 +282,6 @@ def backtest(
 # -----------------------------------------------------------------------------
 
 
-def _predict_one_year(
-    model,
-    feature_cols: list[str],
-    lycee: str,
-    annee: int,
-    lag1: float,
-    pop_val: float,
-    evron_cap_decline: bool = True,
-) -> float:
-    """
-    Prédit les effectifs pour une année.
-    Si evron_cap_decline=True et lycee=Evron : empêche la hausse (pred = min(pred, lag1)).
-    """
-    le = 1 if lycee == "Evron" else 0
-    lr = 1 if lycee == "LaRoche" else 0
-    X = pd.DataFrame([{
-        "annee": annee,
-        "lycee_Evron": le,
-        "lycee_LaRoche": lr,
-        "lag1_effectifs": lag1,
-        "population_15_19": pop_val,
-    }])
-    pred = model.predict(X[feature_cols])[0]
-    pred = max(0, round(pred, 0))
-
-    if evron_cap_decline and lycee == "Evron":
-        pred = min(pred, lag1)
-
-    return pred
-
-
 def forecast_recursive(
     model,
     feature_cols: list[str],
@@ -324,33 +292,32 @@ def forecast_recursive(
 ) -> pd.DataFrame:
     """
     Projection récursive : utilise la prédiction précédente comme lag1.
+    Tous les lycées sont projetés ensemble (un predict par année).
 
     Args:
         evron_cap_decline: Si True, Evron ne peut pas remonter (pred <= lag1).
                            Mettre à False pour le scénario 'action' où la hausse est autorisée.
     """
-    projections = []
-
-    for lycee in df_hist["lycee"].unique():
-        dep = df_hist[df_hist["lycee"] == lycee]["departement_code"].iloc[0]
-        last_row = df_hist[(df_hist["lycee"] == lycee)].sort_values("annee").iloc[-1]
-        lag1 = last_row["effectifs"]
-
-        for annee in years:
-            pop_val = pop[(pop["code_departement"] == dep) & (pop["annee"] == annee)]["population_15_19"].values[0]
-            pred = _predict_one_year(
-                model, feature_cols, lycee, annee, lag1, pop_val, evron_cap_decline
-            )
-            projections.append({
-                "annee": annee,
-                "lycee": lycee,
-                "departement_code": dep,
-                "effectifs": pred,
-                "population_15_19": pop_val,
-            })
-            lag1 = pred
-
-    return pd.DataFrame(projections)
+    lycees = np.asarray(df_hist["lycee"].unique())
+    store = FeatureStore(df_hist, key="lycee")
+    pos = store.positions(lycees)
+    deps = store.attr("departement_code")[pos]
+
+    pop_vals = pop_matrix(pop, deps, years)
+    static = {
+        "lycee_Evron": (lycees == "Evron").astype(int),
+        "lycee_LaRoche": (lycees == "LaRoche").astype(int),
+    }
+    cap = (lycees == "Evron") if evron_cap_decline else None
+    preds = forecast_batch(model, feature_cols, store.last("effectifs")[pos], pop_vals, years, static, cap)
+
+    return compact(pd.DataFrame({
+        "annee": np.tile(years, len(lycees)),
+        "lycee": np.repeat(lycees, len(years)),
+        "departement_code": np.repeat(deps, len(years)),
+        "effectifs": preds.ravel(),
+        "population_15_19": pop_vals.ravel(),
+    }))
 
 
 # -----------------------------------------------------------------------------
@@ -384,6 +351,7 @@ def plot_effectifs_avec_projection(
     proj_evron_action: pd.DataFrame | None = None,
 ) -> None:
     """Graphe effectifs 2018-2028 (historique + projeté en pointillé)."""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(11, 6))
 
     # Historique
@@ -418,55 +386,65 @@ def plot_effectifs_avec_projection(
 # -----------------------------------------------------------------------------
 
 
-def main() -> None:
+def load_data(chunksize: int | None = None) -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    """Effectifs + population → (DataFrame long, population extrapolée), ou None si une source manque."""
     print("Chargement des données...")
 
     EVOLUTION_CSV = _find_evolution_csv()
     if not EVOLUTION_CSV.exists():
         print(f"ERREUR: fichier effectifs introuvable dans {DATA_DIR}")
-        return
+        return None
     print(f"  Effectifs: {EVOLUTION_CSV.name}")
     if not POP_CSV.exists():
         print(f"ERREUR: {POP_CSV} introuvable.")
-        return
-
-    effectifs = load_effectifs(EVOLUTION_CSV)
-    pop = load_and_extrapolate_pop(POP_CSV)
-
-    df = prepare_data(effectifs, pop)
-    df_full = df.copy()
-
-    print("\n--- DataFrame long (extrait) ---")
-    print(df.head(10).to_string())
-    print("...")
-
-    # B) Visualisations
-    fig, axes = plt.subplots(2, 1, figsize=(9, 10))
-    plot_effectifs(df_full, axes[0])
-    plot_taux_captation(df_full, axes[1])
-    plt.tight_layout()
-    plt.savefig(IMAGES_DIR / "effectifs_et_taux.png", dpi=120, bbox_inches="tight")
-    plt.close()
-
-    fig2, ax2 = plt.subplots(figsize=(9, 5))
-    plot_pop_par_departement(pop, ax2)
-    plt.tight_layout()
-    plt.savefig(IMAGES_DIR / "pop_15_19_dep.png", dpi=120, bbox_inches="tight")
-    plt.close()
-
-    # C) Indicateurs
-    print_indicators(df_full, pop)
-
-    # D) Modèle & backtest
+        return None
+
+    with stage("load_effectifs") as st:
+        effectifs = load_effectifs(EVOLUTION_CSV, chunksize)
+        st["rows"] = len(effectifs)
+    with stage("load_and_extrapolate_pop") as st:
+        pop = load_and_extrapolate_pop(POP_CSV)
+        st["rows"] = len(pop)
+
+    with stage("prepare_data") as st:
+        df = prepare_data(effectifs, pop)
+        st["rows"] = len(df)
+    return df, pop
+
+
+def plot_overview(df: pd.DataFrame, pop: pd.DataFrame) -> None:
+    """Graphiques effectifs / taux de captation et population par département (images/)."""
+    plt = _pyplot()
+    with stage("plot_effectifs_et_taux", rows=len(df)):
+        fig, axes = plt.subplots(2, 1, figsize=(9, 10))
+        plot_effectifs(df, axes[0])
+        plot_taux_captation(df, axes[1])
+        plt.tight_layout()
+        plt.savefig(IMAGES_DIR / "effectifs_et_taux.png", dpi=120, bbox_inches="tight")
+        plt.close()
+
+    with stage("plot_pop_par_departement", rows=len(pop)):
+        fig2, ax2 = plt.subplots(figsize=(9, 5))
+        plot_pop_par_departement(pop, ax2)
+        plt.tight_layout()
+        plt.savefig(IMAGES_DIR / "pop_15_19_dep.png", dpi=120, bbox_inches="tight")
+        plt.close()
+
+
+def run_model(df: pd.DataFrame, pop: pd.DataFrame, retrain: bool = False) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Backtest 2024-2025, projection 2026-2028 et scénario Evron → (projection, projection Evron action)."""
     print("\n" + "=" * 60)
     print("MODÈLE ML - Backtest temporel (train 2018-2023, test 2024-2025)")
     print("=" * 60)
-    model, cols, mae, mape = backtest(df_full, (2018, 2023), (2024, 2025))
+    with stage("backtest", rows=len(df)):
+        model, cols, mae, mape = backtest(df, (2018, 2023), (2024, 2025), ArtifactStore("model_lycees", refresh=retrain, code=[Path(__file__)]))
     print(f"MAE = {mae:.2f} élèves")
     print(f"MAPE = {mape:.1f}%")
 
     # E) Projection 2026-2028
-    proj = forecast_recursive(model, cols, df_full, pop, [2026, 2027, 2028])
+    with stage("forecast_recursive") as st:
+        proj = forecast_recursive(model, cols, df, pop, [2026, 2027, 2028])
+        st["rows"] = len(proj)
     print("\n--- Projection 2026-2028 ---")
     print(proj.to_string(index=False))
 
@@ -474,12 +452,45 @@ def main() -> None:
     proj_evron_action = projet_evron_action(proj, pop, mode="plus30")
     print("\n--- Evron action (+30 élèves à partir de 2026) ---")
     print(proj_evron_action[["annee", "lycee", "effectifs"]].to_string(index=False))
+    return proj, proj_evron_action
+
+
+def main(retrain: bool = False, chunksize: int | None = None) -> None:
+    data = load_data(chunksize)
+    if data is None:
+        return
+    df, pop = data
+
+    print("\n--- DataFrame long (extrait) ---")
+    print(df.head(10).to_string())
+    print("...")
+
+    # B) Visualisations
+    plot_overview(df, pop)
+
+    # C) Indicateurs
+    with stage("print_indicators"):
+        print_indicators(df, pop)
+
+    # D) Modèle & backtest, E) projection, F) scénario Evron
+    proj, proj_evron_action = run_model(df, pop, retrain)
 
     # Graphe final
-    plot_effectifs_avec_projection(df_full, proj, proj_evron_action)
+    with stage("plot_effectifs_avec_projection", rows=len(proj)):
+        plot_effectifs_avec_projection(df, proj, proj_evron_action)
 
     print("\n✓ Script terminé.")
 
 
+def cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retrain", action="store_true", help="réentraîne même si un modèle enregistré correspond")
+    parser.add_argument("--chunksize", type=int, metavar="N", help="lit les effectifs par blocs de N lignes (gros exports, mémoire bornée)")
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    setup_tracing("model_lycees", args.trace)
+    main(retrain=args.retrain, chunksize=args.chunksize)
+
+
 if __name__ == "__main__":
-    main()
+    cli()
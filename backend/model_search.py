@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Recherche d'hyperparamètres des modèles Ridge : alpha × jeu de features.
+
+Jeux candidats : lag1_effectifs toujours présent, combiné à toute partie de
+{annee (tendance), population_15_19, captation_lag1}, c'est-à-dire les features
+que la projection récursive sait reconstruire à chaque pas (projection.build_features).
+
+Deux méthodes :
+  - "loo" : erreur leave-one-out exacte à un pas (N+1), en forme close
+    (ridge_batch.loo_residuals) : une décomposition par jeu de features couvre
+    toute la grille d'alphas ; modèle global ou par lycée / département ;
+  - "backtest" : walk-forward de backtesting.py (pool de processus), qui juge la
+    projection elle-même (récursive ou directe) sur plusieurs origines ; modèle global.
+La configuration retenue est celle de plus faible MAE.
+
+Usage : python model_search.py [--method loo|backtest] [--model global|lycee|departement]
+"""
+
+import argparse
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from projection import training_features
+from ridge_batch import loo_residuals
+
+ALPHAS = tuple(float(a) for a in np.logspace(-4, 5, 19))
+FEATURE_ORDER = ("annee", "lag1_effectifs", "population_15_19", "captation_lag1")
+OPTIONAL_FEATURES = ("annee", "population_15_19", "captation_lag1")
+SEARCH_METHODS = ("loo", "backtest")
+
+
+def candidate_feature_sets(optional=OPTIONAL_FEATURES) -> dict[str, list[str]]:
+    """Jeux lag1_effectifs + toute partie de `optional` (colonnes dans l'ordre FEATURE_ORDER)."""
+    sets = {}
+    for k in range(len(optional) + 1):
+        for extra in combinations(optional, k):
+            cols = [c for c in FEATURE_ORDER if c == "lag1_effectifs" or c in extra]
+            sets["+".join(cols)] = cols
+    return sets
+
+
+def search_loo(
+    train: pd.DataFrame,
+    feature_sets: dict[str, list[str]],
+    alphas=ALPHAS,
+    group_col: str | None = None,
+) -> pd.DataFrame:
+    """
+    Erreur leave-one-out de chaque (jeu de features, alpha) sur `train`.
+    Toutes les lignes servent à l'ajustement ; seules celles dont lag1 est observé
+    sont notées (lag1 imputé = première année de chaque lycée).
+
+    Returns:
+        feature_set | alpha | mae | rmse | n, trié par MAE croissante.
+    """
+    fill = train["effectifs"].mean()
+    y = train["effectifs"].to_numpy(dtype=float)
+    scored = train["lag1_effectifs"].notna().to_numpy()
+    if group_col is None:
+        codes, n_groups = np.zeros(len(y), dtype=np.int64), 1
+    else:
+        codes, labels = pd.factorize(np.asarray(train[group_col]), sort=True)
+        n_groups = len(labels)
+
+    rows = []
+    for name, cols in feature_sets.items():
+        X = training_features(train, cols, fill).to_numpy(dtype=float)
+        ok = np.isfinite(X).all(axis=1)
+        errors = loo_residuals(X[ok], y[ok], codes[ok], n_groups, alphas)[scored[ok]]
+        for a, alpha in enumerate(alphas):
+            e = errors[:, a][~np.isnan(errors[:, a])]
+            rows.append({
+                "feature_set": name, "alpha": alpha,
+                "mae": float(np.mean(np.abs(e))), "rmse": float(np.sqrt(np.mean(e * e))), "n": len(e),
+            })
+    return pd.DataFrame(rows).sort_values(["mae", "feature_set", "alpha"], ignore_index=True)
+
+
+def search_backtest(
+    df: pd.DataFrame,
+    feature_sets: dict[str, list[str]],
+    alphas=ALPHAS,
+    origins: list[int] | None = None,
+    horizons=(1, 2, 3),
+    strategy: str = "recursive",
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    MAE / MAPE walk-forward de chaque (jeu de features, alpha), toutes origines et horizons confondus.
+    Origines par défaut : les trois dernières années suivies d'au moins une année observée.
+    """
+    from backtesting import summarize, walk_forward
+
+    if origins is None:
+        origins = sorted(int(a) for a in df["annee"].unique())[-4:-1]
+    errors = walk_forward(df, origins, horizons, alphas, feature_sets, max_workers=max_workers, strategies=(strategy,))
+    return summarize(errors, by=("feature_set", "alpha")).sort_values(["mae", "feature_set", "alpha"], ignore_index=True)
+
+
+def search_model(
+    df: pd.DataFrame,
+    method: str = "loo",
+    train_max_year: int | None = None,
+    group_col: str | None = None,
+    strategy: str = "recursive",
+    feature_sets: dict[str, list[str]] | None = None,
+    alphas=ALPHAS,
+    max_workers: int | None = None,
+) -> tuple[dict, pd.DataFrame]:
+    """
+    Choisit la configuration Ridge de plus faible MAE.
+
+    Returns:
+        ({"feature_set", "feature_cols", "alpha", "mae"}, table complète des candidats).
+    """
+    feature_sets = feature_sets or candidate_feature_sets()
+    # Les années de test (> train_max_year) ne servent pas au choix
+    train = df if train_max_year is None else df[df["annee"] <= train_max_year]
+    if method == "loo":
+        table = search_loo(train, feature_sets, alphas, group_col)
+    elif method == "backtest":
+        if group_col is not None:
+            raise ValueError("La recherche par backtest ne couvre que le modèle global (utiliser la méthode loo)")
+        table = search_backtest(train, feature_sets, alphas, strategy=strategy, max_workers=max_workers)
+    else:
+        raise ValueError(f"Méthode de recherche inconnue : {method} (attendu : {', '.join(SEARCH_METHODS)})")
+    best = table.iloc[0]
+    return {
+        "feature_set": best["feature_set"],
+        "feature_cols": feature_sets[best["feature_set"]],
+        "alpha": float(best["alpha"]),
+        "mae": float(best["mae"]),
+    }, table
+
+
+def main() -> None:
+    from generate_api_data import (
+        MODEL_GROUPS, MODEL_PARAMS, POP_CSV, find_evolution_csv, load_all_effectifs, load_and_extrapolate_pop,
+        prepare_all_data,
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--method", choices=SEARCH_METHODS, default="loo")
+    parser.add_argument("--model", choices=sorted(MODEL_GROUPS), default="global")
+    parser.add_argument("--strategy", choices=("recursive", "direct"), default="recursive", help="méthode backtest")
+    parser.add_argument("--workers", type=int, default=None, help="processus (méthode backtest)")
+    parser.add_argument("--top", type=int, default=10, help="configurations affichées")
+    args = parser.parse_args()
+
+    df = prepare_all_data(load_all_effectifs(find_evolution_csv()), load_and_extrapolate_pop(POP_CSV))
+    best, table = search_model(
+        df, args.method, MODEL_PARAMS["train_max_year"], MODEL_GROUPS[args.model], args.strategy,
+        max_workers=args.workers,
+    )
+    print(table.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    print(f"\n✓ Retenu : {best['feature_set']}, alpha={best['alpha']:g} (MAE {best['mae']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Orchestrateur du pipeline de données : étapes déclarées avec leurs entrées et sorties.
+
+  extract_pop    classeur INSEE (pop-sexe-age-quinquennal6822.xlsx) → pop_15_19_tous_lycees_2016_2022.csv
+  interpolation  pop_15_19_tous_lycees_2016_2022.csv → pop_15_19_interpolee.csv
+  export         effectifs + population interpolée → frontend/public/data/ (generate_api_data.py)
+  model_lycees   effectifs + population interpolée → images/*.png
+  charts         lycees_data.json → images/lycees/<id>.png
+
+Les dépendances se déduisent des fichiers : une étape qui lit la sortie d'une autre
+passe après elle. Une étape n'est relancée que si l'empreinte de ses entrées a
+changé depuis son dernier succès (fichiers lus, code du script et des modules de
+backend/ qu'il importe, arguments), ou si l'une de ses sorties manque ou a été
+modifiée. Une étape relancée qui réécrit des sorties identiques ne relance donc
+pas la suite. Les étapes prêtes et indépendantes (export et model_lycees, puis
+charts) tournent en parallèle, chacune dans son processus.
+
+Une source absente n'est jamais remplacée en silence : si les sorties de l'étape
+existent déjà (ex. extraction INSEE, classeur non versionné), elles sont
+conservées et signalées ; sinon l'étape échoue et sa descendance n'est pas lancée.
+
+Manifeste : .cache/pipeline.json (empreinte des entrées et des sorties de chaque étape).
+
+Usage : python pipeline.py [étape ...] [--force] [--dry-run] [--workers N] [--verbose]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from build_cache import CACHE_DIR, digest, file_hash
+
+BACKEND = Path(__file__).parent
+MANIFEST = CACHE_DIR / "pipeline.json"
+PIPELINE_VERSION = 1
+IMPORT_RE = re.compile(r"^\s*(?:from\s+(\w+)[\w.]*\s+import|import\s+(\w+))", re.MULTILINE)
+
+UP_TO_DATE = "à jour"
+DONE = "exécutée"
+UNCHANGED = "exécutée, sorties inchangées"
+SOURCE_MISSING = "source absente, sorties conservées"
+TO_RUN = "à relancer"
+FAILED = "échec"
+BLOCKED = "non lancée (dépendance en échec)"
+OK_STATUSES = (UP_TO_DATE, DONE, UNCHANGED, SOURCE_MISSING)
+
+
+class Stage:
+    """Script de backend/ lancé avec `args`, qui lit `inputs` et écrit `outputs` (fichiers ou dossiers)."""
+
+    def __init__(self, name: str, script: str, inputs: list[Path], outputs: list[Path], args: tuple[str, ...] = ()):
+        self.name = name
+        self.script = BACKEND / script
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.args = tuple(args)
+
+    @property
+    def command(self) -> list[str]:
+        return [sys.executable, str(self.script), *self.args]
+
+
+def default_stages() -> list[Stage]:
+    """Étapes du pipeline, chemins repris des scripts eux-mêmes."""
+    import charts
+    import extract_pop_15_19_vendee_mayenne as extract
+    import generate_api_data as gad
+    import interpolation_pop_15_19 as interpolation
+    import model_lycees
+
+    effectifs = gad.find_evolution_csv()
+    return [
+        Stage("extract_pop", "extract_pop_15_19_vendee_mayenne.py",
+              [extract.FICHIER_EXCEL], [extract.OUTPUT_CSV, extract.OUTPUT_EXCEL]),
+        Stage("interpolation", "interpolation_pop_15_19.py",
+              [interpolation.INPUT_CSV], [interpolation.OUTPUT_CSV, interpolation.OUTPUT_EXCEL],
+              args=("--input", str(interpolation.INPUT_CSV))),
+        Stage("export", "generate_api_data.py",
+              [effectifs, gad.POP_CSV],
+              [gad.OUTPUT_DIR / name for name in ("lycees_list.json", "lycees_data.json", "scenarios.bin", "scenarios.json")]),
+        Stage("model_lycees", "model_lycees.py",
+              [effectifs, model_lycees.POP_CSV],
+              [model_lycees.IMAGES_DIR / name for name in ("effectifs_2018_2028.png", "effectifs_et_taux.png", "pop_15_19_dep.png")]),
+        Stage("charts", "charts.py", [charts.OUTPUT_DIR / "lycees_data.json"], [charts.CHARTS_DIR]),
+    ]
+
+
+def path_hash(path: Path) -> str | None:
+    """Empreinte d'un fichier, ou d'un dossier (tous ses fichiers, chemins relatifs compris) ; None si absent."""
+    if path.is_file():
+        return file_hash(path)
+    if path.is_dir():
+        return digest({str(f.relative_to(path)): file_hash(f) for f in sorted(path.rglob("*")) if f.is_file()})
+    return None
+
+
+def local_modules(script: Path) -> list[Path]:
+    """Le script et les modules de backend/ qu'il importe, directement ou non (imports différés compris)."""
+    seen, todo = set(), [script]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        for match in IMPORT_RE.finditer(path.read_text(encoding="utf-8")):
+            module = BACKEND / f"{match[1] or match[2]}.py"
+            if module.exists():
+                todo.append(module)
+    return sorted(seen)
+
+
+def dependencies(stages: list[Stage]) -> dict[str, set[str]]:
+    """Étapes amont de chaque étape (celles qui écrivent un de ses fichiers d'entrée) ; refuse les cycles."""
+    producers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            if path in producers:
+                raise ValueError(f"{path.name} est produit par {producers[path]} et {stage.name}")
+            producers[path] = stage.name
+    deps = {s.name: {producers[p] for p in s.inputs if p in producers and producers[p] != s.name} for s in stages}
+
+    done: set[str] = set()
+    while len(done) < len(deps):
+        ready = {n for n, d in deps.items() if n not in done and d <= done}
+        if not ready:
+            raise ValueError(f"Cycle entre les étapes : {', '.join(sorted(set(deps) - done))}")
+        done |= ready
+    return deps
+
+
+def select(stages: list[Stage], names: list[str] | None) -> list[Stage]:
+    """Étapes demandées et leurs ascendantes (toutes si `names` est vide)."""
+    if not names:
+        return stages
+    by_name = {s.name: s for s in stages}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise ValueError(f"Étape(s) inconnue(s) : {', '.join(unknown)} (disponibles : {', '.join(by_name)})")
+    deps = dependencies(stages)
+    keep, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in keep:
+            keep.add(name)
+            todo.extend(deps[name])
+    return [s for s in stages if s.name in keep]
+
+
+def stage_key(stage: Stage) -> str:
+    return digest({
+        "args": stage.args,
+        "inputs": {str(p): path_hash(p) for p in stage.inputs},
+        "code": {p.name: file_hash(p) for p in local_modules(stage.script)},
+    })
+
+
+def output_hashes(stage: Stage) -> dict[str, str | None]:
+    return {str(p): path_hash(p) for p in stage.outputs}
+
+
+def load_manifest(path: Path = MANIFEST) -> dict:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return state.get("stages", {}) if state.get("version") == PIPELINE_VERSION else {}
+
+
+def save_manifest(entries: dict, path: Path = MANIFEST) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"version": PIPELINE_VERSION, "stages": entries}, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def execute(stage: Stage) -> tuple[subprocess.CompletedProcess, float]:
+    start = time.perf_counter()
+    result = subprocess.run(stage.command, cwd=BACKEND, capture_output=True, text=True)
+    return result, time.perf_counter() - start
+
+
+def report(stage: Stage, status: str, detail: str = "") -> None:
+    print(f"  {stage.name:<14} {status}{f' — {detail}' if detail else ''}", flush=True)
+
+
+def run_pipeline(
+    stages: list[Stage],
+    force: bool = False,
+    dry_run: bool = False,
+    max_workers: int | None = None,
+    verbose: bool = False,
+    manifest_path: Path = MANIFEST,
+) -> dict[str, str]:
+    """
+    Exécute les étapes dans l'ordre des dépendances, les étapes prêtes en parallèle.
+
+    Returns:
+        Statut de chaque étape (UP_TO_DATE, DONE, UNCHANGED, SOURCE_MISSING, TO_RUN, FAILED, BLOCKED).
+    """
+    deps = dependencies(stages)
+    produced = {p for s in stages for p in s.outputs}
+    manifest = load_manifest(manifest_path)
+    pending = {s.name: s for s in stages}
+    status: dict[str, str] = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        while pending or running:
+            for name in [n for n in pending if deps[n] <= status.keys()]:
+                stage = pending.pop(name)
+                failed = sorted(d for d in deps[name] if status[d] not in OK_STATUSES + (TO_RUN,))
+                if failed:
+                    status[name] = BLOCKED
+                    report(stage, BLOCKED, ", ".join(failed))
+                    continue
+                missing = [p for p in stage.inputs if not p.exists() and p not in produced]
+                if missing:
+                    names = ", ".join(p.name for p in missing)
+                    if all(p.exists() for p in stage.outputs):
+                        status[name] = SOURCE_MISSING
+                        report(stage, SOURCE_MISSING, names)
+                    else:
+                        status[name] = FAILED
+                        report(stage, FAILED, f"entrée(s) introuvable(s) : {names}")
+                    continue
+                upstream = sorted(d for d in deps[name] if status[d] == TO_RUN)
+                if dry_run and upstream:
+                    status[name] = TO_RUN
+                    report(stage, TO_RUN, f"si {', '.join(upstream)} modifie ses sorties")
+                    continue
+                key = stage_key(stage)
+                previous = manifest.get(name, {})
+                if not force and previous.get("key") == key and previous.get("outputs") == output_hashes(stage):
+                    status[name] = UP_TO_DATE
+                    report(stage, UP_TO_DATE)
+                elif dry_run:
+                    status[name] = TO_RUN
+                    report(stage, TO_RUN)
+                else:
+                    running[pool.submit(execute, stage)] = (stage, key)
+                    report(stage, "lancée")
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, key = running.pop(future)
+                result, seconds = future.result()
+                outputs = output_hashes(stage)
+                absent = [Path(p).name for p, h in outputs.items() if h is None]
+                if result.returncode != 0 or absent:
+                    status[stage.name] = FAILED
+                    reason = f"code {result.returncode}" if result.returncode else f"sortie(s) absente(s) : {', '.join(absent)}"
+                    report(stage, FAILED, f"{reason}, {seconds:.1f} s")
+                    print(result.stdout + result.stderr, flush=True)
+                    manifest.pop(stage.name, None)
+                else:
+                    unchanged = manifest.get(stage.name, {}).get("outputs") == outputs
+                    status[stage.name] = UNCHANGED if unchanged else DONE
+                    lines = [line for line in result.stdout.splitlines() if line.strip()]
+                    report(stage, status[stage.name], f"{seconds:.1f} s{f' ({lines[-1].strip()})' if lines else ''}")
+                    if verbose:
+                        print(result.stdout, flush=True)
+                    manifest[stage.name] = {"key": key, "outputs": outputs}
+                save_manifest(manifest, manifest_path)
+    return status
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("stages", nargs="*", help="étapes à mettre à jour, avec leurs ascendantes (défaut : toutes)")
+    parser.add_argument("--force", action="store_true", help="relance les étapes même à jour (caches des scripts conservés)")
+    parser.add_argument("--dry-run", action="store_true", help="affiche les étapes à relancer sans rien exécuter")
+    parser.add_argument("--workers", type=int, default=None, help="étapes simultanées (défaut : nombre de cœurs)")
+    parser.add_argument("--verbose", action="store_true", help="affiche la sortie complète de chaque étape")
+    args = parser.parse_args(argv)
+
+    try:
+        stages = select(default_stages(), args.stages)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Pipeline : {len(stages)} étape(s), {args.workers or os.cpu_count()} en parallèle au plus\n")
+    status = run_pipeline(stages, args.force, args.dry_run, args.workers, args.verbose)
+    failed = [name for name, s in status.items() if s in (FAILED, BLOCKED)]
+    if failed:
+        print(f"\n✗ Étape(s) en échec : {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n✓ Pipeline terminé ({sum(s in (DONE, UNCHANGED) for s in status.values())} étape(s) exécutée(s))")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+"""
+Extrapolation de la population 15-19 ans, partagée par generate_api_data et model_lycees.
+
+Entièrement vectorisée : la table longue est pivotée en une matrice
+(géographies × années), la tendance linéaire est calculée en une opération
+sur toutes les lignes. Fonctionne pour n'importe quelle clé géographique
+(code_departement, code_commune...) et n'importe quelle plage d'années.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+
+def read_population(path: Path, key: str = "code_departement") -> pd.DataFrame:
+    """Charge une table longue annee | <key> | ... | population_15_19."""
+    df = pd.read_csv(path, dtype={key: str})
+    df[key] = df[key].str.strip()
+    return df
+
+
+def extrapolate_population(
+    df: pd.DataFrame,
+    key: str = "code_departement",
+    years=range(2018, 2029),
+    base_years: tuple[int, int] = (2018, 2022),
+    value_col: str = "population_15_19",
+    label_cols: list[str] | tuple[str, ...] = (),
+) -> pd.DataFrame:
+    """
+    Prolonge la population au-delà de la dernière année de base par tendance linéaire.
+
+    - annee <= base_years[1] : valeur observée (tendance si absente)
+    - annee >  base_years[1] : pop_fin + pente * (annee - fin)
+      avec pente = (pop_fin - pop_debut) / (fin - debut)
+
+    Retourne une table longue triée par (key, annee) :
+    annee | key | label_cols... | value_col (arrondie à 2 décimales).
+    """
+    debut, fin = base_years
+    years = np.asarray(list(years))
+
+    wide = df.drop_duplicates([key, "annee"]).pivot(index=key, columns="annee", values=value_col)
+    pente = ((wide[fin] - wide[debut]) / (fin - debut)).to_numpy()
+    tendance = wide[fin].to_numpy()[:, None] + pente[:, None] * (years - fin)
+
+    observe = wide.reindex(columns=years).to_numpy(dtype=float)
+    valeurs = np.where((years <= fin) & ~np.isnan(observe), observe, tendance)
+
+    n_geo, n_years = valeurs.shape
+    out = {
+        "annee": np.tile(years, n_geo),
+        key: np.repeat(wide.index.to_numpy(), n_years),
+    }
+    if label_cols:
+        labels = df.drop_duplicates(key).set_index(key)[list(label_cols)].reindex(wide.index)
+        for col in label_cols:
+            out[col] = np.repeat(labels[col].to_numpy(), n_years)
+    out[value_col] = np.round(valeurs.ravel(), 2)
+    return pd.DataFrame(out)
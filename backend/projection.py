@@ -0,0 +1,396 @@
+"""
+Moteur de projection vectorisé.
+
+Projette TOUS les lycées en même temps, selon deux stratégies :
+  - récursive (forecast_batch) : un model.predict sur n lycées par pas
+    d'horizon ; la prévision arrondie et bornée à 0 de l'année N sert de
+    lag1 pour l'année N+1 ;
+  - directe (fit_direct / forecast_direct) : un modèle par horizon h, qui
+    prédit N+h à partir des effectifs observés en N ; tous les horizons de
+    tous les lycées sortent d'un seul calcul, sans réinjection des prévisions.
+
+Intervalles : bootstrap des trajectoires récursives (bootstrap_quantiles), ou
+résidus de chaque modèle par horizon appliqués à la prévision directe
+(direct_residuals / direct_quantiles).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def pop_matrix(
+    pop: pd.DataFrame,
+    keys,
+    years: list[int],
+    fallback=None,
+    key_col: str = "code_departement",
+    value_col: str = "population_15_19",
+) -> np.ndarray:
+    """
+    Matrice (n_clés × n_années) de population alignée sur `keys`.
+
+    Les couples (clé, année) absents de `pop` prennent la valeur `fallback`
+    de la ligne (ex. dernière population observée du lycée), sinon NaN.
+    """
+    wide = (
+        pop.drop_duplicates([key_col, "annee"])
+        .pivot(index=key_col, columns="annee", values=value_col)
+        .reindex(index=list(keys), columns=list(years))
+    )
+    values = wide.to_numpy(dtype=float)
+    if fallback is not None:
+        fallback = np.asarray(fallback, dtype=float)
+        values = np.where(np.isnan(values), fallback[:, None], values)
+    return values
+
+
+def build_features(
+    feature_cols: list[str],
+    annee,
+    lag1: np.ndarray,
+    pop_vals: np.ndarray,
+    static: dict[str, np.ndarray] | None = None,
+) -> pd.DataFrame:
+    """
+    Construit la matrice de features d'un pas d'horizon pour tous les lycées
+    (`annee` : une année commune ou une année par ligne).
+
+    Features dérivées (recalculées à chaque pas, donc utilisables en récursif) :
+      - captation_lag1 : effectifs N-1 rapportés à la population 15-19 de l'année N.
+    """
+    n = len(lag1)
+    cols = {
+        "annee": np.full(n, annee),
+        "lag1_effectifs": lag1,
+        "population_15_19": pop_vals,
+    }
+    if "captation_lag1" in feature_cols:
+        lag1, pop_vals = np.asarray(lag1, dtype=float), np.asarray(pop_vals, dtype=float)
+        cols["captation_lag1"] = np.divide(lag1, pop_vals, out=np.full(n, np.nan), where=pop_vals > 0)
+    if static:
+        cols.update(static)
+    return pd.DataFrame({c: cols[c] for c in feature_cols})
+
+
+def training_features(df: pd.DataFrame, feature_cols: list[str], fill: float) -> pd.DataFrame:
+    """
+    Features d'entraînement d'un DataFrame long (annee, lag1_effectifs, population_15_19) :
+    lag1 et population manquants remplacés par `fill`, puis mêmes features que build_features.
+    """
+    return build_features(
+        feature_cols,
+        df["annee"].to_numpy(),
+        df["lag1_effectifs"].fillna(fill).to_numpy(dtype=float),
+        df["population_15_19"].fillna(fill).to_numpy(dtype=float),
+    )
+
+
+def predict(model, X: pd.DataFrame, groups=None) -> np.ndarray:
+    """predict commun aux modèles globaux (sklearn) et par groupe (ridge_batch.StackedRidge)."""
+    return model.predict(X) if groups is None else model.predict(X, groups)
+
+
+def model_groups(model, store) -> np.ndarray | None:
+    """Groupe de chaque lycée du FeatureStore pour un modèle par groupe (None si modèle global)."""
+    group_col = getattr(model, "group_col", None)
+    if group_col is None:
+        return None
+    return store.keys if group_col == store.key else store.attr(group_col)
+
+
+def forecast_batch(
+    model,
+    feature_cols: list[str],
+    lag1,
+    pop_vals: np.ndarray,
+    years: list[int],
+    static: dict[str, np.ndarray] | None = None,
+    cap_decline=None,
+    scale=None,
+    groups=None,
+) -> np.ndarray:
+    """
+    Projection récursive de n lycées sur len(years) horizons.
+
+    Args:
+        lag1: (n,) derniers effectifs observés.
+        pop_vals: (n, H) population 15-19 pour chaque lycée et chaque année projetée.
+        static: features constantes sur l'horizon (ex. one-hot lycée).
+        cap_decline: masque (n,) — lycées dont la prévision ne peut dépasser lag1.
+        scale: (n,) ou (n, H) multiplicateur appliqué à la prédiction avant arrondi
+               (scénario d'attractivité : 1 + delta ; bootstrap : 1 + résidu tiré
+               pour chaque année), réinjecté dans lag1.
+        groups: (n,) groupe de chaque ligne pour un modèle par lycée/département.
+
+    Returns:
+        (n, H) effectifs projetés : max(0, round(pred * scale)).
+    """
+    lag1 = np.asarray(lag1, dtype=float)
+    preds = np.empty((len(lag1), len(years)))
+    if scale is not None:
+        scale = np.asarray(scale, dtype=float)
+    for h, annee in enumerate(years):
+        X = build_features(feature_cols, annee, lag1, pop_vals[:, h], static)
+        pred = predict(model, X, groups)
+        if scale is not None:
+            pred = pred * (scale if scale.ndim == 1 else scale[:, h])
+        pred = np.maximum(0, np.round(pred))
+        if cap_decline is not None:
+            pred = np.where(cap_decline, np.minimum(pred, lag1), pred)
+        preds[:, h] = pred
+        lag1 = pred
+    return preds
+
+
+def forecast_scenarios(
+    model,
+    feature_cols: list[str],
+    lag1,
+    pop_vals: np.ndarray,
+    years: list[int],
+    deltas,
+    groups=None,
+) -> np.ndarray:
+    """
+    Cube de scénarios d'attractivité (n lycées × H années × D deltas).
+
+    Chaque delta relance la récursion complète : la prévision majorée de
+    (1 + delta) devient le lag1 de l'année suivante. Les D × n trajectoires
+    sont empilées, d'où un seul predict par année pour tout le cube.
+    """
+    lag1 = np.asarray(lag1, dtype=float)
+    deltas = np.asarray(deltas, dtype=float)
+    n, n_deltas = len(lag1), len(deltas)
+    preds = forecast_batch(
+        model,
+        feature_cols,
+        np.tile(lag1, n_deltas),
+        np.tile(pop_vals, (n_deltas, 1)),
+        years,
+        scale=np.repeat(1 + deltas, n),
+        groups=None if groups is None else np.tile(groups, n_deltas),
+    )
+    return preds.reshape(n_deltas, n, len(years)).transpose(1, 2, 0)
+
+
+def bootstrap_quantiles(
+    model,
+    feature_cols: list[str],
+    lag1,
+    pop_vals: np.ndarray,
+    years: list[int],
+    residuals,
+    seeds,
+    n_sims: int = 1000,
+    quantiles=(10, 50, 90),
+    groups=None,
+    chunk_rows: int = 250_000,
+) -> np.ndarray:
+    """
+    Intervalles de prévision par bootstrap des résidus relatifs du modèle N+1.
+
+    Pour chaque lycée, n_sims trajectoires récursives sont simulées : à chaque
+    année, la prévision est multipliée par (1 + r), r tiré avec remise dans
+    `residuals` (y / ŷ - 1 sur l'entraînement), puis arrondie et réinjectée
+    comme lag1 (forecast_batch avec scale (lignes, H)). Les lycées sont traités
+    par blocs de chunk_rows trajectoires pour borner la mémoire.
+
+    Args:
+        seeds: (n,) graine par lycée — les tirages d'un lycée ne dépendent ni
+               du découpage en blocs ni des autres lycées projetés.
+
+    Returns:
+        (n, H, len(quantiles)) percentiles des effectifs simulés.
+    """
+    lag1 = np.asarray(lag1, dtype=float)
+    residuals = np.asarray(residuals, dtype=float)
+    if residuals.size == 0:
+        raise ValueError("Aucun résidu d'entraînement : intervalles de prévision indisponibles")
+    n, n_years = len(lag1), len(years)
+    out = np.empty((n, n_years, len(quantiles)))
+    per_chunk = max(1, chunk_rows // n_sims)
+    for start in range(0, n, per_chunk):
+        sl = slice(start, min(start + per_chunk, n))
+        n_c = sl.stop - sl.start
+        draws = np.concatenate([
+            np.random.default_rng(seed).integers(0, len(residuals), size=(n_sims, n_years)) for seed in seeds[sl]
+        ])
+        sims = forecast_batch(
+            model,
+            feature_cols,
+            np.repeat(lag1[sl], n_sims),
+            np.repeat(pop_vals[sl], n_sims, axis=0),
+            years,
+            scale=1 + residuals[draws],
+            groups=None if groups is None else np.repeat(np.asarray(groups)[sl], n_sims),
+        )
+        out[sl] = np.moveaxis(np.percentile(sims.reshape(n_c, n_sims, n_years), quantiles, axis=1), 0, -1)
+    return out
+
+
+class DirectModel:
+    """
+    Stratégie directe : un modèle par horizon h (1…H), entraîné à prédire les
+    effectifs de N+h avec lag1_effectifs = effectifs de N et les features de
+    l'année cible (annee, population_15_19, captation_lag1). `group_col` suit ridge_batch.StackedRidge.
+    """
+
+    def __init__(self, models: dict[int, object], group_col: str | None = None):
+        self.models = models
+        self.group_col = group_col
+
+    @property
+    def horizons(self) -> list[int]:
+        return sorted(self.models)
+
+
+def direct_training_rows(
+    store,
+    feature_cols: list[str],
+    horizons,
+    max_year: int,
+    static: dict[str, np.ndarray] | None = None,
+    group_col: str | None = None,
+    min_year: int | None = None,
+):
+    """
+    Lignes de chaque horizon h (années cibles entre min_year et max_year, FeatureStore `store`) :
+    itère sur (h, X, y, groupes ou None, lycée de chaque ligne), couples (lycée, année) sans
+    effectif en N = cible - h écartés.
+    """
+    sel = store.years <= max_year
+    if min_year is not None:
+        sel &= store.years >= min_year
+    n, t = len(store.keys), int(sel.sum())
+    y = store.matrix["effectifs"][:, sel].ravel()
+    annees = np.tile(store.years[sel], n)
+    pop = store.matrix["population_15_19"][:, sel].ravel()
+    static = {c: np.repeat(v, t) for c, v in static.items()} if static else None
+    keys = np.repeat(store.keys, t)
+    groups = None
+    if group_col is not None:
+        groups = keys if group_col == store.key else np.repeat(store.attr(group_col), t)
+
+    for h in horizons:
+        X = build_features(feature_cols, annees, store.lag(h, "effectifs")[:, sel].ravel(), pop, static)
+        ok = ~np.isnan(y) & X.notna().all(axis=1).to_numpy()
+        if not ok.any():
+            raise ValueError(f"Aucune donnée d'entraînement pour l'horizon {h} (années <= {max_year})")
+        yield h, X[ok], y[ok], None if groups is None else groups[ok], keys[ok]
+
+
+def fit_direct(
+    store,
+    feature_cols: list[str],
+    horizons,
+    max_year: int,
+    make_model,
+    static: dict[str, np.ndarray] | None = None,
+    group_col: str | None = None,
+) -> DirectModel:
+    """
+    Entraîne un modèle par horizon sur les années cibles <= max_year (FeatureStore `store`).
+
+    Les couples (lycée, année) sans effectif à l'année N = cible - h sont écartés.
+    Les horizons sont indépendants (aucune prévision réinjectée).
+    make_model: fabrique d'estimateur non entraîné (ex. lambda: Ridge(alpha=1.0)).
+    """
+    models = {}
+    for h, X, y, groups, _ in direct_training_rows(store, feature_cols, horizons, max_year, static, group_col):
+        model = make_model()
+        if groups is None:
+            model.fit(X, y)
+        else:
+            model.fit(X, y, groups)
+        models[h] = model
+    return DirectModel(models, group_col)
+
+
+def direct_fitted(
+    model: DirectModel, store, feature_cols: list[str], max_year: int, static: dict[str, np.ndarray] | None = None,
+):
+    """Itère sur (h, lycée de chaque ligne, y, ŷ du modèle h) sur les lignes d'entraînement de chaque horizon."""
+    for h, X, y, groups, keys in direct_training_rows(
+        store, feature_cols, model.horizons, max_year, static, model.group_col,
+    ):
+        yield h, keys, y, predict(model.models[h], X, groups)
+
+
+def direct_residuals(
+    model: DirectModel, store, feature_cols: list[str], max_year: int, static: dict[str, np.ndarray] | None = None,
+) -> dict[int, np.ndarray]:
+    """Résidus relatifs y / ŷ - 1 de chaque modèle par horizon sur ses propres lignes d'entraînement."""
+    residuals = {}
+    for h, _, y, fitted in direct_fitted(model, store, feature_cols, max_year, static):
+        ok = fitted > 0
+        residuals[h] = y[ok] / fitted[ok] - 1
+    return residuals
+
+
+def direct_quantiles(preds: np.ndarray, residuals: dict[int, np.ndarray], quantiles=(10, 50, 90)) -> np.ndarray:
+    """
+    Intervalles de la stratégie directe : sans réinjection, les percentiles de ŷ_h × (1 + r),
+    r tiré dans les résidus relatifs de l'horizon h, sont ceux des résidus appliqués à la
+    prévision directe (aucune simulation nécessaire).
+
+    Returns:
+        (n, H, len(quantiles)) effectifs aux percentiles demandés.
+    """
+    preds = np.asarray(preds, dtype=float)
+    empty = [h for h in range(1, preds.shape[1] + 1) if len(residuals.get(h, ())) == 0]
+    if empty:
+        raise ValueError(f"Aucun résidu pour les horizons {empty} : intervalles de prévision indisponibles")
+    q = np.stack([np.percentile(residuals[h], quantiles) for h in range(1, preds.shape[1] + 1)])
+    return np.maximum(0, preds[:, :, None] * (1 + q[None, :, :]))
+
+
+def forecast_direct(
+    model: DirectModel,
+    feature_cols: list[str],
+    lag1,
+    pop_vals: np.ndarray,
+    years: list[int],
+    static: dict[str, np.ndarray] | None = None,
+    cap_decline=None,
+    groups=None,
+) -> np.ndarray:
+    """
+    Projection directe de n lycées sur len(years) horizons (years[h-1] = N+h).
+
+    Les n × H lignes de features sont construites d'un bloc ; pour des modèles
+    linéaires globaux (coef_ 1-D), un seul produit empilé (H × n × p)·(H × p)
+    donne toutes les prévisions. Même post-traitement que forecast_batch :
+    max(0, round(pred)), et cap_decline borne chaque année par la précédente.
+
+    Returns:
+        (n, H) effectifs projetés.
+    """
+    lag1 = np.asarray(lag1, dtype=float)
+    n, n_years = len(lag1), len(years)
+    missing = [h for h in range(1, n_years + 1) if h not in model.models]
+    if missing:
+        raise ValueError(f"Modèle direct non entraîné pour les horizons {missing}")
+
+    X = build_features(
+        feature_cols,
+        np.repeat(years, n),
+        np.tile(lag1, n_years),
+        np.asarray(pop_vals, dtype=float).T.ravel(),
+        {c: np.tile(v, n_years) for c, v in static.items()} if static else None,
+    )
+
+    fitted = [model.models[h] for h in range(1, n_years + 1)]
+    if groups is None and all(np.ndim(getattr(m, "coef_", None)) == 1 for m in fitted):
+        coef = np.stack([m.coef_ for m in fitted])
+        intercept = np.array([float(m.intercept_) for m in fitted])
+        X3 = X.to_numpy(dtype=float).reshape(n_years, n, len(feature_cols))
+        pred = np.einsum("hnp,hp->nh", X3, coef) + intercept
+    else:
+        pred = np.column_stack([
+            predict(m, X.iloc[h * n:(h + 1) * n], groups) for h, m in enumerate(fitted)
+        ])
+    pred = np.maximum(0, np.round(pred))
+    if cap_decline is not None:
+        capped = np.minimum.accumulate(np.column_stack([lag1, pred]), axis=1)[:, 1:]
+        pred = np.where(np.asarray(cap_decline)[:, None], capped, pred)
+    return pred
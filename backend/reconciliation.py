@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Réconciliation hiérarchique des prévisions : lycée → département → Pays de la Loire.
+
+La hiérarchie est décrite par une table des feuilles (une ligne par série de base :
+lycée, ou lycée × formation) et ses colonnes de niveaux, de la feuille au niveau le
+plus agrégé. La matrice d'agrégation S (nœuds × feuilles, creuse : un 1 par niveau
+et par feuille) relie les séries : y_nœuds = S y_feuilles. Nœuds ordonnés du niveau
+le plus agrégé aux feuilles.
+
+Méthodes (toutes les années projetées réconciliées en un seul produit matriciel) :
+  - bottom_up : ỹ = S ŷ_feuilles ;
+  - top_down  : chaque feuille reçoit sa part historique moyenne du total de sa
+    racine, ỹ = S (p ∘ ŷ_racine) ;
+  - mint      : ỹ = S (Sᵀ W⁻¹ S)⁻¹ Sᵀ W⁻¹ ŷ avec W diagonale (MINT_WEIGHTS :
+    ols = I, wls_struct = nombre de feuilles du nœud, wls_var = variance des
+    résidus du modèle de base du nœud).
+Pour mint, Sᵀ W⁻¹ S = W_f⁻¹ + S_aᵀ W_a⁻¹ S_a (feuilles f, agrégats a) est inversée
+par Woodbury : seul le système creux agrégats × agrégats W_a + S_a W_f S_aᵀ est
+factorisé (splu), jamais de matrice dense feuilles × feuilles.
+
+Usage : python reconciliation.py [--weights wls_struct]   (compare les méthodes sur data/)
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from projection import build_features, forecast_batch
+from ridge_batch import StackedRidge
+
+RECONCILE_METHODS = ("bottom_up", "top_down", "mint")
+MINT_WEIGHTS = ("ols", "wls_struct", "wls_var")
+# Modèle de base des nœuds agrégés : tendance + effectifs N-1 (la population n'est pas additive)
+AGGREGATE_FEATURES = ["annee", "lag1_effectifs"]
+
+
+class Hierarchy:
+    """Arbre feuilles → niveaux agrégés et sa matrice d'agrégation S (creuse, nœuds × feuilles)."""
+
+    def __init__(self, leaves: pd.DataFrame, levels: list[str]):
+        """
+        leaves : une ligne par série de base ; levels : colonnes de `leaves`, de l'identifiant
+        de feuille au niveau le plus agrégé (ex. ["lycee_raw", "departement_code", "region"]).
+        Un nœud agrégé est identifié par son chemin depuis la racine (libellés répétés tolérés).
+        """
+        import scipy.sparse as sp  # importé à la réconciliation seulement (export à jour sans scipy)
+
+        if leaves[levels[0]].duplicated().any():
+            raise ValueError(f"Feuilles en double dans la colonne {levels[0]}")
+        self.n_leaves = n = len(leaves)
+        self.levels = list(levels)
+
+        codes, labels, level_names = [], [], []
+        path = pd.Series("", index=leaves.index)
+        for col in reversed(levels[1:]):  # du plus agrégé au plus fin
+            values = leaves[col].astype(str)
+            path = path + "\x1f" + values
+            level_codes, uniques = pd.factorize(path, sort=True)
+            codes.append(level_codes)
+            labels.extend(values.to_numpy()[np.unique(level_codes, return_index=True)[1]])
+            level_names.extend([col] * len(uniques))
+        offsets = np.cumsum([0] + [c.max() + 1 for c in codes])
+        self.n_agg = int(offsets[-1])
+
+        rows = np.concatenate([c + o for c, o in zip(codes, offsets)]) if codes else np.empty(0, dtype=np.int64)
+        cols = np.tile(np.arange(n), len(codes))
+        S_agg = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(self.n_agg, n))
+        self.S = sp.vstack([S_agg, sp.identity(n, format="csr")], format="csr")
+        self.labels = np.array(labels + leaves[levels[0]].astype(str).tolist(), dtype=object)
+        self.level = np.array(level_names + [levels[0]] * n, dtype=object)
+
+        # Parent de chaque nœud (-1 pour les racines) : celui de sa première feuille au niveau au-dessus
+        node_codes = [c + o for c, o in zip(codes, offsets)] + [self.n_agg + np.arange(n)]
+        self.parent = np.full(self.n_agg + n, -1, dtype=np.int64)
+        for upper, lower in zip(node_codes[:-1], node_codes[1:]):
+            self.parent[lower] = upper
+        self.root = node_codes[0] if codes else self.n_agg + np.arange(n)  # racine de chaque feuille
+
+    @property
+    def n_nodes(self) -> int:
+        return self.n_agg + self.n_leaves
+
+    def aggregate(self, values: np.ndarray) -> np.ndarray:
+        """
+        Valeurs des feuilles (n_feuilles × T) → tous les nœuds (n_nœuds × T). Une feuille sans
+        valeur (NaN) compte pour 0 ; un nœud sans aucune feuille observée reste NaN.
+        """
+        values = np.asarray(values, dtype=float)
+        observed = self.S @ (~np.isnan(values)).astype(float)
+        totals = self.S @ np.nan_to_num(values)
+        return np.where(observed > 0, totals, np.nan)
+
+
+def bottom_up(h: Hierarchy, base: np.ndarray) -> np.ndarray:
+    return h.S @ base[h.n_agg:]
+
+
+def historical_proportions(h: Hierarchy, history: np.ndarray) -> np.ndarray:
+    """Part moyenne de chaque feuille dans le total de sa racine sur les années observées (somme 1 par racine)."""
+    history = np.asarray(history, dtype=float)
+    totals = h.aggregate(history)[h.root]
+    share = np.divide(history, totals, out=np.full(history.shape, np.nan), where=totals > 0)
+    observed = ~np.isnan(share)
+    p = np.where(observed.any(axis=1), np.nansum(share, axis=1) / np.maximum(observed.sum(axis=1), 1), 0.0)
+    per_root = np.bincount(h.root, weights=p, minlength=h.n_nodes)[h.root]
+    return np.divide(p, per_root, out=np.zeros_like(p), where=per_root > 0)
+
+
+def top_down(h: Hierarchy, base: np.ndarray, proportions: np.ndarray) -> np.ndarray:
+    return h.S @ (proportions[:, None] * base[h.root])
+
+
+def mint_weights(h: Hierarchy, kind: str = "wls_struct", variances: np.ndarray | None = None) -> np.ndarray:
+    """
+    Diagonale de W (n_nœuds,). wls_var : variances des résidus de base par nœud ; les nœuds
+    sans variance estimable (NaN ou nulle) reprennent le poids structurel mis à l'échelle
+    médiane des autres.
+    """
+    struct = np.asarray(h.S.sum(axis=1), dtype=float).ravel()
+    if kind == "ols":
+        return np.ones(h.n_nodes)
+    if kind == "wls_struct":
+        return struct
+    if kind == "wls_var":
+        if variances is None:
+            raise ValueError("wls_var : variances des résidus par nœud requises")
+        variances = np.asarray(variances, dtype=float)
+        ok = np.isfinite(variances) & (variances > 0)
+        scale = np.median(variances[ok] / struct[ok]) if ok.any() else 1.0
+        return np.where(ok, variances, struct * scale)
+    raise ValueError(f"Pondération MinT inconnue : {kind} (attendu : {', '.join(MINT_WEIGHTS)})")
+
+
+def mint(h: Hierarchy, base: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """ỹ = S (Sᵀ W⁻¹ S)⁻¹ Sᵀ W⁻¹ ŷ, W = diag(weights), par Woodbury sur les nœuds agrégés."""
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import splu
+
+    w_agg, w_leaf = weights[:h.n_agg, None], weights[h.n_agg:, None]
+    S_agg = h.S[:h.n_agg]
+    rhs = w_leaf * (h.S.T @ (base / weights[:, None]))  # W_f Sᵀ W⁻¹ ŷ
+    if h.n_agg:
+        inner = sp.diags(w_agg.ravel()) + S_agg @ sp.diags(w_leaf.ravel()) @ S_agg.T
+        rhs = rhs - w_leaf * (S_agg.T @ splu(inner.tocsc()).solve(S_agg @ rhs))
+    return h.S @ rhs
+
+
+def reconcile(
+    h: Hierarchy,
+    base: np.ndarray,
+    method: str = "mint",
+    weights: str = "wls_struct",
+    variances: np.ndarray | None = None,
+    history: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Prévisions de base de tous les nœuds (n_nœuds × H, ordre de h) → prévisions cohérentes.
+    top_down : `history` (n_feuilles × T) fixe les parts ; mint wls_var : `variances` (n_nœuds,).
+    """
+    base = np.asarray(base, dtype=float)
+    if method == "bottom_up":
+        return bottom_up(h, base)
+    if method == "top_down":
+        if history is None:
+            raise ValueError("top_down : historique des feuilles requis")
+        return top_down(h, base, historical_proportions(h, history))
+    if method == "mint":
+        return mint(h, base, mint_weights(h, weights, variances))
+    raise ValueError(f"Méthode de réconciliation inconnue : {method} (attendu : {', '.join(RECONCILE_METHODS)})")
+
+
+def aggregate_forecasts(
+    history: np.ndarray, hist_years, years: list[int], train_max_year: int, alpha: float = 1.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Modèle de base des nœuds agrégés : un Ridge par nœud sur sa propre série (AGGREGATE_FEATURES,
+    ridge_batch.StackedRidge, ajustés en bloc), projeté récursivement comme les lycées.
+
+    Returns:
+        (n × H) prévisions, (n,) variance des résidus d'entraînement (NaN si aucun).
+    """
+    n, T = history.shape
+    lag1 = np.full((n, T), np.nan)
+    lag1[:, 1:] = history[:, :-1]
+    node = np.repeat(np.arange(n), T)
+    annee = np.tile(np.asarray(hist_years), n)
+    y, lag1 = history.ravel(), lag1.ravel()
+    ok = ~np.isnan(y) & ~np.isnan(lag1) & (annee <= train_max_year)
+
+    X = build_features(AGGREGATE_FEATURES, annee[ok], lag1[ok], np.full(ok.sum(), np.nan))
+    model = StackedRidge(alpha=alpha, group_col="node").fit(X, y[ok], node[ok])
+    resid = y[ok] - model.predict(X, node[ok])
+    counts = np.bincount(node[ok], minlength=n)
+    variances = np.bincount(node[ok], weights=resid * resid, minlength=n) / np.where(counts > 0, counts, np.nan)
+
+    last = pd.DataFrame(history).ffill(axis=1).iloc[:, -1].to_numpy()
+    preds = forecast_batch(model, AGGREGATE_FEATURES, last, np.full((n, len(years)), np.nan), years, groups=np.arange(n))
+    return preds, variances
+
+
+def main() -> None:
+    from generate_api_data import (
+        MODEL_PARAMS, POP_CSV, YEARS_PROJ, find_evolution_csv, forecast_all, load_all_effectifs,
+        load_and_extrapolate_pop, prepare_all_data, reconciliation_inputs, train_global_model,
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", choices=MINT_WEIGHTS, default="wls_struct", help="pondération MinT")
+    args = parser.parse_args()
+
+    pop = load_and_extrapolate_pop(POP_CSV)
+    df = prepare_all_data(load_all_effectifs(find_evolution_csv()), pop)
+    model, feature_cols, _, _ = train_global_model(df)
+    projections = forecast_all(model, feature_cols, df, pop, YEARS_PROJ)
+    baselines = {lycee: [p["baseline"] for p in points] for lycee, points in projections.items()}
+    h, base, variances, history = reconciliation_inputs(df, model, feature_cols, baselines)
+
+    agg = slice(0, h.n_agg)
+    table = pd.DataFrame({"niveau": h.level[agg], "noeud": h.labels[agg], "base": base[agg, -1]})
+    for method in RECONCILE_METHODS:
+        table[method] = reconcile(h, base, method, args.weights, variances, history)[agg, -1].round(1)
+    print(f"Prévisions {YEARS_PROJ[-1]} des nœuds agrégés (base : Ridge par nœud ; lycées : Ridge global, "
+          f"entraîné jusqu'en {MODEL_PARAMS['train_max_year']})\n")
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
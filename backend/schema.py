@@ -0,0 +1,23 @@
+"""
+Schéma compact des tables longues (lycée × année) du pipeline.
+
+Appliqué au chargement des effectifs et conservé par prepare_* et les projections :
+  - clés (lycée, département) : category (codes entiers + une seule copie de chaque libellé),
+  - annee : int16, effectifs : int32,
+  - taux (captation) : float32.
+
+population_15_19 et les features du modèle (lag1_effectifs) restent en float64 :
+ce sont des entrées du Ridge, les coefficients ne doivent pas dépendre du stockage.
+"""
+
+import pandas as pd
+
+CATEGORY_COLUMNS = ("lycee_raw", "lycee", "departement_code")
+DTYPES = {"annee": "int16", "effectifs": "int32", "taux_captation": "float32"}
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes présentes au schéma compact (les autres sont inchangées)."""
+    casts = {col: "category" for col in CATEGORY_COLUMNS if col in df.columns}
+    casts.update({col: dtype for col, dtype in DTYPES.items() if col in df.columns})
+    return df.astype(casts)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Les scripts de backend/ s'importent entre eux comme modules de premier niveau
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
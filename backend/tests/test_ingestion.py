@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from ingestion import read_effectifs, year_columns
+
+
+def write_csv(tmp_path, text: str):
+    path = tmp_path / "export.csv"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_year_columns_only_rentree_headers():
+    columns = ["", "Octobre 2018", "Evolution 2018-2025", "octobre 2019 ", "Total 2020"]
+    assert year_columns(columns) == {"Octobre 2018": 2018, "octobre 2019 ": 2019}
+
+
+def test_year_columns_rejects_duplicate_rentree():
+    with pytest.raises(ValueError, match="même rentrée 2018"):
+        year_columns(["", "Octobre 2018", "OCTOBRE 2018 "])
+
+
+@pytest.mark.parametrize("chunksize", [None, 2, 100])
+def test_dated_non_rentree_column_ignored(tmp_path, chunksize):
+    path = write_csv(tmp_path, ",Octobre 2018,Evolution 2018-2025\nA,100,20\n")
+    df = read_effectifs(path, chunksize=chunksize)
+    assert df.to_dict("records") == [{"annee": 2018, "lycee_raw": "A", "effectifs": 100.0}]
+
+
+BLANK_TAIL = ",Octobre 2018,Octobre 2019\nA,1,2\nB,3,4\n,,\n,,\n"
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 4, 100])
+def test_blank_rows_at_chunk_boundary(tmp_path, chunksize):
+    path = write_csv(tmp_path, BLANK_TAIL)
+    pd.testing.assert_frame_equal(read_effectifs(path, chunksize=chunksize), read_effectifs(path))
+
+
+def test_blank_rows_xlsx_chunked(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in [(None, "Octobre 2018", "Octobre 2019"), ("A", 1, 2), ("B", 3, 4), (None, None, None), (None, None, None)]:
+        sheet.append(row)
+    path = tmp_path / "export.xlsx"
+    workbook.save(path)
+    expected = read_effectifs(path)
+    assert expected["effectifs"].tolist() == [1.0, 3.0, 2.0, 4.0]
+    for chunksize in (1, 2, 3):
+        pd.testing.assert_frame_equal(read_effectifs(path, chunksize=chunksize), expected)
+
+
+def test_only_blank_rows(tmp_path):
+    path = write_csv(tmp_path, ",Octobre 2018\n,\n,\n")
+    for chunksize in (None, 1):
+        assert read_effectifs(path, chunksize=chunksize).empty
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from projection import bootstrap_quantiles, direct_quantiles
+
+
+def test_bootstrap_empty_residual_pool():
+    with pytest.raises(ValueError, match="Aucun résidu"):
+        bootstrap_quantiles(None, [], [100.0], np.full((1, 2), np.nan), [2026, 2027], [], [[42, 0]])
+
+
+def test_direct_quantiles_bracket_direct_forecast():
+    preds = np.array([[100.0, 118.0]])
+    residuals = {1: np.array([-0.1, 0.0, 0.1]), 2: np.array([-0.2, 0.0, 0.2])}
+    q = direct_quantiles(preds, residuals, (0, 50, 100))
+    np.testing.assert_allclose(q[0], [[90, 100, 110], [94.4, 118, 141.6]])
+
+
+def test_direct_quantiles_empty_horizon():
+    with pytest.raises(ValueError, match="horizons \\[2\\]"):
+        direct_quantiles(np.ones((1, 2)), {1: np.array([0.0]), 2: np.array([])})